@@ -1,10 +1,294 @@
 from aiohttp import (
+    ClientConnectionError,
     ClientSession,
     ClientResponse,
+    ClientTimeout,
+    TCPConnector,
 )
+import asyncio
+import copy
 import json
+import logging
+import random
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Hashable
 
 from api.core.config import settings
+from api.core.metrics import ACAPY_REQUEST_DURATION, registry
+from api.core.tracing import tracer
+
+
+logger = logging.getLogger(__name__)
+
+
+class AcapyError(Exception):
+    """Error response from the aca-py admin api."""
+
+    def __init__(self, message: str, status: int | None = None):
+        """Create the error, with the http status of the response (if any)."""
+        super().__init__(message)
+        self.status = status
+
+
+class AcapyUnavailable(Exception):
+    """aca-py wasn't called because the circuit breaker is open."""
+
+
+class CircuitState(str, Enum):
+    """The state of a circuit breaker."""
+
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitBreaker:
+    """Fail fast while the aca-py admin api is unhealthy.
+
+    After failure_threshold consecutive failures (connection errors, timeouts or
+    5xx responses) the circuit opens and calls raise AcapyUnavailable without
+    reaching aca-py.  Once reset_timeout seconds have passed a single trial call
+    is let through (half open): the circuit closes if it succeeds, and opens
+    again if it fails.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        """Create a closed circuit breaker.
+
+        Args:
+            failure_threshold: consecutive failures that open the circuit
+            reset_timeout: seconds before a trial call is let through
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.closed
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+
+    def before_call(self):
+        """Raise AcapyUnavailable if a call must not be made now."""
+        if self.state == CircuitState.open:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise AcapyUnavailable("aca-py circuit breaker is open")
+            self.state = CircuitState.half_open
+            self._trial_in_flight = False
+        if self.state == CircuitState.half_open:
+            if self._trial_in_flight:
+                raise AcapyUnavailable("aca-py circuit breaker is half open")
+            self._trial_in_flight = True
+
+    def record_success(self):
+        """The call succeeded, close the circuit."""
+        if self.state != CircuitState.closed:
+            logger.warning(">>> aca-py circuit breaker closed")
+        self.state = CircuitState.closed
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        """The call failed, open the circuit after too many failures in a row."""
+        self.failures += 1
+        self._trial_in_flight = False
+        if (
+            self.state == CircuitState.half_open
+            or self.failures >= self.failure_threshold
+        ):
+            if self.state != CircuitState.open:
+                logger.warning(
+                    f">>> aca-py circuit breaker opened after {self.failures} failures"
+                )
+            self.state = CircuitState.open
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """The call was abandoned (e.g. cancelled) without an outcome."""
+        self._trial_in_flight = False
+
+    def describe(self) -> dict:
+        """The state, failure count and seconds until the next trial call."""
+        retry_in = None
+        if self.state == CircuitState.open:
+            elapsed = time.monotonic() - self.opened_at
+            retry_in = round(max(self.reset_timeout - elapsed, 0), 1)
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self.failures,
+            "retry_in": retry_in,
+        }
+
+
+acapy_circuit = CircuitBreaker(
+    settings.ACAPY_CIRCUIT_FAILURE_THRESHOLD, settings.ACAPY_CIRCUIT_RESET_TIMEOUT
+)
+
+
+def circuit_state() -> dict:
+    """The aca-py circuit breaker state, reported by the liveness route."""
+
+    return acapy_circuit.describe()
+
+
+def parse_endpoint_timeouts(value: str) -> dict[str, tuple[float, float]]:
+    """Parse "prefix=connect:read,..." into {prefix: (connect, read)}."""
+
+    timeouts = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        try:
+            prefix, times = entry.split("=")
+            connect, read = times.split(":")
+            timeouts[prefix.strip().strip("/")] = (float(connect), float(read))
+        except ValueError:
+            logger.warning(f">>> ignoring invalid aca-py endpoint timeout: {entry}")
+    return timeouts
+
+
+_endpoint_timeouts = parse_endpoint_timeouts(settings.ACAPY_CLIENT_ENDPOINT_TIMEOUTS)
+
+
+def request_timeout(path: str) -> ClientTimeout:
+    """Connect/read timeouts for a path, from the longest matching prefix."""
+
+    path = path.lstrip("/")
+    connect = settings.ACAPY_CLIENT_CONNECT_TIMEOUT
+    read = settings.ACAPY_CLIENT_READ_TIMEOUT
+    matched = ""
+    for prefix, timeouts in _endpoint_timeouts.items():
+        if path.startswith(prefix) and len(prefix) > len(matched):
+            matched = prefix
+            connect, read = timeouts
+    return ClientTimeout(total=None, connect=connect, sock_read=read)
+
+
+def is_acapy_failure(e: Exception) -> bool:
+    """Whether an error means aca-py is unhealthy (rather than the request bad)."""
+
+    if isinstance(e, (ClientConnectionError, asyncio.TimeoutError)):
+        return True
+    return isinstance(e, AcapyError) and e.status is not None and e.status >= 500
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one.
+
+    The first caller for a key starts the call, callers arriving while it is in
+    flight wait on the same task and get a copy of its result, or its exception.
+    Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        """Create an empty SingleFlight, with no calls in flight."""
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result of call(), or of the call in flight for the key.
+
+        Raises:
+            the exception raised by the call
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        # shielded, so a cancelled caller doesn't cancel the call for the others,
+        # and copied, as callers may modify the result they get
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # mark the exception as retrieved, even if every caller went away
+            task.exception()
+
+    def stats(self) -> dict:
+        """The number of calls made and coalesced, and of calls in flight."""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
+
+
+acapy_get_flights = SingleFlight()
+
+
+registry.gauge(
+    "endorser_acapy_circuit_open",
+    "1 while the aca-py circuit breaker is open or half open.",
+    callback=lambda: int(acapy_circuit.state != CircuitState.closed),
+)
+registry.gauge(
+    "endorser_acapy_coalesced_gets",
+    "aca-py GETs saved by sharing an identical in-flight call.",
+    callback=lambda: acapy_get_flights.coalesced,
+)
+
+
+def client_stats() -> dict:
+    """Circuit breaker state and GET coalescing counters of the aca-py client."""
+
+    return {"circuit": circuit_state(), "coalescing": acapy_get_flights.stats()}
+
+
+# app-scoped http session, shared by all aca-py admin calls
+_client_session: ClientSession | None = None
+
+
+def create_acapy_session() -> ClientSession:
+    """Create a pooled http session for the aca-py admin api."""
+
+    connector = TCPConnector(
+        limit=settings.ACAPY_CLIENT_CONN_LIMIT,
+        limit_per_host=settings.ACAPY_CLIENT_CONN_LIMIT_PER_HOST,
+        keepalive_timeout=settings.ACAPY_CLIENT_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=settings.ACAPY_CLIENT_DNS_CACHE_TTL,
+        use_dns_cache=True,
+    )
+    return ClientSession(connector=connector)
+
+
+async def start_acapy_session() -> ClientSession:
+    """Open the shared aca-py admin session (called on app startup)."""
+
+    global _client_session
+    if _client_session is None or _client_session.closed:
+        _client_session = create_acapy_session()
+        logger.info(">>> opened aca-py admin client session")
+    return _client_session
+
+
+async def close_acapy_session():
+    """Close the shared aca-py admin session (called on app shutdown)."""
+
+    global _client_session
+    if _client_session is not None and not _client_session.closed:
+        await _client_session.close()
+        logger.info(">>> closed aca-py admin client session")
+    _client_session = None
+
+
+def get_acapy_session() -> ClientSession:
+    """Return the shared aca-py admin session.
+
+    The session is normally opened by the app startup hook, but is created on
+    first use if the module is used outside of the FastAPI app.
+    """
+
+    global _client_session
+    if _client_session is None or _client_session.closed:
+        _client_session = create_acapy_session()
+    return _client_session
 
 
 def get_acapy_headers(headers=None, tenant=False) -> dict:
@@ -30,6 +314,10 @@ async def acapy_admin_request(
     Generic routine to call an Aca-Py admin api.
 
     Default headers are used if not supplied, and security headers are injected.
+    Each call has connect/read timeouts (see request_timeout), GETs are retried
+    on connection errors, timeouts and 5xx responses, and calls fail fast with
+    AcapyUnavailable while the circuit breaker is open.  Identical concurrent
+    GETs are coalesced into one call.
 
     Args:
         method: http method (i.e. GET, POST, etc)
@@ -44,32 +332,118 @@ async def acapy_admin_request(
         aiohttp response object
     """
     params = {k: v for (k, v) in (params or {}).items() if v is not None}
-    url = f"{settings.ACAPY_ADMIN_URL}/{path}"
+    headers = get_acapy_headers(headers, tenant)
+
+    if method == "GET":
+        # identical concurrent GETs share one call to aca-py
+        key = (
+            path,
+            text,
+            tuple(sorted((k, str(v)) for k, v in params.items())),
+            tuple(sorted(headers.items())),
+        )
+        return await acapy_get_flights.do(
+            key,
+            lambda: _request_with_retries(method, path, data, text, params, headers),
+        )
+    return await _request_with_retries(method, path, data, text, params, headers)
+
+
+async def _request_with_retries(method, path, data, text, params, headers):
+    # only GETs are safe to repeat
+    attempts = 1 + (settings.ACAPY_CLIENT_GET_RETRIES if method == "GET" else 0)
+    for attempt in range(attempts):
+        try:
+            return await _call_acapy(method, path, data, text, params, headers)
+        except Exception as e:
+            if attempt + 1 >= attempts or not is_acapy_failure(e):
+                raise
+            # full jitter, so retries from concurrent callers don't line up
+            delay = random.uniform(0, settings.ACAPY_CLIENT_RETRY_DELAY * 2**attempt)
+            logger.warning(
+                f">>> retrying aca-py {method} {path} in {delay:.2f}s: {e!r}"
+            )
+            await asyncio.sleep(delay)
+
+
+async def _call_acapy(method, path, data, text, params, headers):
+    """Make one aca-py admin call, through the circuit breaker."""
+
+    acapy_circuit.before_call()
+    started = time.perf_counter()
+    with tracer.span(f"acapy {method} {path_template(path)}", path=path) as span:
+        try:
+            result = await _send_acapy_request(
+                method, path, data, text, params, headers
+            )
+        except Exception as e:
+            if is_acapy_failure(e):
+                acapy_circuit.record_failure()
+            else:
+                acapy_circuit.record_success()
+            _record_call(method, path, call_result(e), started, span)
+            raise
+        except BaseException:
+            acapy_circuit.release()
+            raise
+        acapy_circuit.record_success()
+        _record_call(method, path, "ok", started, span)
+        return result
 
-    # TODO where should this live, and how do we want to handle HTTP sessions?
-    async with ClientSession() as client_session:
-        headers = get_acapy_headers(headers, tenant)
-        async with client_session.request(
-            method,
-            url,
-            json=data,
-            params=params,
-            headers=headers,
-        ) as resp:
-            resp_text = await resp.text()
+
+def path_template(path: str) -> str:
+    """The path with its ids replaced, e.g. "schemas/{id}", to label metrics."""
+
+    return "/".join(
+        "{id}" if any(c.isdigit() for c in segment) else segment
+        for segment in path.strip("/").split("/")
+    )
+
+
+def call_result(e: Exception) -> str:
+    """The result label of a failed call, for the request metrics."""
+    if isinstance(e, AcapyError) and e.status is not None:
+        return f"{e.status // 100}xx"
+    if isinstance(e, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(e, ClientConnectionError):
+        return "connection_error"
+    return "error"
+
+
+def _record_call(method: str, path: str, result: str, started: float, span=None):
+    ACAPY_REQUEST_DURATION.observe(
+        time.perf_counter() - started, method, path_template(path), result
+    )
+    if span is not None:
+        span.set_attribute("result", result)
+
+
+async def _send_acapy_request(method, path, data, text, params, headers):
+    url = f"{settings.ACAPY_ADMIN_URL}/{path}"
+    client_session = get_acapy_session()
+    async with client_session.request(
+        method,
+        url,
+        json=data,
+        params=params,
+        headers=headers,
+        timeout=request_timeout(path),
+    ) as resp:
+        resp_text = await resp.text()
+        try:
+            resp.raise_for_status()
+        except Exception as e:
+            # try to retrieve and print text on error
+            raise AcapyError(f"Error: {resp_text}", resp.status) from e
+        if not resp_text and not text:
+            return None
+        if not text:
             try:
-                resp.raise_for_status()
-            except Exception as e:
-                # try to retrieve and print text on error
-                raise Exception(f"Error: {resp_text}") from e
-            if not resp_text and not text:
-                return None
-            if not text:
-                try:
-                    return json.loads(resp_text)
-                except json.JSONDecodeError as e:
-                    raise Exception(f"Error decoding JSON: {resp_text}") from e
-            return resp_text
+                return json.loads(resp_text)
+            except json.JSONDecodeError as e:
+                raise Exception(f"Error decoding JSON: {resp_text}") from e
+        return resp_text
 
 
 async def acapy_GET(path, text=False, params=None, headers=None) -> ClientResponse:
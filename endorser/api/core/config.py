@@ -90,6 +90,149 @@ class GlobalConfig(BaseSettings):
     ACAPY_ADMIN_URL_API_KEY: str = os.environ.get("ACAPY_API_ADMIN_KEY", "change-me")
     ACAPY_WALLET_AUTH_TOKEN: str | None = os.environ.get("ACAPY_WALLET_AUTH_TOKEN")
 
+    # pooled http client used for all aca-py admin calls
+    ACAPY_CLIENT_CONN_LIMIT: int = int(os.environ.get("ACAPY_CLIENT_CONN_LIMIT", 100))
+    ACAPY_CLIENT_CONN_LIMIT_PER_HOST: int = int(
+        os.environ.get("ACAPY_CLIENT_CONN_LIMIT_PER_HOST", 50)
+    )
+    ACAPY_CLIENT_KEEPALIVE_TIMEOUT: float = float(
+        os.environ.get("ACAPY_CLIENT_KEEPALIVE_TIMEOUT", 30)
+    )
+    ACAPY_CLIENT_DNS_CACHE_TTL: int = int(
+        os.environ.get("ACAPY_CLIENT_DNS_CACHE_TTL", 300)
+    )
+
+    # aca-py admin call timeouts (seconds), overridden per path prefix with
+    # "prefix=connect:read" entries, e.g. "schemas=5:60,ledger=5:60"
+    ACAPY_CLIENT_CONNECT_TIMEOUT: float = float(
+        os.environ.get("ACAPY_CLIENT_CONNECT_TIMEOUT", 5)
+    )
+    ACAPY_CLIENT_READ_TIMEOUT: float = float(
+        os.environ.get("ACAPY_CLIENT_READ_TIMEOUT", 30)
+    )
+    ACAPY_CLIENT_ENDPOINT_TIMEOUTS: str = os.environ.get(
+        "ACAPY_CLIENT_ENDPOINT_TIMEOUTS",
+        "schemas=5:60,credential-definitions=5:60,ledger=5:60",
+    )
+
+    # GETs are retried on connection errors, timeouts and 5xx responses, after
+    # a random delay of up to ACAPY_CLIENT_RETRY_DELAY * 2^attempt
+    ACAPY_CLIENT_GET_RETRIES: int = int(os.environ.get("ACAPY_CLIENT_GET_RETRIES", 2))
+    ACAPY_CLIENT_RETRY_DELAY: float = float(
+        os.environ.get("ACAPY_CLIENT_RETRY_DELAY", 0.5)
+    )
+
+    # fail fast after this many consecutive aca-py failures, for the reset timeout
+    ACAPY_CIRCUIT_FAILURE_THRESHOLD: int = int(
+        os.environ.get("ACAPY_CIRCUIT_FAILURE_THRESHOLD", 5)
+    )
+    ACAPY_CIRCUIT_RESET_TIMEOUT: float = float(
+        os.environ.get("ACAPY_CIRCUIT_RESET_TIMEOUT", 30)
+    )
+
+    # tracing: "" (off), "jsonl" (to ENDORSER_TRACE_FILE) or "module:ExporterClass"
+    ENDORSER_TRACE_EXPORTER: str = os.environ.get("ENDORSER_TRACE_EXPORTER", "")
+    ENDORSER_TRACE_FILE: str = os.environ.get("ENDORSER_TRACE_FILE", "traces.jsonl")
+
+    # serve /metrics without an endorser token, e.g. for a scraper on a private network
+    ENDORSER_METRICS_PUBLIC: bool = to_bool(
+        os.environ.get("ENDORSER_METRICS_PUBLIC", "false")
+    )
+
+    # seconds to cache the endorser's public did between aca-py lookups
+    ENDORSER_DID_CACHE_TTL: int = int(os.environ.get("ENDORSER_DID_CACHE_TTL", 300))
+
+    # max number of ledger schema ids cached for auto-endorse checks
+    ENDORSER_SCHEMA_CACHE_SIZE: int = int(
+        os.environ.get("ENDORSER_SCHEMA_CACHE_SIZE", 1024)
+    )
+
+    # queue webhooks in the database and process them in the background
+    ENDORSER_WEBHOOK_QUEUE: bool = to_bool(
+        os.environ.get("ENDORSER_WEBHOOK_QUEUE", "false")
+    )
+    ENDORSER_WEBHOOK_WORKERS: int = int(os.environ.get("ENDORSER_WEBHOOK_WORKERS", 4))
+    ENDORSER_WEBHOOK_MAX_ATTEMPTS: int = int(
+        os.environ.get("ENDORSER_WEBHOOK_MAX_ATTEMPTS", 5)
+    )
+    ENDORSER_WEBHOOK_RETRY_DELAY: float = float(
+        os.environ.get("ENDORSER_WEBHOOK_RETRY_DELAY", 2)
+    )
+    ENDORSER_WEBHOOK_POLL_INTERVAL: float = float(
+        os.environ.get("ENDORSER_WEBHOOK_POLL_INTERVAL", 1)
+    )
+    ENDORSER_WEBHOOK_LEASE_TIMEOUT: int = int(
+        os.environ.get("ENDORSER_WEBHOOK_LEASE_TIMEOUT", 300)
+    )
+
+    # number of recently processed webhooks remembered to skip redeliveries
+    ENDORSER_WEBHOOK_DEDUP_CACHE_SIZE: int = int(
+        os.environ.get("ENDORSER_WEBHOOK_DEDUP_CACHE_SIZE", 10000)
+    )
+    # days to keep the receipts of processed webhooks (0 to keep them)
+    ENDORSER_WEBHOOK_RECEIPT_RETENTION_DAYS: int = int(
+        os.environ.get("ENDORSER_WEBHOOK_RECEIPT_RETENTION_DAYS", 7)
+    )
+
+    # aca-py admin calls recorded while processing webhooks (the outbox)
+    ENDORSER_OUTBOX_MAX_ATTEMPTS: int = int(
+        os.environ.get("ENDORSER_OUTBOX_MAX_ATTEMPTS", 5)
+    )
+    ENDORSER_OUTBOX_RETRY_DELAY: int = int(
+        os.environ.get("ENDORSER_OUTBOX_RETRY_DELAY", 2)
+    )
+    ENDORSER_OUTBOX_POLL_INTERVAL: int = int(
+        os.environ.get("ENDORSER_OUTBOX_POLL_INTERVAL", 1)
+    )
+    ENDORSER_OUTBOX_LEASE_TIMEOUT: int = int(
+        os.environ.get("ENDORSER_OUTBOX_LEASE_TIMEOUT", 300)
+    )
+
+    # re-checking pending transactions when the allow lists change
+    ENDORSER_REEVALUATE_CONCURRENCY: int = int(
+        os.environ.get("ENDORSER_REEVALUATE_CONCURRENCY", 4)
+    )
+    ENDORSER_REEVALUATE_BATCH_SIZE: int = int(
+        os.environ.get("ENDORSER_REEVALUATE_BATCH_SIZE", 100)
+    )
+
+    # bulk endorse/reject: concurrent aca-py calls, transactions per commit
+    ENDORSER_BULK_CONCURRENCY: int = int(
+        os.environ.get("ENDORSER_BULK_CONCURRENCY", 16)
+    )
+    ENDORSER_BULK_BATCH_SIZE: int = int(
+        os.environ.get("ENDORSER_BULK_BATCH_SIZE", 500)
+    )
+
+    # periodic reconciliation with aca-py (seconds between passes, 0 to disable)
+    ENDORSER_RECONCILE_INTERVAL: int = int(
+        os.environ.get("ENDORSER_RECONCILE_INTERVAL", 300)
+    )
+    ENDORSER_RECONCILE_PAGE_SIZE: int = int(
+        os.environ.get("ENDORSER_RECONCILE_PAGE_SIZE", 100)
+    )
+    ENDORSER_RECONCILE_CONCURRENCY: int = int(
+        os.environ.get("ENDORSER_RECONCILE_CONCURRENCY", 4)
+    )
+
+    # seconds between adding up the new transaction report counts (0 to disable)
+    ENDORSER_REPORT_ROLLUP_INTERVAL: int = int(
+        os.environ.get("ENDORSER_REPORT_ROLLUP_INTERVAL", 60)
+    )
+
+    # rows fetched (and sent) at a time by the transaction export
+    ENDORSER_EXPORT_BATCH_SIZE: int = int(
+        os.environ.get("ENDORSER_EXPORT_BATCH_SIZE", 1000)
+    )
+
+    # allow list csv uploads: rows loaded at a time, invalid rows reported
+    ENDORSER_ALLOW_IMPORT_CHUNK_SIZE: int = int(
+        os.environ.get("ENDORSER_ALLOW_IMPORT_CHUNK_SIZE", 5000)
+    )
+    ENDORSER_ALLOW_IMPORT_MAX_ERRORS: int = int(
+        os.environ.get("ENDORSER_ALLOW_IMPORT_MAX_ERRORS", 100)
+    )
+
     ENDORSER_API_ADMIN_USER: str = os.environ.get("ENDORSER_API_ADMIN_USER", "endorser")
     ENDORSER_API_ADMIN_KEY: str = os.environ.get("ENDORSER_API_ADMIN_KEY", "change-me")
 
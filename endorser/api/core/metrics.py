@@ -0,0 +1,315 @@
+"""In-process metrics, exposed in the Prometheus text format on /metrics.
+
+Recording is a dict lookup and an addition (histograms add a bisect), with no
+locking as everything runs on the event loop, so metrics stay enabled on the
+hot path.  Gauges can be backed by a callback that is only called when the
+metrics are scraped.
+"""
+
+import bisect
+import logging
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = tuple[str, ...]
+
+# seconds, from a fast db lookup up to a slow ledger call
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """A named metric, with a value per combination of label values."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()):
+        """Create the metric.
+
+        Args:
+            name: the metric name, e.g. endorser_webhooks_total
+            documentation: the HELP text
+            labelnames: the label names, the values are passed in the same order
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def header(self) -> list[str]:
+        """The HELP and TYPE lines."""
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+
+    def render(self) -> list[str]:
+        """The sample lines, one per combination of label values."""
+        raise NotImplementedError()
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()):
+        """Create the counter, with no values (they start at 0)."""
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        """Add amount to the value for the label values."""
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        """The value for the label values."""
+        return self._values.get(labels, 0)
+
+    def render(self) -> list[str]:
+        """The sample lines, one per combination of label values."""
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)}"
+            f" {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Metric):
+    """A value that is set, or read from a callback when scraped.
+
+    The callback returns the value, or for a labelled gauge a dict of
+    {label values: value}.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        callback: Callable[[], float | dict[Labels, float]] | None = None,
+    ):
+        """Create the gauge, read from callback (if given) rather than set."""
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self._values: dict[Labels, float] = {}
+
+    def set(self, value: float, *labels: str):
+        """Set the value for the label values."""
+        self._values[labels] = value
+
+    def render(self) -> list[str]:
+        """The sample lines, calling the callback (if any) for the values."""
+        values = self._values
+        if self.callback is not None:
+            try:
+                result = self.callback()
+            except Exception as e:
+                logger.warning(f">>> unable to read gauge {self.name}: {e}")
+                return []
+            values = result if isinstance(result, dict) else {(): result}
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)}"
+            f" {_format_value(value)}"
+            for labels, value in values.items()
+        ]
+
+
+class _HistogramValues:
+    """The bucket counts, sum and count for one combination of label values."""
+
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(Metric):
+    """Observed values counted into buckets, with their sum and count."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        """Create the histogram, with the upper bounds of its buckets."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: dict[Labels, _HistogramValues] = {}
+
+    def observe(self, value: float, *labels: str):
+        """Record a value for the label values."""
+        values = self._values.get(labels)
+        if values is None:
+            # the last bucket is +Inf
+            values = self._values[labels] = _HistogramValues(len(self.buckets) + 1)
+        values.buckets[bisect.bisect_left(self.buckets, value)] += 1
+        values.sum += value
+        values.count += 1
+
+    def count(self, *labels: str) -> int:
+        """The number of values recorded for the label values."""
+        values = self._values.get(labels)
+        return values.count if values else 0
+
+    def render(self) -> list[str]:
+        """The bucket, sum and count lines, for each combination of label values."""
+        lines = []
+        bucket_names = self.labelnames + ("le",)
+        for labels, values in self._values.items():
+            cumulative = 0
+            for le, bucket_count in zip(
+                self.buckets + (float("inf"),), values.buckets
+            ):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(
+                    bucket_names, labels + (_format_value(le),)
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(values.sum)}")
+            lines.append(f"{self.name}_count{label_str} {values.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics exposed on /metrics."""
+
+    def __init__(self):
+        """Create an empty registry."""
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric.
+
+        Raises:
+            ValueError: if a metric with the same name is registered
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Labels = ()):
+        """Create and register a Counter."""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        callback: Callable[[], float | dict[Labels, float]] | None = None,
+    ):
+        """Create and register a Gauge."""
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        """Create and register a Histogram."""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """All the metrics, in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+WEBHOOKS = registry.counter(
+    "endorser_webhooks_total",
+    "Webhooks received from aca-py, by result (processed, duplicate, failed).",
+    ("topic", "state", "result"),
+)
+WEBHOOK_DURATION = registry.histogram(
+    "endorser_webhook_duration_seconds",
+    "Time to process a webhook (handlers and auto-steppers).",
+    ("topic", "state"),
+)
+DECISIONS = registry.counter(
+    "endorser_auto_endorse_decisions_total",
+    "Auto-endorse decisions on received transactions, by the deciding rule.",
+    ("outcome", "rule", "transaction_type"),
+)
+ACAPY_REQUEST_DURATION = registry.histogram(
+    "endorser_acapy_request_duration_seconds",
+    "aca-py admin api call latency, per path template.",
+    ("method", "path", "result"),
+)
+REEVALUATION_DURATION = registry.histogram(
+    "endorser_reevaluation_duration_seconds",
+    "Time to re-check the pending transactions after an allow list change.",
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+REEVALUATION_TRANSACTIONS = registry.counter(
+    "endorser_reevaluation_transactions_total",
+    "Pending transactions re-checked after an allow list change, by result.",
+    ("result",),
+)
+OUTBOX_DEAD_CALLS = registry.gauge(
+    "endorser_acapy_outbox_dead_calls",
+    "aca-py calls that failed ENDORSER_OUTBOX_MAX_ATTEMPTS times, until retried.",
+)
+RECONCILE_RUNS = registry.counter(
+    "endorser_reconcile_runs_total",
+    "Reconciliation passes, by result (completed, skipped, failed).",
+    ("result",),
+)
+RECONCILE_DURATION = registry.histogram(
+    "endorser_reconcile_duration_seconds",
+    "Time to reconcile the local tables with aca-py.",
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+RECONCILE_DRIFT = registry.counter(
+    "endorser_reconcile_drift_total",
+    "Records out of step with aca-py, by drift (missing, state, unhandled).",
+    ("topic", "drift"),
+)
@@ -0,0 +1,233 @@
+"""Lightweight tracing of webhook processing, database and aca-py calls.
+
+Spans nest through a context variable, so a span started while another is
+active (in the same task, or a task created from it) becomes its child.  The
+trace id of a request is the starlette_context request id, so the spans of a
+request can be matched with its log lines and X-Request-ID header.
+
+Finished spans are handed to the configured exporter:
+
+- ENDORSER_TRACE_EXPORTER="" (default) - tracing is off, spans cost nothing
+- ENDORSER_TRACE_EXPORTER="jsonl" - one JSON object per line, appended to
+  ENDORSER_TRACE_FILE, to analyse offline without a collector
+- ENDORSER_TRACE_EXPORTER="package.module:ClassName" - any SpanExporter
+"""
+
+import functools
+import importlib
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Iterator
+
+from starlette_context import context, plugins
+
+from api.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    """A timed operation, with its place in the trace and its attributes.
+
+    The times are epoch seconds, end_time, duration_ms (and error, if it
+    failed) are set when the span ends.
+    """
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_time: float
+    end_time: float | None = None
+    duration_ms: float | None = None
+    error: str | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    def set_attribute(self, key: str, value: Any):
+        """Add (or replace) an attribute."""
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        """The span as a dict, for the exporters."""
+        return asdict(self)
+
+
+class SpanExporter:
+    """Receives each finished span, subclass to send spans elsewhere."""
+
+    def export(self, span: Span):
+        """Send (or buffer) a finished span."""
+        raise NotImplementedError()
+
+    def flush(self):
+        """Send any buffered spans."""
+        pass
+
+    def shutdown(self):
+        """Flush, the app is stopping."""
+        self.flush()
+
+
+class JsonLinesExporter(SpanExporter):
+    """Append spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str | None = None, buffer_size: int = 100):
+        """Create the exporter.
+
+        Args:
+            path: the file (default ENDORSER_TRACE_FILE)
+            buffer_size: spans buffered before they are written
+        """
+        self.path = path or settings.ENDORSER_TRACE_FILE
+        self.buffer_size = buffer_size
+        self._buffer: list[str] = []
+
+    def export(self, span: Span):
+        """Buffer a span, writing the buffer once it is full."""
+        self._buffer.append(json.dumps(span.to_dict(), default=str))
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered spans, a write error drops them."""
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        try:
+            with open(self.path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.warning(f">>> unable to write traces to {self.path}: {e}")
+
+
+def load_exporter(name: str) -> SpanExporter | None:
+    """The exporter for an ENDORSER_TRACE_EXPORTER value (None for no tracing).
+
+    An exporter that can't be loaded is logged and tracing is turned off,
+    rather than stopping the app from starting.
+    """
+    if not name:
+        return None
+    if name == "jsonl":
+        return JsonLinesExporter()
+    module_name, _, class_name = name.partition(":")
+    try:
+        return getattr(importlib.import_module(module_name), class_name)()
+    except Exception as e:
+        logger.error(f">>> unable to load trace exporter {name}, tracing is off: {e}")
+        return None
+
+
+def request_trace_id() -> str:
+    """The starlette_context request id, or a new id outside of a request."""
+    if context.exists():
+        request_id = context.get(plugins.RequestIdPlugin.key)
+        if request_id:
+            return str(request_id)
+    return uuid.uuid4().hex
+
+
+class Tracer:
+    """Starts and ends spans, and hands the finished spans to the exporter."""
+
+    def __init__(self, exporter: SpanExporter | None = None):
+        """Create the tracer, tracing is off without an exporter."""
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        """Whether spans are recorded."""
+        return self.exporter is not None
+
+    def start_span(self, name: str, **attributes) -> Span | None:
+        """Start a span as a child of the current one, end it with end_span()."""
+        if self.exporter is None:
+            return None
+        parent = _current_span.get()
+        if parent is None:
+            trace_id, parent_id = request_trace_id(), None
+            if context.exists() and context.get(plugins.CorrelationIdPlugin.key):
+                attributes["correlation_id"] = context[plugins.CorrelationIdPlugin.key]
+        else:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        return Span(
+            name=name,
+            trace_id=trace_id,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent_id,
+            start_time=time.time(),
+            attributes=attributes,
+        )
+
+    def end_span(self, span: Span | None, error: BaseException | None = None):
+        """End a span from start_span() and export it, with the error if it failed."""
+        if span is None or self.exporter is None:
+            return
+        span.end_time = time.time()
+        span.duration_ms = round((span.end_time - span.start_time) * 1000, 3)
+        if error is not None:
+            span.error = repr(error)
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.warning(f">>> unable to export span {span.name}: {e}")
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span | None]:
+        """Run a block in a span, nested under the current span."""
+        span = self.start_span(name, **attributes)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _current_span.reset(token)
+
+    def shutdown(self):
+        """Shut the exporter down, flushing its buffered spans."""
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+tracer = Tracer(load_exporter(settings.ENDORSER_TRACE_EXPORTER))
+
+
+def span(name: str, **attributes):
+    """Run a block in a span of the app's tracer (see Tracer.span)."""
+    return tracer.span(name, **attributes)
+
+
+def current_span() -> Span | None:
+    """The active span, None outside of a span or when tracing is off."""
+    return _current_span.get()
+
+
+def traced(name: str | None = None):
+    """Decorator that runs an async function in a span."""
+
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
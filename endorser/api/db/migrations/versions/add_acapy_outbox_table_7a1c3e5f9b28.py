@@ -0,0 +1,74 @@
+"""add acapy outbox table
+
+Revision ID: 7a1c3e5f9b28
+Revises: 5b7e2c9d4f13
+Create Date: 2026-10-18 12:48:05.611274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "7a1c3e5f9b28"
+down_revision = "5b7e2c9d4f13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "acapyoutbox",
+        sa.Column(
+            "acapy_outbox_id",
+            postgresql.UUID(as_uuid=True),
+            server_default=sa.text("gen_random_uuid()"),
+            nullable=False,
+        ),
+        sa.Column("seq", sa.BigInteger(), sa.Identity(always=True), nullable=False),
+        sa.Column("ordering_key", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("method", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("path", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("params", postgresql.JSONB(), nullable=True),
+        sa.Column("transaction_id", sqlmodel.sql.sqltypes.GUID(), nullable=True),
+        sa.Column("status", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column(
+            "next_attempt_at",
+            postgresql.TIMESTAMP(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "created_at",
+            postgresql.TIMESTAMP(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            postgresql.TIMESTAMP(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("acapy_outbox_id"),
+    )
+    op.create_index(
+        "ix_acapyoutbox_status_next_attempt_at",
+        "acapyoutbox",
+        ["status", "next_attempt_at"],
+    )
+    op.create_index(
+        "ix_acapyoutbox_ordering_key_seq",
+        "acapyoutbox",
+        ["ordering_key", "seq"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_acapyoutbox_ordering_key_seq", table_name="acapyoutbox")
+    op.drop_index("ix_acapyoutbox_status_next_attempt_at", table_name="acapyoutbox")
+    op.drop_table("acapyoutbox")
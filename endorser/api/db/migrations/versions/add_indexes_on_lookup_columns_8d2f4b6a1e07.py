@@ -0,0 +1,123 @@
+"""add indexes on lookup columns
+
+Revision ID: 8d2f4b6a1e07
+Revises: 3c5a7e91d2b4
+Create Date: 2026-10-18 11:02:17.481920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = "8d2f4b6a1e07"
+down_revision = "3c5a7e91d2b4"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_allowedcredentialdefinition_match", "allowedcredentialdefinition"),
+    ("ix_allowedschema_match", "allowedschema"),
+    ("ix_contact_state_created_at", "contact"),
+    ("ix_endorserequest_pending_created_at", "endorserequest"),
+    ("ix_endorserequest_connection_id_created_at", "endorserequest"),
+    ("ix_endorserequest_state_created_at", "endorserequest"),
+    ("ix_endorserequest_transaction_id", "endorserequest"),
+]
+
+
+def upgrade():
+    # redelivered webhooks may have stored a request more than once, keep the
+    # most recently updated row of each transaction so the unique index builds
+    op.execute("""
+        DELETE FROM endorserequest
+        WHERE endorse_request_id IN (
+            SELECT endorse_request_id FROM (
+                SELECT endorse_request_id, row_number() OVER (
+                    PARTITION BY transaction_id
+                    ORDER BY updated_at DESC, created_at DESC, endorse_request_id
+                ) AS n
+                FROM endorserequest
+            ) AS requests
+            WHERE n > 1
+        )
+        """)
+    # a failed concurrent build leaves an invalid index behind, drop it so the
+    # upgrade can be run again
+    invalid = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT c.relname FROM pg_index i"
+                " JOIN pg_class c ON c.oid = i.indexrelid"
+                " WHERE NOT i.indisvalid AND c.relname = ANY(:names)"
+            ),
+            {"names": [name for name, _ in INDEXES]},
+        )
+        .scalars()
+        .all()
+    )
+
+    # build the indexes without locking out writes on large tables
+    with op.get_context().autocommit_block():
+        for name in invalid:
+            op.drop_index(name, postgresql_concurrently=True)
+        op.create_index(
+            "ix_endorserequest_transaction_id",
+            "endorserequest",
+            ["transaction_id"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_endorserequest_state_created_at",
+            "endorserequest",
+            ["state", sa.text("created_at DESC")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_endorserequest_connection_id_created_at",
+            "endorserequest",
+            ["connection_id", sa.text("created_at DESC")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_endorserequest_pending_created_at",
+            "endorserequest",
+            [sa.text("created_at DESC")],
+            postgresql_where=sa.text("state = 'request_received'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_contact_state_created_at",
+            "contact",
+            ["state", sa.text("created_at DESC")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_allowedschema_match",
+            "allowedschema",
+            ["author_did", "schema_name", "version"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_allowedcredentialdefinition_match",
+            "allowedcredentialdefinition",
+            ["creddef_author_did", "schema_issuer_did", "schema_name", "version", "tag"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,31 @@
+"""add pending transaction type/author index
+
+Revision ID: 5b7e2c9d4f13
+Revises: 8d2f4b6a1e07
+Create Date: 2026-10-18 12:14:39.205116
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "5b7e2c9d4f13"
+down_revision = "8d2f4b6a1e07"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_endorserequest_pending_type_author",
+            "endorserequest",
+            ["transaction_type", "author_did"],
+            postgresql_where=sa.text("state = 'request_received'"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    op.drop_index("ix_endorserequest_pending_type_author", table_name="endorserequest")
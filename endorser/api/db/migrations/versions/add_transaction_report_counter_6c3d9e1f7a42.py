@@ -0,0 +1,104 @@
+"""add transaction report counter table
+
+Revision ID: 6c3d9e1f7a42
+Revises: 2e6f8a0c4d59
+Create Date: 2026-10-18 16:02:11.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "6c3d9e1f7a42"
+down_revision = "2e6f8a0c4d59"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "transactionreportcounter",
+        sa.Column("connection_id", sqlmodel.sql.sqltypes.GUID(), nullable=False),
+        sa.Column(
+            "transaction_type", sqlmodel.sql.sqltypes.AutoString(), nullable=False
+        ),
+        sa.Column("state", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("bucket", postgresql.TIMESTAMP(), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("connection_id", "transaction_type", "state", "bucket"),
+    )
+    op.create_index(
+        "ix_transactionreportcounter_bucket",
+        "transactionreportcounter",
+        ["bucket"],
+        unique=False,
+    )
+
+    # count each insert and state change, in the same transaction
+    op.execute("""
+        CREATE FUNCTION endorserequest_report_counter() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO transactionreportcounter
+                (connection_id, transaction_type, state, bucket, count)
+            VALUES (
+                NEW.connection_id,
+                coalesce(NEW.transaction_type, ''),
+                coalesce(NEW.state, ''),
+                date_trunc('hour', localtimestamp),
+                1
+            )
+            ON CONFLICT (connection_id, transaction_type, state, bucket)
+            DO UPDATE SET count = transactionreportcounter.count + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """)
+    op.execute("""
+        CREATE TRIGGER endorserequest_report_counter_insert
+        AFTER INSERT ON endorserequest
+        FOR EACH ROW EXECUTE FUNCTION endorserequest_report_counter()
+        """)
+    op.execute("""
+        CREATE TRIGGER endorserequest_report_counter_update
+        AFTER UPDATE OF state ON endorserequest
+        FOR EACH ROW WHEN (OLD.state IS DISTINCT FROM NEW.state)
+        EXECUTE FUNCTION endorserequest_report_counter()
+        """)
+
+    # backfill from the existing requests: only their creation and current state
+    # are known, so count them as received when created and as having entered
+    # their current state when last updated
+    op.execute("""
+        INSERT INTO transactionreportcounter
+            (connection_id, transaction_type, state, bucket, count)
+        SELECT connection_id, transaction_type, state, bucket, sum(n)
+        FROM (
+            SELECT connection_id, coalesce(transaction_type, '') AS transaction_type,
+                'request_received' AS state,
+                date_trunc('hour', created_at) AS bucket, 1 AS n
+            FROM endorserequest
+            WHERE state IS DISTINCT FROM 'request_received'
+            UNION ALL
+            SELECT connection_id, coalesce(transaction_type, ''),
+                coalesce(state, ''), date_trunc('hour', updated_at), 1
+            FROM endorserequest
+        ) AS events
+        GROUP BY connection_id, transaction_type, state, bucket
+        """)
+
+
+def downgrade():
+    op.execute(
+        "DROP TRIGGER IF EXISTS endorserequest_report_counter_update ON endorserequest"
+    )
+    op.execute(
+        "DROP TRIGGER IF EXISTS endorserequest_report_counter_insert ON endorserequest"
+    )
+    op.execute("DROP FUNCTION IF EXISTS endorserequest_report_counter()")
+    op.drop_index(
+        "ix_transactionreportcounter_bucket", table_name="transactionreportcounter"
+    )
+    op.drop_table("transactionreportcounter")
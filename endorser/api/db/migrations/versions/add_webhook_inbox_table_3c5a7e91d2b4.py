@@ -0,0 +1,73 @@
+"""add webhook inbox table
+
+Revision ID: 3c5a7e91d2b4
+Revises: f4e857e3d8eb
+Create Date: 2026-10-18 09:12:41.205163
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "3c5a7e91d2b4"
+down_revision = "f4e857e3d8eb"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "webhookinbox",
+        sa.Column(
+            "webhook_inbox_id",
+            postgresql.UUID(as_uuid=True),
+            server_default=sa.text("gen_random_uuid()"),
+            nullable=False,
+        ),
+        sa.Column("seq", sa.BigInteger(), sa.Identity(always=True), nullable=False),
+        sa.Column("topic", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("state", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("ordering_key", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("payload", postgresql.JSONB(), nullable=False),
+        sa.Column("status", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column(
+            "next_attempt_at",
+            postgresql.TIMESTAMP(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "created_at",
+            postgresql.TIMESTAMP(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            postgresql.TIMESTAMP(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("webhook_inbox_id"),
+    )
+    op.create_index(
+        "ix_webhookinbox_status_next_attempt_at",
+        "webhookinbox",
+        ["status", "next_attempt_at"],
+    )
+    op.create_index(
+        "ix_webhookinbox_ordering_key_seq",
+        "webhookinbox",
+        ["ordering_key", "seq"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_webhookinbox_ordering_key_seq", table_name="webhookinbox")
+    op.drop_index("ix_webhookinbox_status_next_attempt_at", table_name="webhookinbox")
+    op.drop_table("webhookinbox")
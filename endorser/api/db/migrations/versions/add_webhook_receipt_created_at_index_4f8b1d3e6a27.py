@@ -0,0 +1,30 @@
+"""add webhook receipt created_at index
+
+Revision ID: 4f8b1d3e6a27
+Revises: 9e4a7b2c5d18
+Create Date: 2026-10-18 17:42:08.514203
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "4f8b1d3e6a27"
+down_revision = "9e4a7b2c5d18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the table has a row per webhook received so far
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_webhookreceipt_created_at",
+            "webhookreceipt",
+            ["created_at"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    op.drop_index("ix_webhookreceipt_created_at", table_name="webhookreceipt")
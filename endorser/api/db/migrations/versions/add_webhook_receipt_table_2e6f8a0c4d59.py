@@ -0,0 +1,38 @@
+"""add webhook receipt table
+
+Revision ID: 2e6f8a0c4d59
+Revises: 7a1c3e5f9b28
+Create Date: 2026-10-18 13:31:52.903418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "2e6f8a0c4d59"
+down_revision = "7a1c3e5f9b28"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "webhookreceipt",
+        sa.Column("topic", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("object_id", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("state", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column(
+            "created_at",
+            postgresql.TIMESTAMP(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("topic", "object_id", "state"),
+    )
+
+
+def downgrade():
+    op.drop_table("webhookreceipt")
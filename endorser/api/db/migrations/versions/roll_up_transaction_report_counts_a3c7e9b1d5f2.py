@@ -0,0 +1,103 @@
+"""roll up transaction report counts
+
+Revision ID: a3c7e9b1d5f2
+Revises: 4f8b1d3e6a27
+Create Date: 2026-10-18 19:12:40.337816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "a3c7e9b1d5f2"
+down_revision = "4f8b1d3e6a27"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "transactionreportdelta",
+        sa.Column("id", sa.BigInteger(), sa.Identity(always=True), nullable=False),
+        sa.Column("connection_id", sqlmodel.sql.sqltypes.GUID(), nullable=False),
+        sa.Column(
+            "transaction_type", sqlmodel.sql.sqltypes.AutoString(), nullable=False
+        ),
+        sa.Column("state", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("bucket", postgresql.TIMESTAMP(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    # insert a row per event instead of updating the shared counter row, which
+    # made concurrent webhooks for the same connection and state wait on each
+    # other until commit; the rows are added up by the report rollup
+    op.execute("""
+        CREATE OR REPLACE FUNCTION endorserequest_report_counter() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO transactionreportdelta
+                (connection_id, transaction_type, state, bucket)
+            VALUES (
+                NEW.connection_id,
+                coalesce(NEW.transaction_type, ''),
+                coalesce(NEW.state, ''),
+                date_trunc('hour', now() AT TIME ZONE 'utc')
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """)
+
+    # the counts so far were bucketed in the database's time zone (localtimestamp
+    # and the created_at and updated_at columns), move them to UTC hours
+    op.execute("""
+        WITH local_counts AS (
+            DELETE FROM transactionreportcounter
+            RETURNING connection_id, transaction_type, state, bucket, count
+        )
+        INSERT INTO transactionreportcounter
+            (connection_id, transaction_type, state, bucket, count)
+        SELECT connection_id, transaction_type, state,
+            date_trunc(
+                'hour',
+                bucket AT TIME ZONE current_setting('TimeZone') AT TIME ZONE 'utc'
+            ) AS utc_bucket,
+            sum(count)
+        FROM local_counts
+        GROUP BY connection_id, transaction_type, state, utc_bucket
+        """)
+
+
+def downgrade():
+    # the function of 6c3d9e1f7a42, whose counts the upgrade moves to UTC
+    op.execute("""
+        CREATE OR REPLACE FUNCTION endorserequest_report_counter() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO transactionreportcounter
+                (connection_id, transaction_type, state, bucket, count)
+            VALUES (
+                NEW.connection_id,
+                coalesce(NEW.transaction_type, ''),
+                coalesce(NEW.state, ''),
+                date_trunc('hour', localtimestamp),
+                1
+            )
+            ON CONFLICT (connection_id, transaction_type, state, bucket)
+            DO UPDATE SET count = transactionreportcounter.count + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """)
+    # keep the counts that weren't rolled up yet
+    op.execute("""
+        INSERT INTO transactionreportcounter
+            (connection_id, transaction_type, state, bucket, count)
+        SELECT connection_id, transaction_type, state, bucket, count(*)
+        FROM transactionreportdelta
+        GROUP BY connection_id, transaction_type, state, bucket
+        ON CONFLICT (connection_id, transaction_type, state, bucket)
+        DO UPDATE SET count = transactionreportcounter.count + EXCLUDED.count
+        """)
+    op.drop_table("transactionreportdelta")
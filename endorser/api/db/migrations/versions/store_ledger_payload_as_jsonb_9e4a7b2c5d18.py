@@ -0,0 +1,55 @@
+"""store ledger payload as jsonb
+
+Revision ID: 9e4a7b2c5d18
+Revises: 6c3d9e1f7a42
+Create Date: 2026-10-18 16:47:35.219044
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "9e4a7b2c5d18"
+down_revision = "6c3d9e1f7a42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "endorserequest",
+        sa.Column("ledger_payload", postgresql.JSONB(), nullable=True),
+    )
+    # ledger_txn is the request's "operation", only keep it for rows that have
+    # no request (a json "null" becomes a sql NULL)
+    op.execute("""
+        UPDATE endorserequest SET ledger_payload = CASE
+            WHEN nullif(ledger_txn_request, '') IS NOT NULL
+                AND ledger_txn_request::jsonb <> 'null'::jsonb
+                THEN ledger_txn_request::jsonb
+            WHEN nullif(ledger_txn, '') IS NOT NULL
+                AND ledger_txn::jsonb <> 'null'::jsonb
+                THEN jsonb_build_object('operation', ledger_txn::jsonb)
+        END
+        """)
+    op.drop_column("endorserequest", "ledger_txn")
+    op.drop_column("endorserequest", "ledger_txn_request")
+
+
+def downgrade():
+    op.add_column(
+        "endorserequest",
+        sa.Column("ledger_txn_request", sa.VARCHAR(), nullable=True),
+    )
+    op.add_column(
+        "endorserequest",
+        sa.Column("ledger_txn", sa.VARCHAR(), nullable=True),
+    )
+    op.execute("""
+        UPDATE endorserequest SET
+            ledger_txn_request = coalesce(ledger_payload::text, 'null'),
+            ledger_txn = coalesce((ledger_payload -> 'operation')::text, 'null')
+        """)
+    op.drop_column("endorserequest", "ledger_payload")
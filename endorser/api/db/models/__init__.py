@@ -5,6 +5,11 @@ from api.db.models.configuration import ConfigurationDB  # noqa: F401
 from api.db.models.contact import Contact  # noqa: F401
 from api.db.models.endorse_request import EndorseRequest  # noqa: F401
 from api.db.models.allow import AllowedPublicDid  # noqa: F401
+from api.db.models.webhook_inbox import WebhookInbox  # noqa: F401
+from api.db.models.acapy_outbox import AcapyOutbox  # noqa: F401
+from api.db.models.webhook_receipt import WebhookReceipt  # noqa: F401
+from api.db.models.transaction_report import TransactionReportCounter  # noqa: F401
+from api.db.models.transaction_report import TransactionReportDelta  # noqa: F401
 
 __all__ = [
     "BaseTable",
@@ -12,4 +17,9 @@ __all__ = [
     "Contact",
     "EndorseRequest",
     "AllowedPublicDid",
+    "WebhookInbox",
+    "AcapyOutbox",
+    "WebhookReceipt",
+    "TransactionReportCounter",
+    "TransactionReportDelta",
 ]
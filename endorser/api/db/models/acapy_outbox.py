@@ -0,0 +1,78 @@
+"""AcapyOutbox Database Tables/Models.
+
+Models of the Endorser tables for aca-py admin calls recorded while processing a
+webhook, and sent once the webhook's changes are committed.
+
+"""
+
+import uuid
+from datetime import datetime
+
+from sqlmodel import Field
+from sqlalchemy import BigInteger, Column, Identity, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID, TIMESTAMP
+
+from api.db.models.base import BaseModel
+
+
+class AcapyOutbox(BaseModel, table=True):
+    """AcapyOutbox.
+
+    This is the model for the AcapyOutbox table
+    (postgresql specific dialects in use).
+
+    Calls are sent in seq order per ordering_key, rows are deleted once aca-py
+    has accepted the call.
+
+    Attributes:
+      acapy_outbox_id: Outbox record ID
+      seq: Order the call was recorded in
+      ordering_key: transaction_id or connection_id the call applies to
+      method: HTTP method of the admin call
+      path: Admin api path
+      params: Query parameters of the admin call
+      transaction_id: Transaction to update with the state aca-py returns (if any)
+      status: pending, processing or dead
+      attempts: Number of times the call has been attempted
+      last_error: The error from the last failed attempt
+      next_attempt_at: Earliest time for the next attempt
+      created_at: Timestamp when record was created
+      updated_at: Timestamp when record was last modified
+    """
+
+    __table_args__ = (
+        Index("ix_acapyoutbox_status_next_attempt_at", "status", "next_attempt_at"),
+        Index("ix_acapyoutbox_ordering_key_seq", "ordering_key", "seq"),
+    )
+
+    acapy_outbox_id: uuid.UUID = Field(
+        sa_column=Column(
+            UUID(as_uuid=True),
+            primary_key=True,
+            server_default=text("gen_random_uuid()"),
+        )
+    )
+    seq: int = Field(
+        sa_column=Column(BigInteger, Identity(always=True), nullable=False)
+    )
+
+    ordering_key: str = Field(nullable=False)
+    method: str = Field(nullable=False)
+    path: str = Field(nullable=False)
+    params: dict = Field(sa_column=Column(JSONB, nullable=True))
+    transaction_id: uuid.UUID = Field(nullable=True, default=None)
+    status: str = Field(nullable=False)
+    attempts: int = Field(nullable=False, default=0)
+    last_error: str = Field(nullable=True, default=None)
+
+    next_attempt_at: datetime = Field(
+        sa_column=Column(TIMESTAMP, nullable=False, server_default=func.now())
+    )
+    created_at: datetime = Field(
+        sa_column=Column(TIMESTAMP, nullable=False, server_default=func.now())
+    )
+    updated_at: datetime = Field(
+        sa_column=Column(
+            TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now()
+        )
+    )
@@ -8,7 +8,7 @@ import uuid
 from datetime import datetime
 
 from sqlmodel import Field
-from sqlalchemy import Column, func
+from sqlalchemy import Column, Index, func
 from sqlalchemy.engine.default import DefaultExecutionContext
 from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP
 
@@ -91,6 +91,14 @@ class AllowedSchema(BaseModel, table=True):
     )
 
 
+Index(
+    "ix_allowedschema_match",
+    AllowedSchema.author_did,
+    AllowedSchema.schema_name,
+    AllowedSchema.version,
+)
+
+
 def allowed_cred_def_uuid(context: DefaultExecutionContext):
     pr = context.get_current_parameters()
     return uuid.uuid5(
@@ -156,3 +164,13 @@ class AllowedCredentialDefinition(BaseModel, table=True):
             TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now()
         )
     )
+
+
+Index(
+    "ix_allowedcredentialdefinition_match",
+    AllowedCredentialDefinition.creddef_author_did,
+    AllowedCredentialDefinition.schema_issuer_did,
+    AllowedCredentialDefinition.schema_name,
+    AllowedCredentialDefinition.version,
+    AllowedCredentialDefinition.tag,
+)
@@ -6,7 +6,7 @@ from datetime import datetime
 from typing import List
 
 from sqlmodel import Field
-from sqlalchemy import Column, func, text, String
+from sqlalchemy import Column, Index, func, text, String
 from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP, ARRAY
 
 from api.db.models.base import BaseModel
@@ -57,3 +57,6 @@ class Contact(BaseModel, table=True):
             TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now()
         )
     )
+
+
+Index("ix_contact_state_created_at", Contact.state, Contact.created_at.desc())
@@ -9,8 +9,8 @@ from datetime import datetime
 from typing import List, Optional
 
 from sqlmodel import Field
-from sqlalchemy import Column, func, text, String
-from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP, ARRAY
+from sqlalchemy import Column, Index, func, text, String
+from sqlalchemy.dialects.postgresql import JSONB, UUID, TIMESTAMP, ARRAY
 
 from api.db.models.base import BaseModel
 
@@ -28,6 +28,8 @@ class EndorseRequest(BaseModel, table=True):
       transaction_id: Underlying AcaPy transaction_id id
       connection_id: Underlying AcaPy connection id
       state: The underlying AcaPy transaction state
+      ledger_payload: The author's ledger transaction request, the ledger
+        transaction itself is its "operation"
       created_at: Timestamp when record was created
       updated_at: Timestamp when record was last modified
     """
@@ -49,8 +51,9 @@ class EndorseRequest(BaseModel, table=True):
     author_did: str = Field(nullable=True, default=None)
     transaction_type: str = Field(nullable=True, default=None)
     state: str = Field(nullable=True, default=None)
-    ledger_txn: str = Field(nullable=True, default=None)
-    ledger_txn_request: str = Field(nullable=True, default=None)
+    ledger_payload: dict | None = Field(
+        default=None, sa_column=Column(JSONB, nullable=True)
+    )
     # --- acapy data
 
     created_at: datetime = Field(
@@ -61,3 +64,31 @@ class EndorseRequest(BaseModel, table=True):
             TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now()
         )
     )
+
+
+Index(
+    "ix_endorserequest_transaction_id", EndorseRequest.transaction_id, unique=True
+)
+Index(
+    "ix_endorserequest_state_created_at",
+    EndorseRequest.state,
+    EndorseRequest.created_at.desc(),
+)
+Index(
+    "ix_endorserequest_connection_id_created_at",
+    EndorseRequest.connection_id,
+    EndorseRequest.created_at.desc(),
+)
+# pending requests, re-checked whenever the allow lists change
+Index(
+    "ix_endorserequest_pending_created_at",
+    EndorseRequest.created_at.desc(),
+    postgresql_where=text("state = 'request_received'"),
+)
+# pending requests an allow list rule could apply to
+Index(
+    "ix_endorserequest_pending_type_author",
+    EndorseRequest.transaction_type,
+    EndorseRequest.author_did,
+    postgresql_where=text("state = 'request_received'"),
+)
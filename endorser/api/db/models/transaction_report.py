@@ -0,0 +1,75 @@
+"""TransactionReportCounter Database Tables/Models.
+
+Models of the Endorser tables for the pre-aggregated transaction report counts,
+and the counts not yet added to them.
+
+"""
+
+import uuid
+from datetime import datetime
+
+from sqlmodel import Field
+from sqlalchemy import BigInteger, Column, Identity, Index
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+
+from api.db.models.base import BaseModel
+
+
+class TransactionReportCounter(BaseModel, table=True):
+    """TransactionReportCounter.
+
+    This is the model for the TransactionReportCounter table
+    (postgresql specific dialects in use).
+
+    The number of EndorseRequests that entered each state, per connection,
+    transaction type and hour.  The rows are updated from the
+    TransactionReportDelta rows, which are added up here periodically.
+
+    Attributes:
+      connection_id: Underlying AcaPy connection id
+      transaction_type: The ledger transaction type ("" if unknown)
+      state: The state the transactions entered ("" if unknown)
+      bucket: The start of the hour (UTC) the transactions entered the state
+      count: Number of transactions
+    """
+
+    connection_id: uuid.UUID = Field(nullable=False, primary_key=True)
+    transaction_type: str = Field(nullable=False, primary_key=True)
+    state: str = Field(nullable=False, primary_key=True)
+    bucket: datetime = Field(
+        sa_column=Column(TIMESTAMP, nullable=False, primary_key=True)
+    )
+    count: int = Field(sa_column=Column(BigInteger, nullable=False, default=0))
+
+
+# reports across all connections filter on the time range
+Index("ix_transactionreportcounter_bucket", TransactionReportCounter.bucket)
+
+
+class TransactionReportDelta(BaseModel, table=True):
+    """TransactionReportDelta.
+
+    This is the model for the TransactionReportDelta table
+    (postgresql specific dialects in use).
+
+    One row each time an EndorseRequest is created or changes state, inserted by
+    a trigger on the endorserequest table (see migration a3c7e9b1d5f2) in the
+    same transaction.  Rows are only ever inserted, so concurrent webhooks don't
+    wait on each other's counter rows; they are added to TransactionReportCounter
+    and deleted by the report rollup.
+
+    Attributes:
+      id: Insert order
+      connection_id: Underlying AcaPy connection id
+      transaction_type: The ledger transaction type ("" if unknown)
+      state: The state the transaction entered ("" if unknown)
+      bucket: The start of the hour (UTC) the transaction entered the state
+    """
+
+    id: int = Field(
+        sa_column=Column(BigInteger, Identity(always=True), primary_key=True)
+    )
+    connection_id: uuid.UUID = Field(nullable=False)
+    transaction_type: str = Field(nullable=False)
+    state: str = Field(nullable=False)
+    bucket: datetime = Field(sa_column=Column(TIMESTAMP, nullable=False))
@@ -0,0 +1,75 @@
+"""WebhookInbox Database Tables/Models.
+
+Models of the Endorser tables for queued (not yet processed) aca-py webhooks.
+
+"""
+
+import uuid
+from datetime import datetime
+
+from sqlmodel import Field
+from sqlalchemy import BigInteger, Column, Identity, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID, TIMESTAMP
+
+from api.db.models.base import BaseModel
+
+
+class WebhookInbox(BaseModel, table=True):
+    """WebhookInbox.
+
+    This is the model for the WebhookInbox table
+    (postgresql specific dialects in use).
+
+    Webhooks are processed in seq order per ordering_key, rows are deleted once
+    they have been processed successfully.
+
+    Attributes:
+      webhook_inbox_id: Inbox record ID
+      seq: Arrival order of the webhook
+      topic: The aca-py webhook topic
+      state: The state included in the webhook payload (if any)
+      ordering_key: transaction_id or connection_id the webhook applies to
+      payload: The webhook payload
+      status: pending, processing or dead
+      attempts: Number of times processing has been attempted
+      last_error: The error from the last failed attempt
+      next_attempt_at: Earliest time for the next processing attempt
+      created_at: Timestamp when record was created
+      updated_at: Timestamp when record was last modified
+    """
+
+    __table_args__ = (
+        Index("ix_webhookinbox_status_next_attempt_at", "status", "next_attempt_at"),
+        Index("ix_webhookinbox_ordering_key_seq", "ordering_key", "seq"),
+    )
+
+    webhook_inbox_id: uuid.UUID = Field(
+        sa_column=Column(
+            UUID(as_uuid=True),
+            primary_key=True,
+            server_default=text("gen_random_uuid()"),
+        )
+    )
+    seq: int = Field(
+        sa_column=Column(BigInteger, Identity(always=True), nullable=False)
+    )
+
+    topic: str = Field(nullable=False)
+    state: str = Field(nullable=True, default=None)
+    ordering_key: str = Field(nullable=False)
+    payload: dict = Field(sa_column=Column(JSONB, nullable=False))
+    status: str = Field(nullable=False)
+    attempts: int = Field(nullable=False, default=0)
+    last_error: str = Field(nullable=True, default=None)
+
+    next_attempt_at: datetime = Field(
+        sa_column=Column(TIMESTAMP, nullable=False, server_default=func.now())
+    )
+    created_at: datetime = Field(
+        sa_column=Column(TIMESTAMP, nullable=False, server_default=func.now())
+    )
+    updated_at: datetime = Field(
+        sa_column=Column(
+            TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now()
+        )
+    )
@@ -0,0 +1,44 @@
+"""WebhookReceipt Database Tables/Models.
+
+Models of the Endorser tables for the aca-py webhooks that have been processed,
+used to ignore redelivered webhooks.
+
+"""
+
+from datetime import datetime
+
+from sqlmodel import Field
+from sqlalchemy import Column, Index, func
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+
+from api.db.models.base import BaseModel
+
+
+class WebhookReceipt(BaseModel, table=True):
+    """WebhookReceipt.
+
+    This is the model for the WebhookReceipt table
+    (postgresql specific dialects in use).
+
+    A webhook is identified by (topic, object_id, state), the primary key is the
+    unique index that de-duplicates redelivered webhooks.
+
+    Attributes:
+      topic: The aca-py webhook topic
+      object_id: transaction_id or connection_id the webhook applies to
+      state: The state included in the webhook payload
+      created_at: Timestamp when the webhook was processed
+    """
+
+    __table_args__ = (
+        # expired receipts are deleted by age
+        Index("ix_webhookreceipt_created_at", "created_at"),
+    )
+
+    topic: str = Field(nullable=False, primary_key=True)
+    object_id: str = Field(nullable=False, primary_key=True)
+    state: str = Field(nullable=False, primary_key=True)
+
+    created_at: datetime = Field(
+        sa_column=Column(TIMESTAMP, nullable=False, server_default=func.now())
+    )
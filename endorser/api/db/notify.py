@@ -0,0 +1,105 @@
+"""Cross-process cache invalidation using Postgres LISTEN/NOTIFY.
+
+Each process keeps in-memory snapshots (configuration, allow lists, ...).  When
+one process changes the underlying tables it sends a NOTIFY on a shared channel
+and every other process re-loads the named snapshot, without polling.
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Awaitable, Callable
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.core.config import settings
+from api.db.session import async_session
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "endorser_cache"
+
+# identifies this process, so we can skip our own notifications
+INSTANCE_ID = uuid.uuid4().hex
+
+RECONNECT_DELAY = 5
+
+ReloadHandler = Callable[[AsyncSession], Awaitable]
+
+_handlers: dict[str, ReloadHandler] = {}
+_listener: asyncpg.Connection | None = None
+_stopping = False
+
+
+def register_reload_handler(topic: str, handler: ReloadHandler):
+    """Register the function that re-loads the snapshot for a topic."""
+    _handlers[topic] = handler
+
+
+async def notify_changed(db: AsyncSession, topic: str):
+    """Tell the other processes that a topic changed (sent on commit)."""
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CHANNEL, "payload": f"{topic}:{INSTANCE_ID}"},
+    )
+
+
+async def _reload(topic: str):
+    handler = _handlers.get(topic)
+    if not handler:
+        logger.debug(f">>> no reload handler for: {topic}")
+        return
+    try:
+        async with async_session() as db:
+            await handler(db)
+        logger.info(f">>> reloaded {topic} after notification")
+    except Exception as e:
+        logger.error(f">>> failed to reload {topic}: {e}")
+
+
+def _on_notification(connection, pid, channel, payload: str):
+    topic, _, instance_id = payload.partition(":")
+    if instance_id == INSTANCE_ID:
+        return
+    asyncio.get_running_loop().create_task(_reload(topic))
+
+
+def _on_termination(connection):
+    if _stopping:
+        return
+    logger.warning(">>> cache notification listener disconnected, reconnecting")
+    asyncio.get_running_loop().create_task(_reconnect())
+
+
+async def _reconnect():
+    while not _stopping:
+        await asyncio.sleep(RECONNECT_DELAY)
+        try:
+            await start_listener()
+            # we may have missed notifications while disconnected
+            for topic in list(_handlers):
+                await _reload(topic)
+            return
+        except Exception as e:
+            logger.warning(f">>> unable to reconnect cache listener: {e}")
+
+
+async def start_listener():
+    """Open a dedicated connection and LISTEN for cache notifications."""
+    global _listener, _stopping
+    _stopping = False
+    dsn = settings.SQLALCHEMY_DATABASE_URI.replace("postgresql+asyncpg", "postgresql")
+    _listener = await asyncpg.connect(dsn)
+    _listener.add_termination_listener(_on_termination)
+    await _listener.add_listener(CHANNEL, _on_notification)
+    logger.info(f">>> listening for cache notifications on {CHANNEL}")
+
+
+async def stop_listener():
+    global _listener, _stopping
+    _stopping = True
+    if _listener is not None and not _listener.is_closed():
+        await _listener.close()
+    _listener = None
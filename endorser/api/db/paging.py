@@ -0,0 +1,146 @@
+"""Paging for the listing endpoints.
+
+Two modes are supported:
+
+- offset paging (page_num/page_size), the default
+- keyset (cursor) paging, the caller passes back the opaque next_cursor from the
+  previous page and we seek straight to the next row by (created_at, id), so a
+  deep page costs the same as the first one
+
+Every page is ordered by (created_at DESC, id DESC), and a next_cursor is returned
+whenever there are more rows, so a client can switch to cursor paging at any page.
+
+The total_count can be exact (a count(*) over the filtered query), estimated from
+the planner statistics, or skipped altogether.
+"""
+
+import base64
+import json
+import uuid
+from datetime import datetime
+from enum import Enum
+from typing import Any
+
+from sqlalchemy import Select, Uuid, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql.functions import func
+
+
+class TotalCountType(str, Enum):
+    exact = "exact"
+    estimated = "estimated"
+    none = "none"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, key: Any) -> str:
+    data = json.dumps([created_at.isoformat(), str(key)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key_type: type = str) -> tuple[datetime, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, key = json.loads(base64.urlsafe_b64decode(padded))
+        return (datetime.fromisoformat(created_at), key_type(key))
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def _key_type(key: InstrumentedAttribute) -> type:
+    if isinstance(key.type, Uuid) and key.type.as_uuid:
+        return uuid.UUID
+    return str
+
+
+async def estimate_count(db: AsyncSession, base_q: Select, table_name: str) -> int:
+    """Estimate the number of rows a query returns, without counting them.
+
+    An unfiltered query uses the row count from pg_class.reltuples, a filtered
+    query uses the planner's row estimate.  Tables that have never been analyzed
+    fall back to an exact count.
+    """
+    if base_q.whereclause is None:
+        result = await db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)"),
+            {"t": table_name},
+        )
+        estimate = result.scalar()
+    else:
+        compiled = base_q.order_by(None).compile(
+            dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}
+        )
+        # run as driver sql, a bound value like "did:sov:..." isn't a parameter
+        connection = await db.connection()
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = plan[0]["Plan"]["Plan Rows"]
+    if estimate is None or estimate < 0:
+        return await exact_count(db, base_q)
+    return int(estimate)
+
+
+async def exact_count(db: AsyncSession, base_q: Select) -> int:
+    count_q = base_q.with_only_columns(func.count()).order_by(None)
+    count_q_rec = await db.execute(count_q)
+    return count_q_rec.scalar() or 0
+
+
+async def paginate(
+    db: AsyncSession,
+    base_q: Select,
+    created_at: InstrumentedAttribute,
+    key: InstrumentedAttribute,
+    page_size: int = 10,
+    page_num: int = 1,
+    cursor: str | None = None,
+    total_count: TotalCountType = TotalCountType.exact,
+) -> tuple[int | None, list, str | None]:
+    """Fetch one page of a query.
+
+    Args:
+        db: database session
+        base_q: the select, with all filters applied
+        created_at: the created_at column of the table
+        key: the primary key column of the table (the tie breaker)
+        page_size: number of rows per page
+        page_num: page number for offset paging (ignored when cursor is set)
+        cursor: next_cursor from the previous page, switches to keyset paging
+        total_count: how to compute the total count
+
+    Returns:
+        (total count or None, rows, next_cursor or None on the last page)
+    """
+    count: int | None = None
+    if total_count == TotalCountType.exact:
+        count = await exact_count(db, base_q)
+    elif total_count == TotalCountType.estimated:
+        count = await estimate_count(db, base_q, key.class_.__tablename__)
+
+    results_q = base_q.order_by(created_at.desc(), key.desc())
+    if cursor:
+        cursor_created_at, cursor_key = decode_cursor(cursor, _key_type(key))
+        results_q = results_q.where(
+            tuple_(created_at, key) < tuple_(cursor_created_at, cursor_key)
+        )
+    else:
+        results_q = results_q.offset((page_num - 1) * page_size)
+
+    # fetch one extra row to find out whether there is a next page
+    results_q_recs = await db.execute(results_q.limit(page_size + 1))
+    rows = list(results_q_recs.scalars().all())
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            getattr(last, created_at.key), getattr(last, key.key)
+        )
+    return (count, rows, next_cursor)
@@ -1,7 +1,10 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from api.core.config import settings
+from api.core.metrics import registry
+from api.core.tracing import tracer
 
 engine = create_async_engine(
     settings.SQLALCHEMY_DATABASE_URI,
@@ -13,3 +16,34 @@ engine = create_async_engine(
 async_session = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False, future=True
 )
+
+registry.gauge(
+    "endorser_db_pool_checked_out",
+    "Database connections currently checked out of the pool.",
+    callback=lambda: engine.sync_engine.pool.checkedout(),
+)
+registry.gauge(
+    "endorser_db_pool_overflow",
+    "Database connections open beyond the pool size (negative while below it).",
+    callback=lambda: engine.sync_engine.pool.overflow(),
+)
+
+
+# a span for each statement, nested under the span that executed it
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_statement_span(conn, cursor, statement, parameters, context, executemany):
+    if tracer.enabled and context is not None:
+        context._trace_span = tracer.start_span("db.execute", statement=statement[:500])
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _end_statement_span(conn, cursor, statement, parameters, context, executemany):
+    tracer.end_span(getattr(context, "_trace_span", None))
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _fail_statement_span(exception_context):
+    context = exception_context.execution_context
+    tracer.end_span(
+        getattr(context, "_trace_span", None), exception_context.original_exception
+    )
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 
-from jose import jwt
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
 from pydantic import BaseModel
 
 from api.core.config import settings
@@ -20,3 +21,16 @@ def create_access_token(data: dict):
         to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM
     )
     return AccessToken(access_token=encoded_jwt, token_type="bearer")
+
+
+def verify_access_token(token: str) -> dict:
+    try:
+        return jwt.decode(
+            token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
+        )
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
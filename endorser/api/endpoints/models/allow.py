@@ -16,21 +16,24 @@ class AllowedPublicDidList(BaseModel):
     page_size: int
     page_num: int
     count: int
-    total_count: int
+    total_count: int | None = None
     dids: list[AllowedPublicDid]
+    next_cursor: str | None = None
 
 
 class AllowedSchemaList(BaseModel):
     page_size: int
     page_num: int
     count: int
-    total_count: int
+    total_count: int | None = None
     schemas: list[AllowedSchema]
+    next_cursor: str | None = None
 
 
 class AllowedCredentialDefinitionList(BaseModel):
     page_size: int
     page_num: int
     count: int
-    total_count: int
+    total_count: int | None = None
     credentials: list[AllowedCredentialDefinition]
+    next_cursor: str | None = None
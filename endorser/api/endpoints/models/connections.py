@@ -66,8 +66,9 @@ class ConnectionList(BaseModel):
     page_size: int
     page_num: int
     count: int
-    total_count: int
+    total_count: int | None = None
     connections: list[Connection]
+    next_cursor: str | None = None
 
 
 def webhook_to_connection_object(payload: dict) -> Connection:
@@ -1,8 +1,10 @@
+from datetime import datetime
 from enum import Enum
 import json
 import logging
 from uuid import UUID
 from pydantic import BaseModel
+from sqlalchemy import inspect
 
 from api.db.models.endorse_request import EndorseRequest
 
@@ -36,6 +38,18 @@ class EndorseTransactionType(str, Enum):
     revoc_entry = "114"
 
 
+class TransactionViewType(str, Enum):
+    # everything, including the ledger payload
+    full = "full"
+    # without the ledger payload (transaction and transaction_request)
+    summary = "summary"
+
+
+class ExportFormatType(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
 class EndorseTransaction(BaseModel):
     author_goal_code: str | None = None
     connection_id: UUID
@@ -55,8 +69,36 @@ class EndorseTransactionList(BaseModel):
     page_size: int
     page_num: int
     count: int
-    total_count: int
+    total_count: int | None = None
     transactions: list[EndorseTransaction]
+    next_cursor: str | None = None
+
+
+class BulkTransactionRequest(BaseModel):
+    """Select the transactions to endorse/reject, by id and/or filter.
+
+    All the given criteria must match, only transactions in the given state
+    (default request_received) are selected.
+    """
+
+    transaction_ids: list[UUID] | None = None
+    state: EndorseTransactionState = EndorseTransactionState.request_received
+    connection_id: UUID | None = None
+    transaction_type: EndorseTransactionType | None = None
+    created_before: datetime | None = None
+
+
+class BulkTransactionResult(BaseModel):
+    transaction_id: UUID
+    state: str | None = None
+    error: str | None = None
+
+
+class BulkTransactionResultList(BaseModel):
+    count: int
+    succeeded: int
+    failed: int
+    results: list[BulkTransactionResult]
 
 
 def webhook_to_txn_object(payload: dict, endorser_did: str) -> EndorseTransaction:
@@ -119,8 +161,8 @@ def txn_to_db_object(txn: EndorseTransaction) -> EndorseRequest:
         author_did=txn.author_did,
         transaction_type=txn.transaction_type,
         state=txn.state,
-        ledger_txn=json.dumps(txn.transaction),
-        ledger_txn_request=json.dumps(txn.transaction_request),
+        # the transaction is the request's "operation", so it isn't stored twice
+        ledger_payload=txn.transaction_request,
     )
     logger.debug(f">>> to request: {txn_request}")
     return txn_request
@@ -145,6 +187,12 @@ def db_to_txn_object(
             transaction_response = {}
     else:
         transaction_response = {}
+    # listings can leave out the payload (see db_get_txn_records)
+    payload = (
+        None
+        if "ledger_payload" in inspect(txn_request).unloaded
+        else txn_request.ledger_payload
+    )
     txn: EndorseTransaction = EndorseTransaction(
         author_goal_code=str(txn_request.author_goal_code)
         if txn_request.author_goal_code
@@ -156,10 +204,8 @@ def db_to_txn_object(
         endorser_did=txn_request.endorser_did,
         author_did=txn_request.author_did,
         created_at=str(txn_request.created_at),
-        transaction=json.loads(txn_request.ledger_txn),
-        transaction_request=json.loads(txn_request.ledger_txn_request)
-        if txn_request.ledger_txn_request
-        else None,
+        transaction=payload.get("operation") if payload else None,
+        transaction_request=payload,
         transaction_type=txn_request.transaction_type,
         transaction_response=transaction_response,
     )
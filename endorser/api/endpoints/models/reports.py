@@ -0,0 +1,30 @@
+from datetime import datetime
+from enum import Enum
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class ReportGroupByType(str, Enum):
+    connection_id = "connection_id"
+    transaction_type = "transaction_type"
+    state = "state"
+    hour = "hour"
+    day = "day"
+
+
+class TransactionSummaryItem(BaseModel):
+    connection_id: UUID | None = None
+    transaction_type: str | None = None
+    state: str | None = None
+    # start of the hour/day, when grouped by time
+    period: datetime | None = None
+    count: int
+
+
+class TransactionSummary(BaseModel):
+    start: datetime | None = None
+    end: datetime | None = None
+    group_by: list[ReportGroupByType]
+    total: int
+    results: list[TransactionSummaryItem]
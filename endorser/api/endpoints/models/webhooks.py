@@ -0,0 +1,50 @@
+from enum import Enum
+import logging
+
+from pydantic import BaseModel
+
+from api.db.models.acapy_outbox import AcapyOutbox
+from api.db.models.webhook_inbox import WebhookInbox
+logger = logging.getLogger(__name__)
+
+
+class WebhookTopicType(str, Enum):
+    ping = "ping"
+    connections = "connections"
+    oob_invitation = "oob-invitation"
+    connection_reuse = "connection-reuse"
+    connection_reuse_accepted = "connection-reuse-accepted"
+    basicmessages = "basicmessages"
+    issue_credential = "issue-credential"
+    issue_credential_v2_0 = "issue-credential-v2-0"
+    issue_credential_v2_0_indy = "issue-credential-v2-0-indy"
+    issue_credential_v2_0_ld_proof = "issue-credential-v2-0-ld-proof"
+    issuer_cred_rev = "issuer-cred-rev"
+    present_proof = "present-proof"
+    present_proof_v2_0 = "present-proof-v2-0"
+    endorse_transaction = "endorse_transaction"
+    revocation_registry = "revocation-registry"
+    revocation_notification = "revocation-notification"
+    problem_report = "problem-report"
+
+
+class WebhookInboxStatusType(str, Enum):
+    pending = "pending"
+    processing = "processing"
+    dead = "dead"
+
+
+class WebhookInboxList(BaseModel):
+    page_size: int
+    page_num: int
+    count: int
+    total_count: int
+    webhooks: list[WebhookInbox]
+
+
+class AcapyOutboxList(BaseModel):
+    page_size: int
+    page_num: int
+    count: int
+    total_count: int
+    calls: list[AcapyOutbox]
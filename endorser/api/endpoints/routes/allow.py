@@ -1,6 +1,5 @@
 import logging
 from codecs import iterdecode
-from csv import DictReader
 from typing import Annotated, Optional, TypeVar
 from uuid import UUID
 
@@ -8,9 +7,13 @@ from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 from sqlalchemy import delete, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql.functions import func
+from sqlalchemy.orm import InstrumentedAttribute
 from starlette import status
-from starlette.status import HTTP_409_CONFLICT, HTTP_500_INTERNAL_SERVER_ERROR
+from starlette.status import (
+    HTTP_400_BAD_REQUEST,
+    HTTP_409_CONFLICT,
+    HTTP_500_INTERNAL_SERVER_ERROR,
+)
 
 from api.db.errors import AlreadyExists
 from api.db.models.allow import (
@@ -18,6 +21,7 @@ from api.db.models.allow import (
     AllowedSchema,
 )
 from api.db.models.base import BaseModel
+from api.db.paging import InvalidCursor, TotalCountType, paginate
 from api.endpoints.dependencies.db import get_db
 from api.endpoints.models.allow import (
     AllowedCredentialDefinitionList,
@@ -25,7 +29,13 @@ from api.endpoints.models.allow import (
     AllowedPublicDidList,
     AllowedSchemaList,
 )
-from api.services.allow_lists import add_to_allow_list, updated_allowed
+from api.services.allow_import import InvalidAllowFile, import_allow_list
+from api.services.allow_lists import (
+    add_to_allow_list,
+    allow_list_changed,
+    pending_reevaluation,
+    updated_allowed,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -37,6 +47,10 @@ def db_to_http_exception(e: Exception) -> int:
             return HTTP_409_CONFLICT
         case AlreadyExists():
             return HTTP_409_CONFLICT
+        case InvalidCursor():
+            return HTTP_400_BAD_REQUEST
+        case InvalidAllowFile():
+            return HTTP_400_BAD_REQUEST
         case _:
             return HTTP_500_INTERNAL_SERVER_ERROR
 
@@ -49,22 +63,24 @@ async def select_from_table(
     db: AsyncSession,
     filters: dict[J | None, J],
     table: type[T],
-    page_num,
-    page_size,
-) -> tuple[int, list[T]]:
-    skip = (page_num - 1) * page_size
-    filter_conditions = [
-        cond == value if value else True for value, cond in filters.items()
-    ]
+    key: InstrumentedAttribute,
+    page_num: int,
+    page_size: int,
+    cursor: str | None = None,
+    total_count: TotalCountType = TotalCountType.exact,
+) -> tuple[int | None, list[T], str | None]:
+    filter_conditions = [cond == value for value, cond in filters.items() if value]
     base_q = select(table).filter(*filter_conditions)
-    count_q = base_q.with_only_columns(func.count()).order_by(None)
-    q = base_q.limit(page_size).offset(skip)
-    count_result = await db.execute(count_q)
-    total_count: int = count_result.scalar() or 0
-
-    result = await db.execute(q)
-    db_txn: list[T] = result.scalars().all()
-    return (total_count, db_txn)
+    return await paginate(
+        db,
+        base_q,
+        table.created_at,
+        key,
+        page_size=page_size,
+        page_num=page_num,
+        cursor=cursor,
+        total_count=total_count,
+    )
 
 
 @router.get(
@@ -78,25 +94,31 @@ async def get_allowed_dids(
     did: Optional[str] = None,
     page_size: int = 10,
     page_num: int = 1,
+    cursor: Optional[str] = None,
+    total_count: TotalCountType = TotalCountType.exact,
     db: AsyncSession = Depends(get_db),
 ) -> AllowedPublicDidList:
     try:
-        total_count: int
+        count: int | None
         db_txn: list[AllowedPublicDid]
-        total_count, db_txn = await select_from_table(
+        count, db_txn, next_cursor = await select_from_table(
             db,
             {did: AllowedPublicDid.registered_did},
             AllowedPublicDid,
+            AllowedPublicDid.registered_did,
             page_num,
             page_size,
+            cursor,
+            total_count,
         )
 
         return AllowedPublicDidList(
             page_size=page_size,
             page_num=page_num,
-            total_count=total_count,
+            total_count=count,
             count=len(db_txn),
             dids=db_txn,
+            next_cursor=next_cursor,
         )
     except Exception as e:
         raise HTTPException(status_code=db_to_http_exception(e), detail=str(e))
@@ -135,7 +157,8 @@ async def delete_allowed_did(
     try:
         q = delete(AllowedPublicDid).where(AllowedPublicDid.registered_did == did)
         await db.execute(q)
-        await updated_allowed(db)
+        await db.commit()
+        await allow_list_changed(db)
         return {}
     except Exception as e:
         raise HTTPException(status_code=db_to_http_exception(e), detail=str(e))
@@ -155,6 +178,8 @@ async def get_allowed_schemas(
     version: Optional[str] = None,
     page_size: int = 10,
     page_num: int = 1,
+    cursor: Optional[str] = None,
+    total_count: TotalCountType = TotalCountType.exact,
     db: AsyncSession = Depends(get_db),
 ) -> AllowedSchemaList:
     try:
@@ -166,15 +191,23 @@ async def get_allowed_schemas(
         }
 
         db_txn: list[AllowedSchema]
-        total_count, db_txn = await select_from_table(
-            db, filter, AllowedSchema, page_num, page_size
+        count, db_txn, next_cursor = await select_from_table(
+            db,
+            filter,
+            AllowedSchema,
+            AllowedSchema.allowed_schema_id,
+            page_num,
+            page_size,
+            cursor,
+            total_count,
         )
         return AllowedSchemaList(
             page_size=page_size,
             page_num=page_num,
-            total_count=total_count,
+            total_count=count,
             count=len(db_txn),
             schemas=db_txn,
+            next_cursor=next_cursor,
         )
     except Exception as e:
         raise HTTPException(status_code=db_to_http_exception(e), detail=str(e))
@@ -223,7 +256,8 @@ async def delete_allowed_schema(
             AllowedSchema.allowed_schema_id == allowed_schema_id
         )
         await db.execute(q)
-        await updated_allowed(db)
+        await db.commit()
+        await allow_list_changed(db)
         return {}
     except Exception as e:
         raise HTTPException(status_code=db_to_http_exception(e), detail=str(e))
@@ -247,6 +281,8 @@ async def get_allowed_cred_def(
     rev_reg_entry: Optional[bool] = None,
     page_size: int = 10,
     page_num: int = 1,
+    cursor: Optional[str] = None,
+    total_count: TotalCountType = TotalCountType.exact,
     db: AsyncSession = Depends(get_db),
 ) -> AllowedCredentialDefinitionList:
     try:
@@ -262,16 +298,23 @@ async def get_allowed_cred_def(
         }
 
         db_txn: list[AllowedCredentialDefinition]
-        total_count, db_txn = await select_from_table(
-            db, filters, AllowedCredentialDefinition, page_num, page_size
+        count, db_txn, next_cursor = await select_from_table(
+            db,
+            filters,
+            AllowedCredentialDefinition,
+            AllowedCredentialDefinition.allowed_cred_def_id,
+            page_num,
+            page_size,
+            cursor,
+            total_count,
         )
-        await updated_allowed(db)
         return AllowedCredentialDefinitionList(
             page_size=page_size,
             page_num=page_num,
-            total_count=total_count,
+            total_count=count,
             count=len(db_txn),
             credentials=db_txn,
+            next_cursor=next_cursor,
         )
     except Exception as e:
         raise HTTPException(status_code=db_to_http_exception(e), detail=str(e))
@@ -328,40 +371,34 @@ async def delete_allowed_cred_def(
             AllowedCredentialDefinition.allowed_cred_def_id == allowed_cred_def_id
         )
         await db.execute(q)
-        await updated_allowed(db)
+        await db.commit()
+        await allow_list_changed(db)
         return {}
     except Exception as e:
         raise HTTPException(status_code=db_to_http_exception(e), detail=str(e))
 
 
-def maybe_str_to_bool(s: str) -> str | bool:
-    return s == "True" if isinstance(s, str) else s
-
-
-def construct_allowed_credential_definition(cd):
-    cd["rev_reg_def"] = maybe_str_to_bool(cd["rev_reg_def"])
-    cd["rev_reg_entry"] = maybe_str_to_bool(cd["rev_reg_entry"])
-    ncd = AllowedCredentialDefinition(**cd)
-    return ncd
+@router.get(
+    "/reevaluation",
+    status_code=status.HTTP_200_OK,
+    response_model=dict,
+    description="Progress of the background re-check of pending transactions\
+    against the allow lists",
+)
+async def get_reevaluation() -> dict:
+    return pending_reevaluation.progress()
 
 
-async def update_allowed_config(k, v, db):
-    csvReader = DictReader(iterdecode(k.file, "utf-8"))
-    constructed_classes = [
-        (
-            construct_allowed_credential_definition(i)
-            if v is AllowedCredentialDefinition
-            else v(**i)
-        )
-        for i in csvReader
-    ]
-    tmp = {
-        "file_name": k.filename,
-        "contents": constructed_classes,
-    }
-    for i in tmp["contents"]:
-        db.add(i)
-    return tmp
+@router.post(
+    "/reevaluation",
+    status_code=status.HTTP_200_OK,
+    response_model=dict,
+    description="Re-check all pending transactions against the allow lists\
+    in the background",
+)
+async def start_reevaluation() -> dict:
+    updated_allowed()
+    return pending_reevaluation.progress()
 
 
 async def update_full_config(
@@ -370,6 +407,7 @@ async def update_full_config(
     credential_definition: Optional[UploadFile],
     db: AsyncSession,
     delete_contents: bool,
+    update_existing: bool = False,
 ):
     correlated_tables = {
         publish_did: AllowedPublicDid,
@@ -379,12 +417,26 @@ async def update_full_config(
     modifications = {}
     for k, v in correlated_tables.items():
         if k:
-            if delete_contents:
-                await db.execute(delete(v))
-            modifications[v.__name__] = await update_allowed_config(k, v, db)
+            modifications[v.__name__] = await import_allow_list(
+                db,
+                v,
+                iterdecode(k.file, "utf-8"),
+                file_name=k.filename,
+                replace=delete_contents,
+                update=update_existing,
+            )
+    # all the files, or none of them
     await db.commit()
-    await updated_allowed(db)
-    return modifications
+    added: list[BaseModel] | None = []
+    for result in modifications.values():
+        if not (result.inserted or result.updated):
+            continue
+        if result.entries is None or added is None:
+            added = None
+        else:
+            added.extend(result.entries)
+    await allow_list_changed(db, added)
+    return {name: result.to_dict() for name, result in modifications.items()}
 
 
 @router.post(
@@ -417,7 +469,8 @@ async def set_config(
     "/config",
     status_code=status.HTTP_200_OK,
     response_model=dict,
-    description="Upload a new csv config appending to the existing configuration",
+    description="Upload a new csv config appending to the existing configuration\
+    (existing entries are left as they are, or updated with update_existing)",
 )
 async def append_config(
     publish_did: Annotated[
@@ -429,11 +482,12 @@ async def append_config(
     credential_definition: Annotated[
         UploadFile, File(description="List of creddefs authorized to be published")
     ] = None,
+    update_existing: bool = False,
     db: AsyncSession = Depends(get_db),
 ) -> dict:
     try:
         return await update_full_config(
-            publish_did, schema, credential_definition, db, False
+            publish_did, schema, credential_definition, db, False, update_existing
         )
     except Exception as e:
         raise HTTPException(status_code=db_to_http_exception(e), detail=str(e))
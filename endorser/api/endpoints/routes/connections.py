@@ -4,8 +4,9 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_500_INTERNAL_SERVER_ERROR
 
+from api.db.paging import InvalidCursor, TotalCountType
 from api.endpoints.dependencies.db import get_db
 from api.endpoints.models.connections import (
     AuthorStatusType,
@@ -32,23 +33,30 @@ async def get_connections(
     connection_state: Optional[ConnectionStateType] = None,
     page_size: int = 10,
     page_num: int = 1,
+    cursor: Optional[str] = None,
+    total_count: TotalCountType = TotalCountType.exact,
     db: AsyncSession = Depends(get_db),
 ) -> ConnectionList:
     try:
-        (total_count, connections) = await get_connections_list(
+        (count, connections, next_cursor) = await get_connections_list(
             db,
             connection_state=connection_state.value if connection_state else None,
             page_size=page_size,
             page_num=page_num,
+            cursor=cursor,
+            total_count=total_count,
         )
         response: ConnectionList = ConnectionList(
             page_size=page_size,
             page_num=page_num,
             count=len(connections),
-            total_count=total_count,
+            total_count=count,
             connections=connections,
+            next_cursor=next_cursor,
         )
         return response
+    except InvalidCursor as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
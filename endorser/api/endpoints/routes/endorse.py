@@ -1,23 +1,33 @@
 import logging
+from datetime import datetime
 from typing import Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+from api.db.paging import InvalidCursor, TotalCountType
 from api.endpoints.dependencies.db import get_db
 from api.endpoints.models.endorse import (
+    BulkTransactionRequest,
+    BulkTransactionResultList,
     EndorseTransaction,
     EndorseTransactionList,
     EndorseTransactionState,
+    ExportFormatType,
+    TransactionViewType,
 )
 from api.services.endorse import (
+    InvalidBulkRequest,
+    bulk_update_transactions,
     get_transactions_list,
     get_transaction_object,
     endorse_transaction,
     reject_transaction,
 )
-from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
+from api.services.transaction_export import MEDIA_TYPES, export_transactions
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_500_INTERNAL_SERVER_ERROR
 
 
 router = APIRouter()
@@ -34,28 +44,122 @@ async def get_transactions(
     connection_id: Optional[str] = None,
     page_size: int = 10,
     page_num: int = 1,
+    cursor: Optional[str] = None,
+    total_count: TotalCountType = TotalCountType.exact,
+    view: TransactionViewType = TransactionViewType.full,
     db: AsyncSession = Depends(get_db),
 ) -> EndorseTransactionList:
+    """List transactions, newest first.
+
+    Pass the next_cursor from the previous page as cursor to page by keyset
+    instead of by page_num.  With view=summary the ledger payload is not fetched
+    (transaction and transaction_request are null), get the transaction by id
+    for its payload.
+    """
     try:
-        (total_count, transactions) = await get_transactions_list(
+        (count, transactions, next_cursor) = await get_transactions_list(
             db,
             transaction_state=transaction_state.value if transaction_state else None,
             connection_id=connection_id,
             page_size=page_size,
             page_num=page_num,
+            cursor=cursor,
+            total_count=total_count,
+            view=view,
         )
         response: EndorseTransactionList = EndorseTransactionList(
             page_size=page_size,
             page_num=page_num,
             count=len(transactions),
-            total_count=total_count,
+            total_count=count,
             transactions=transactions,
+            next_cursor=next_cursor,
         )
         return response
+    except InvalidCursor as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+async def bulk_update_endpoint(
+    action: str, request: BulkTransactionRequest, db: AsyncSession
+) -> BulkTransactionResultList:
+    try:
+        results = await bulk_update_transactions(db, action, request)
+        failed = sum(1 for r in results if r.error)
+        return BulkTransactionResultList(
+            count=len(results),
+            succeeded=len(results) - failed,
+            failed=failed,
+            results=results,
+        )
+    except InvalidBulkRequest as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post(
+    "/transactions/bulk-endorse",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkTransactionResultList,
+)
+async def bulk_endorse_transactions(
+    request: BulkTransactionRequest,
+    db: AsyncSession = Depends(get_db),
+) -> BulkTransactionResultList:
+    """Manually approve all the transactions matching the ids and/or filter."""
+    return await bulk_update_endpoint("endorse", request, db)
+
+
+@router.post(
+    "/transactions/bulk-reject",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkTransactionResultList,
+)
+async def bulk_reject_transactions(
+    request: BulkTransactionRequest,
+    db: AsyncSession = Depends(get_db),
+) -> BulkTransactionResultList:
+    """Manually reject all the transactions matching the ids and/or filter."""
+    return await bulk_update_endpoint("refuse", request, db)
+
+
+@router.get("/transactions/export", status_code=status.HTTP_200_OK)
+async def export_transactions_endpoint(
+    export_format: ExportFormatType = ExportFormatType.ndjson,
+    gzip: bool = False,
+    transaction_state: Optional[EndorseTransactionState] = None,
+    connection_id: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> StreamingResponse:
+    """Export all the matching transactions (created from start until end).
+
+    The export is streamed, oldest first, as NDJSON or CSV, gzipped if asked.
+    """
+    try:
+        chunks = export_transactions(
+            export_format,
+            compress=gzip,
+            state=transaction_state.value if transaction_state else None,
+            connection_id=connection_id,
+            transaction_type=transaction_type,
+            start=start,
+            end=end,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    filename = f"transactions.{export_format.value}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get(
     "/transactions/{transaction_id}",
     status_code=status.HTTP_200_OK,
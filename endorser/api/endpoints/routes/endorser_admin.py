@@ -1,20 +1,42 @@
 import logging
+from typing import Optional
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+import api.acapy_utils as au
 from api.endpoints.dependencies.db import get_db
 from api.endpoints.models.configurations import ConfigurationType
 from api.services.admin import (
     get_endorser_configs,
     get_endorser_config,
+    refresh_endorser_public_did,
     validate_endorser_config,
     update_endorser_config,
 )
 from api.endpoints.models.configurations import (
     Configuration,
 )
+from api.endpoints.models.webhooks import (
+    AcapyOutboxList,
+    WebhookInboxList,
+    WebhookInboxStatusType,
+)
+from api.db.models.acapy_outbox import AcapyOutbox
+from api.db.models.webhook_inbox import WebhookInbox
+from api.services.acapy_outbox import (
+    OutboxStatusType,
+    db_get_acapy_outbox_records,
+    retry_dead_call,
+)
+from api.services.webhook_inbox import (
+    db_get_webhook_inbox_records,
+    retry_dead_webhook,
+)
+from api.services.reconciler import reconciler
+from api.services.webhooks import webhook_dispatcher
 from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
 
 
@@ -70,3 +92,127 @@ async def update_config(
         return endorser_config
     except Exception as e:
         raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/public-did/refresh", status_code=status.HTTP_200_OK, response_model=dict)
+async def refresh_public_did() -> dict:
+    """Refresh the cached endorser public did (e.g. after a did rotation)."""
+    try:
+        return await refresh_endorser_public_did()
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get(
+    "/webhook-handlers", status_code=status.HTTP_200_OK, response_model=list[dict]
+)
+async def get_webhook_handlers() -> list[dict]:
+    """List the registered handlers and auto-steppers for each webhook topic/state."""
+    return webhook_dispatcher.describe()
+
+
+@router.get("/acapy-client", status_code=status.HTTP_200_OK, response_model=dict)
+async def get_acapy_client_stats() -> dict:
+    """The aca-py client's circuit breaker state and GET coalescing counters."""
+    return au.client_stats()
+
+
+@router.get("/reconciliation", status_code=status.HTTP_200_OK, response_model=dict)
+async def get_reconciliation() -> dict:
+    """Progress of the last reconciliation with aca-py."""
+    return reconciler.progress()
+
+
+@router.post("/reconciliation", status_code=status.HTTP_200_OK, response_model=dict)
+async def start_reconciliation() -> dict:
+    """Reconcile the connections and transactions with aca-py now."""
+    reconciler.trigger()
+    return reconciler.progress()
+
+
+@router.get(
+    "/webhook-inbox", status_code=status.HTTP_200_OK, response_model=WebhookInboxList
+)
+async def get_webhook_inbox(
+    webhook_status: Optional[WebhookInboxStatusType] = None,
+    page_size: int = 10,
+    page_num: int = 1,
+    db: AsyncSession = Depends(get_db),
+) -> WebhookInboxList:
+    """List queued webhooks, i.e. those that failed and were marked "dead"."""
+    try:
+        (total_count, webhooks) = await db_get_webhook_inbox_records(
+            db,
+            status=webhook_status.value if webhook_status else None,
+            page_size=page_size,
+            page_num=page_num,
+        )
+        return WebhookInboxList(
+            page_size=page_size,
+            page_num=page_num,
+            count=len(webhooks),
+            total_count=total_count,
+            webhooks=webhooks,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post(
+    "/webhook-inbox/{webhook_inbox_id}/retry",
+    status_code=status.HTTP_200_OK,
+    response_model=WebhookInbox,
+)
+async def retry_webhook(
+    webhook_inbox_id: UUID,
+    db: AsyncSession = Depends(get_db),
+) -> WebhookInbox:
+    """Re-queue a "dead" webhook for processing."""
+    try:
+        return await retry_dead_webhook(db, webhook_inbox_id)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get(
+    "/acapy-outbox", status_code=status.HTTP_200_OK, response_model=AcapyOutboxList
+)
+async def get_acapy_outbox(
+    call_status: Optional[OutboxStatusType] = None,
+    page_size: int = 10,
+    page_num: int = 1,
+    db: AsyncSession = Depends(get_db),
+) -> AcapyOutboxList:
+    """List queued aca-py calls, i.e. those that failed and were marked "dead"."""
+    try:
+        (total_count, calls) = await db_get_acapy_outbox_records(
+            db,
+            status=call_status.value if call_status else None,
+            page_size=page_size,
+            page_num=page_num,
+        )
+        return AcapyOutboxList(
+            page_size=page_size,
+            page_num=page_num,
+            count=len(calls),
+            total_count=total_count,
+            calls=calls,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post(
+    "/acapy-outbox/{acapy_outbox_id}/retry",
+    status_code=status.HTTP_200_OK,
+    response_model=AcapyOutbox,
+)
+async def retry_acapy_call(
+    acapy_outbox_id: UUID,
+    db: AsyncSession = Depends(get_db),
+) -> AcapyOutbox:
+    """Re-queue a "dead" aca-py call, to be sent again."""
+    try:
+        return await retry_dead_call(db, acapy_outbox_id)
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
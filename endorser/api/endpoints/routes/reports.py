@@ -1,7 +1,15 @@
 import logging
+from datetime import datetime
+from uuid import UUID
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_500_INTERNAL_SERVER_ERROR
+
+from api.endpoints.dependencies.db import get_db
+from api.endpoints.models.reports import ReportGroupByType, TransactionSummary
+from api.services.reports import get_transaction_summary
 
 
 logger = logging.getLogger(__name__)
@@ -9,17 +17,58 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.get("/summary", status_code=status.HTTP_200_OK, response_model=dict)
-async def get_transaction_report() -> dict:
-    # this should take some query params, sorting and paging params...
-    return {}
+async def summary_endpoint(db: AsyncSession, **kwargs) -> TransactionSummary:
+    try:
+        return await get_transaction_summary(db, **kwargs)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get(
+    "/summary", status_code=status.HTTP_200_OK, response_model=TransactionSummary
+)
+async def get_transaction_report(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    group_by: list[ReportGroupByType] = Query([ReportGroupByType.state]),
+    transaction_type: str | None = None,
+    state: str | None = None,
+    db: AsyncSession = Depends(get_db),
+) -> TransactionSummary:
+    """Number of transactions that entered each state in [start, end), by hour."""
+    return await summary_endpoint(
+        db,
+        group_by=group_by,
+        start=start,
+        end=end,
+        transaction_type=transaction_type,
+        state=state,
+    )
 
 
 @router.get(
-    "/summary/{connection_id}", status_code=status.HTTP_200_OK, response_model=dict
+    "/summary/{connection_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=TransactionSummary,
 )
 async def get_connection_transaction_report(
-    connection_id: str,
-) -> dict:
-    # this should take some query params, sorting and paging params...
-    return {}
+    connection_id: UUID,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    group_by: list[ReportGroupByType] = Query([ReportGroupByType.state]),
+    transaction_type: str | None = None,
+    state: str | None = None,
+    db: AsyncSession = Depends(get_db),
+) -> TransactionSummary:
+    """Number of a connection's transactions that entered each state."""
+    return await summary_endpoint(
+        db,
+        group_by=group_by,
+        start=start,
+        end=end,
+        connection_id=connection_id,
+        transaction_type=transaction_type,
+        state=state,
+    )
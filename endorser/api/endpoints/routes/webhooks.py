@@ -1,17 +1,22 @@
 import logging
-import traceback
-from enum import Enum
 
 from fastapi import APIRouter, Depends, FastAPI, HTTPException, Security
 from fastapi.security.api_key import APIKey, APIKeyHeader
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.middleware import Middleware
 from starlette.status import HTTP_403_FORBIDDEN
+from starlette_context import plugins
+from starlette_context.middleware import RawContextMiddleware
 
-import api.services as api_services
 from api.core.config import settings
+from api.core.tracing import span
 from api.endpoints.dependencies.db import get_db
 from api.endpoints.models.connections import Connection
 from api.endpoints.models.endorse import EndorseTransaction
+from api.endpoints.models.webhooks import WebhookTopicType
+from api.services.webhook_inbox import enqueue_webhook
+from api.services.webhook_receipts import recent_webhooks, webhook_receipt_key
+from api.services.webhooks import commit_webhook, process_webhook_payload
 
 logger = logging.getLogger(__name__)
 
@@ -22,26 +27,6 @@ api_key_header = APIKeyHeader(
 )
 
 
-class WebhookTopicType(str, Enum):
-    ping = "ping"
-    connections = "connections"
-    oob_invitation = "oob-invitation"
-    connection_reuse = "connection-reuse"
-    connection_reuse_accepted = "connection-reuse-accepted"
-    basicmessages = "basicmessages"
-    issue_credential = "issue-credential"
-    issue_credential_v2_0 = "issue-credential-v2-0"
-    issue_credential_v2_0_indy = "issue-credential-v2-0-indy"
-    issue_credential_v2_0_ld_proof = "issue-credential-v2-0-ld-proof"
-    issuer_cred_rev = "issuer-cred-rev"
-    present_proof = "present-proof"
-    present_proof_v2_0 = "present-proof-v2-0"
-    endorse_transaction = "endorse_transaction"
-    revocation_registry = "revocation-registry"
-    revocation_notification = "revocation-notification"
-    problem_report = "problem-report"
-
-
 async def get_api_key(
     api_key_header: str = Security(api_key_header),
 ):
@@ -58,7 +43,13 @@ def get_webhookapp() -> FastAPI:
         title="WebHooks",
         description="Endpoints for Aca-Py WebHooks",
         debug=settings.DEBUG,
-        middleware=None,
+        # request ids, so a webhook's trace can be matched with its logs
+        middleware=[
+            Middleware(
+                RawContextMiddleware,
+                plugins=(plugins.RequestIdPlugin(), plugins.CorrelationIdPlugin()),
+            ),
+        ],
     )
     application.include_router(router, prefix="")
     return application
@@ -79,34 +70,16 @@ async def process_webhook(
         logger.info(f">>> Called webhook for endorser: {topic.name}")
     logger.debug(f">>> payload: {payload}")
 
-    # call the handler to process the hook, if present
-    result = {}
-    try:
-        handler = f"handle_{topic.name}_{state}" if state else f"handle_{topic.name}"
-        handler = handler.replace("-", "_")
-        if hasattr(api_services, handler):
-            result = await getattr(api_services, handler)(db, payload)
-            logger.debug(f">>> {handler} returns = {result}")
-        else:
-            logger.warn(f">>> no webhook handler available for: {handler}")
-    except Exception as e:
-        logger.error(">>> handler returned error:" + str(e))
-        traceback.print_exc()
+    with span("process_webhook", topic=topic.value, state=state):
+        if settings.ENDORSER_WEBHOOK_QUEUE:
+            receipt_key = webhook_receipt_key(topic, payload)
+            if receipt_key and receipt_key in recent_webhooks:
+                logger.info(f">>> ignoring redelivered webhook: {receipt_key}")
+                return {}
+            # acknowledge straight away, the webhook workers will process it
+            await enqueue_webhook(db, topic, payload)
+            return {}
+
+        result = await process_webhook_payload(db, topic, payload)
+        await commit_webhook(db)
         return result
-
-    try:
-        # call the "auto-stepper" if we have one, to move to the next state
-        stepper = (
-            f"auto_step_{topic.name}_{state}" if state else f"auto_step_{topic.name}"
-        )
-        stepper = stepper.replace("-", "_")
-        if hasattr(api_services, stepper):
-            _stepper_result = await getattr(api_services, stepper)(db, payload, result)
-            logger.debug(f">>> {stepper} returns = {_stepper_result}")
-        else:
-            logger.warn(f">>> no webhook stepper available for: {stepper}")
-    except Exception as e:
-        logger.error(">>> auto-stepper returned error:" + str(e))
-        traceback.print_exc()
-
-    return result
@@ -4,11 +4,28 @@ import time
 from pathlib import Path
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
+from fastapi.security import OAuth2PasswordBearer
+from fastapi.responses import PlainTextResponse
 
+import api.acapy_utils as au
 from api.core.config import settings
+import api.core.metrics as metrics
+from api.core.tracing import tracer
 from api.endorser_main import get_endorserapp
+from api.endpoints.dependencies.jwt_security import verify_access_token
 from api.endpoints.routes.webhooks import get_webhookapp
+from api.db import notify
+from api.db.session import async_session
+from api.services.acapy_outbox import outbox_dispatcher
+from api.services.allow_lists import pending_reevaluation
+from api.services.allow_matcher import reload_allow_matcher
+from api.services.configurations import load_config_snapshot
+from api.services.reconciler import reconciler
+from api.services.endorse import refresh_endorser_did
+from api.services.webhook_inbox import webhook_workers
+from api.services.reports import report_rollup
+from api.services.webhook_receipts import webhook_receipt_pruner
 
 # setup loggers
 # TODO: set config via env parameters...
@@ -48,18 +65,72 @@ app.mount("/endorser", endorser_app)
 async def on_endorser_startup():
     """Register any events we need to respond to."""
     logger.warning(">>> Starting up app ...")
+    await au.start_acapy_session()
+    try:
+        await refresh_endorser_did()
+    except Exception as e:
+        # aca-py may not be up yet, the did is fetched on first use instead
+        logger.warning(f">>> Unable to pre-load endorser public did: {e}")
+    try:
+        async with async_session() as db:
+            await reload_allow_matcher(db)
+            await load_config_snapshot(db)
+    except Exception as e:
+        # the allow lists and configuration are loaded on first use instead
+        logger.warning(f">>> Unable to pre-load allow lists and configuration: {e}")
+    try:
+        await notify.start_listener()
+    except Exception as e:
+        logger.warning(f">>> Unable to listen for cache notifications: {e}")
+    outbox_dispatcher.start()
+    reconciler.start()
+    webhook_receipt_pruner.start()
+    report_rollup.start()
+    if settings.ENDORSER_WEBHOOK_QUEUE:
+        webhook_workers.start(settings.ENDORSER_WEBHOOK_WORKERS)
 
 
 @app.on_event("shutdown")
-def on_endorser_shutdown():
-    """TODO no-op for now."""
+async def on_endorser_shutdown():
+    """Release any shared resources."""
     logger.warning(">>> Sutting down app ...")
-    pass
+    await reconciler.stop()
+    await webhook_receipt_pruner.stop()
+    await report_rollup.stop()
+    await webhook_workers.stop()
+    await outbox_dispatcher.stop()
+    await pending_reevaluation.stop()
+    await notify.stop_listener()
+    await au.close_acapy_session()
+    tracer.shutdown()
 
 
 @app.get("/", tags=["liveness"])
 def main():
-    return {"status": "ok", "health": "ok"}
+    # liveness stays "ok" while aca-py is down, restarting us wouldn't help
+    acapy = au.circuit_state()
+    health = "ok" if acapy["state"] == au.CircuitState.closed.value else "degraded"
+    return {"status": "ok", "health": health, "acapy": acapy}
+
+
+metrics_token = OAuth2PasswordBearer(tokenUrl="endorser/token", auto_error=False)
+
+
+def metrics_auth(token: str | None = Depends(metrics_token)):
+    # the same token as the endorser api, unless exposed on purpose
+    if settings.ENDORSER_METRICS_PUBLIC:
+        return
+    verify_access_token(token or "")
+
+
+@app.get(
+    "/metrics",
+    tags=["metrics"],
+    response_class=PlainTextResponse,
+    dependencies=[Depends(metrics_auth)],
+)
+def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
 
 
 if __name__ == "__main__":
@@ -6,6 +6,7 @@ from api.services.auto_state_handlers import (
     auto_step_endorse_transaction_request_received,  # noqa: F401
     auto_step_endorse_transaction_transaction_acked,  # noqa: F401
     auto_step_endorse_transaction_transaction_endorsed,  # noqa: F401
+    auto_step_endorse_transaction_transaction_refused,  # noqa: F401
     auto_step_ping_received,  # noqa: F401
 )
 from api.services.webhook_handlers import (
@@ -16,6 +17,7 @@ from api.services.webhook_handlers import (
     handle_endorse_transaction_request_received,  # noqa: F401
     handle_endorse_transaction_transaction_acked,  # noqa: F401
     handle_endorse_transaction_transaction_endorsed,  # noqa: F401
+    handle_endorse_transaction_transaction_refused,  # noqa: F401
     handle_ping_received,  # noqa: F401
 )
 
@@ -27,6 +29,7 @@ __all__ = [
     "handle_connections_completed",
     "handle_endorse_transaction_request_received",
     "handle_endorse_transaction_transaction_endorsed",
+    "handle_endorse_transaction_transaction_refused",
     "handle_endorse_transaction_transaction_acked",
     "auto_step_ping_received",
     "auto_step_connections_active",
@@ -35,5 +38,6 @@ __all__ = [
     "auto_step_connections_response",
     "auto_step_endorse_transaction_request_received",
     "auto_step_endorse_transaction_transaction_endorsed",
+    "auto_step_endorse_transaction_transaction_refused",
     "auto_step_endorse_transaction_transaction_acked",
 ]
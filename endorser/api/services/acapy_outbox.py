@@ -0,0 +1,311 @@
+"""Outbox for the aca-py admin calls made while processing a webhook.
+
+A webhook's handler and auto-steppers run in one database transaction (see
+process_webhook_payload).  Any aca-py POST they make is recorded in the
+acapyoutbox table, in that same transaction, instead of being sent straight away.
+Once the transaction commits, the outbox dispatcher sends the calls:
+
+- calls for the same ordering_key (transaction_id or connection_id) are sent one
+  at a time, in the order they were recorded
+- a failed call is retried with exponential backoff, after
+  ENDORSER_OUTBOX_MAX_ATTEMPTS attempts it is marked "dead", dead calls are
+  counted in a metric, and can be listed and re-queued through the admin api
+- if a call has a transaction_id, the state aca-py returns is saved on that
+  transaction
+
+So a webhook that fails midway leaves neither database changes nor aca-py calls
+behind, and after a crash the committed calls are still sent.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import cast
+from uuid import UUID
+
+from sqlalchemy import Integer, String, delete, desc, select, text, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.functions import func
+
+import api.acapy_utils as au
+from api.core.config import settings
+from api.core.metrics import OUTBOX_DEAD_CALLS
+from api.db.errors import DoesNotExist
+from api.db.models.acapy_outbox import AcapyOutbox
+from api.db.models.endorse_request import EndorseRequest
+from api.db.session import async_session
+from api.endpoints.models.endorse import EndorseTransactionState
+from api.endpoints.models.webhooks import WebhookInboxStatusType
+
+logger = logging.getLogger(__name__)
+
+# set in db.info while the session is processing a webhook
+OUTBOX_SESSION_KEY = "acapy_outbox"
+
+# the outbox uses the same pending/processing/dead life cycle as the webhook inbox
+OutboxStatusType = WebhookInboxStatusType
+
+CLAIM_NEXT_CALL = text("""
+    UPDATE acapyoutbox SET status = 'processing', attempts = attempts + 1,
+        updated_at = now()
+    WHERE acapy_outbox_id = (
+        SELECT o.acapy_outbox_id FROM acapyoutbox o
+        WHERE o.status = 'pending' AND o.next_attempt_at <= now()
+        AND NOT EXISTS (
+            SELECT 1 FROM acapyoutbox e
+            WHERE e.ordering_key = o.ordering_key AND e.seq < o.seq
+            AND e.status IN ('pending', 'processing')
+        )
+        ORDER BY o.seq
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING acapy_outbox_id, method, path, params, transaction_id, attempts
+    """).columns(
+    acapy_outbox_id=PG_UUID(as_uuid=True),
+    method=String,
+    path=String,
+    params=JSONB,
+    transaction_id=PG_UUID(as_uuid=True),
+    attempts=Integer,
+)
+
+RELEASE_EXPIRED_LEASES = text("""
+    UPDATE acapyoutbox SET status = 'pending', updated_at = now()
+    WHERE status = 'processing'
+    AND updated_at < now() - make_interval(secs => :lease_timeout)
+    """)
+
+
+@asynccontextmanager
+async def outbox_session(db: AsyncSession):
+    """Record aca-py calls made with this session in the outbox."""
+    db.info[OUTBOX_SESSION_KEY] = True
+    try:
+        yield db
+    finally:
+        db.info.pop(OUTBOX_SESSION_KEY, None)
+
+
+async def acapy_post(
+    db: AsyncSession,
+    path: str,
+    ordering_key: UUID | str,
+    params: dict | None = None,
+    transaction_id: UUID | None = None,
+) -> dict | None:
+    """POST to the aca-py admin api, through the outbox if the session uses one.
+
+    Args:
+        db: database session
+        path: admin api path
+        ordering_key: transaction_id or connection_id the call applies to
+        params: query parameters
+        transaction_id: transaction to update with the state aca-py returns
+
+    Returns:
+        the aca-py response, or None if the call was recorded in the outbox
+    """
+    if not db.info.get(OUTBOX_SESSION_KEY):
+        return cast(dict, await au.acapy_POST(path, params=params))
+
+    db.add(
+        AcapyOutbox(
+            ordering_key=str(ordering_key),
+            method="POST",
+            path=path,
+            params=params,
+            transaction_id=transaction_id,
+            status=OutboxStatusType.pending.value,
+            attempts=0,
+        )
+    )
+    await db.flush()
+    return None
+
+
+async def send_next_call() -> bool:
+    """Claim and send one outbox call, returns False if there was nothing to do."""
+    async with async_session() as db:
+        row = (await db.execute(CLAIM_NEXT_CALL)).one_or_none()
+        await db.commit()
+    if not row:
+        return False
+
+    logger.debug(f">>> sending outbox call {row.method} {row.path}")
+    try:
+        response = cast(
+            dict,
+            await au.acapy_admin_request(
+                row.method, row.path, params=row.params, tenant=True
+            ),
+        )
+    except Exception as e:
+        async with async_session() as db:
+            await fail_call(db, row.acapy_outbox_id, row.attempts, str(e))
+        return True
+
+    async with async_session() as db:
+        if row.transaction_id and isinstance(response, dict) and "state" in response:
+            # unless a later webhook has already moved the transaction on
+            await db.execute(
+                update(EndorseRequest)
+                .where(EndorseRequest.transaction_id == row.transaction_id)
+                .where(
+                    EndorseRequest.state
+                    == EndorseTransactionState.request_received.value
+                )
+                .values(state=response["state"])
+            )
+        await db.execute(
+            delete(AcapyOutbox).where(
+                AcapyOutbox.acapy_outbox_id == row.acapy_outbox_id
+            )
+        )
+        await db.commit()
+    return True
+
+
+async def update_dead_calls_gauge(db: AsyncSession):
+    q = select(func.count()).where(AcapyOutbox.status == OutboxStatusType.dead.value)
+    OUTBOX_DEAD_CALLS.set((await db.execute(q)).scalar() or 0)
+
+
+async def db_get_acapy_outbox_records(
+    db: AsyncSession,
+    status: str | None = None,
+    page_size: int = 10,
+    page_num: int = 1,
+) -> tuple[int, list[AcapyOutbox]]:
+    limit = page_size
+    skip = (page_num - 1) * limit
+    filters = []
+    if status:
+        filters.append(AcapyOutbox.status == status)
+
+    base_q = select(AcapyOutbox).filter(*filters)
+
+    count_q = base_q.with_only_columns(func.count()).order_by(None)
+    count_q_rec = await db.execute(count_q)
+    total_count: int = count_q_rec.scalar() or 0
+
+    results_q = base_q.limit(limit).offset(skip).order_by(desc(AcapyOutbox.seq))
+    results_q_recs = await db.execute(results_q)
+    db_calls: list[AcapyOutbox] = results_q_recs.scalars().all()
+
+    return (total_count, db_calls)
+
+
+async def retry_dead_call(db: AsyncSession, acapy_outbox_id: UUID) -> AcapyOutbox:
+    q = (
+        update(AcapyOutbox)
+        .where(AcapyOutbox.acapy_outbox_id == acapy_outbox_id)
+        .where(AcapyOutbox.status == OutboxStatusType.dead.value)
+        .values(
+            status=OutboxStatusType.pending.value,
+            attempts=0,
+            next_attempt_at=func.now(),
+        )
+        .returning(AcapyOutbox)
+    )
+    result = await db.execute(q)
+    result_rec = result.scalar_one_or_none()
+    if not result_rec:
+        raise DoesNotExist(
+            f"{AcapyOutbox.__name__}<acapy_outbox_id:{acapy_outbox_id}> "
+            "does not exist or is not dead"
+        )
+    await db.commit()
+    await update_dead_calls_gauge(db)
+    outbox_dispatcher.wake()
+    return result_rec
+
+
+async def fail_call(db: AsyncSession, acapy_outbox_id: UUID, attempts: int, error: str):
+    if attempts >= settings.ENDORSER_OUTBOX_MAX_ATTEMPTS:
+        status = OutboxStatusType.dead
+        logger.error(
+            f">>> outbox call {acapy_outbox_id} failed {attempts} times: {error}"
+        )
+    else:
+        status = OutboxStatusType.pending
+    delay = settings.ENDORSER_OUTBOX_RETRY_DELAY * (2 ** (attempts - 1))
+    q = (
+        update(AcapyOutbox)
+        .where(AcapyOutbox.acapy_outbox_id == acapy_outbox_id)
+        .values(
+            status=status.value,
+            last_error=error,
+            next_attempt_at=func.now() + timedelta(seconds=delay),
+        )
+    )
+    await db.execute(q)
+    await db.commit()
+    if status == OutboxStatusType.dead:
+        await update_dead_calls_gauge(db)
+
+
+class OutboxDispatcher:
+    """asyncio task that sends the committed outbox calls."""
+
+    def __init__(self):
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    def wake(self):
+        """Call after committing a session that recorded outbox calls."""
+        self._wakeup.set()
+
+    async def _run(self):
+        logger.info(">>> outbox dispatcher started")
+        while True:
+            try:
+                if await send_next_call():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f">>> outbox dispatcher error: {e}")
+            # nothing to do, wait until woken up or the next poll
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), settings.ENDORSER_OUTBOX_POLL_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _release_expired_leases(self):
+        while True:
+            try:
+                async with async_session() as db:
+                    await db.execute(
+                        RELEASE_EXPIRED_LEASES,
+                        {"lease_timeout": settings.ENDORSER_OUTBOX_LEASE_TIMEOUT},
+                    )
+                    await db.commit()
+                    # and count the dead calls, e.g. after a restart
+                    await update_dead_calls_gauge(db)
+            except Exception as e:
+                logger.error(f">>> unable to release expired outbox leases: {e}")
+            await asyncio.sleep(settings.ENDORSER_OUTBOX_LEASE_TIMEOUT)
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run()),
+            asyncio.create_task(self._release_expired_leases()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+outbox_dispatcher = OutboxDispatcher()
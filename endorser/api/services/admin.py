@@ -17,6 +17,10 @@ from api.services.configurations import (
     get_config_record,
     update_config_record,
 )
+from api.services.endorse import (
+    invalidate_endorser_did,
+    refresh_endorser_did,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -75,3 +79,10 @@ async def update_endorser_config(
     config_value: str,
 ) -> Configuration:
     return await update_config_record(db, config_name, config_value)
+
+
+async def refresh_endorser_public_did() -> dict:
+    """Re-load the endorser public did, i.e. after the did has been rotated."""
+    invalidate_endorser_did()
+    endorser_did = await refresh_endorser_did()
+    return {"public_did": endorser_did}
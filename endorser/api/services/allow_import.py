@@ -0,0 +1,324 @@
+"""Bulk import of the allow list csv files (the /allow/config endpoints).
+
+A file is parsed ENDORSER_ALLOW_IMPORT_CHUNK_SIZE rows at a time, in a worker
+thread so a large file doesn't hold up the event loop.  Each chunk is
+validated and the valid rows are loaded with COPY into a temporary staging
+table, then the staging table is merged into the allow list with a single
+INSERT ... ON CONFLICT.  Everything runs in the caller's transaction, so an
+upload is applied as a whole or not at all.  Invalid rows are skipped and
+reported (by line number) rather than failing the upload, except when the file
+replaces the allow list, as that would drop the entries of the invalid rows.
+
+The primary keys of the schema and credential definition tables are normally
+computed by a python column default, which COPY bypasses, so they are computed
+here the same way.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from csv import DictReader
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator
+
+from sqlalchemy import delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.core.config import settings
+from api.db.models.allow import (
+    AllowedCredentialDefinition,
+    AllowedPublicDid,
+    AllowedSchema,
+)
+from api.db.models.base import BaseModel
+from api.services.allow_lists import MAX_QUEUED_CONDITIONS
+
+logger = logging.getLogger(__name__)
+
+TRUE_VALUES = ("true", "1", "yes")
+FALSE_VALUES = ("false", "0", "no", "")
+
+
+class InvalidAllowFile(ValueError):
+    pass
+
+
+def parse_bool(value: str) -> bool:
+    if value.strip().lower() in TRUE_VALUES:
+        return True
+    if value.strip().lower() in FALSE_VALUES:
+        return False
+    raise ValueError(f"expected True or False, got {value!r}")
+
+
+@dataclass
+class AllowImportSpec:
+    model: type[BaseModel]
+    # csv columns, the required ones must have a value in every row
+    required: list[str]
+    optional: list[str]
+    # primary key column, and how to compute it (None if it is a csv column)
+    key: str
+    make_key: Callable[[dict], uuid.UUID] | None = None
+    # columns parsed as booleans
+    booleans: list[str] = field(default_factory=list)
+
+    @property
+    def table(self) -> str:
+        return self.model.__tablename__
+
+    @property
+    def columns(self) -> list[str]:
+        columns = self.required + self.optional
+        return columns if self.make_key is None else [self.key] + columns
+
+    def parse(self, row: dict) -> dict:
+        """The column values of a csv row.
+
+        Raises:
+            ValueError: if the row is invalid
+        """
+        values = {}
+        for column in self.required:
+            value = (row.get(column) or "").strip()
+            if not value:
+                raise ValueError(f"{column} is required")
+            values[column] = value
+        for column in self.optional:
+            values[column] = row.get(column) or None
+        for column in self.booleans:
+            try:
+                values[column] = parse_bool(values[column] or "")
+            except ValueError as e:
+                raise ValueError(f"{column}: {e}")
+        if self.make_key is not None:
+            values[self.key] = self.make_key(values)
+        return values
+
+    def record(self, values: dict) -> tuple:
+        """The staging table record (in the order of columns)."""
+        return tuple(values[column] for column in self.columns)
+
+
+# the same ids as allowed_schema_uuid() and allowed_cred_def_uuid()
+def schema_key(values: dict) -> uuid.UUID:
+    return uuid.uuid5(
+        uuid.NAMESPACE_OID,
+        values["author_did"] + values["schema_name"] + values["version"],
+    )
+
+
+def cred_def_key(values: dict) -> uuid.UUID:
+    return uuid.uuid5(
+        uuid.NAMESPACE_OID,
+        values["schema_issuer_did"]
+        + values["creddef_author_did"]
+        + values["schema_name"]
+        + values["version"]
+        + values["tag"],
+    )
+
+
+IMPORT_SPECS: dict[type[BaseModel], AllowImportSpec] = {
+    AllowedPublicDid: AllowImportSpec(
+        AllowedPublicDid, ["registered_did"], ["details"], "registered_did"
+    ),
+    AllowedSchema: AllowImportSpec(
+        AllowedSchema,
+        ["author_did", "schema_name", "version"],
+        ["details"],
+        "allowed_schema_id",
+        schema_key,
+    ),
+    AllowedCredentialDefinition: AllowImportSpec(
+        AllowedCredentialDefinition,
+        ["schema_issuer_did", "creddef_author_did", "schema_name", "version", "tag"],
+        ["rev_reg_def", "rev_reg_entry", "details"],
+        "allowed_cred_def_id",
+        cred_def_key,
+        booleans=["rev_reg_def", "rev_reg_entry"],
+    ),
+}
+
+
+@dataclass
+class AllowImportResult:
+    file_name: str | None
+    rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    # already in the allow list (or repeated in the file)
+    unchanged: int = 0
+    error_count: int = 0
+    errors: list[dict] = field(default_factory=list)
+    seconds: float = 0.0
+    # the first valid entries, for a targeted re-check of the pending requests
+    # (None if there are too many, i.e. re-check all of them)
+    entries: list[BaseModel] | None = field(default_factory=list)
+
+    def add_entry(self, entry: BaseModel):
+        if self.entries is not None:
+            if len(self.entries) < MAX_QUEUED_CONDITIONS:
+                self.entries.append(entry)
+            else:
+                self.entries = None
+
+    def add_error(self, line: int, error: str):
+        self.error_count += 1
+        if len(self.errors) < settings.ENDORSER_ALLOW_IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def to_dict(self) -> dict:
+        return {
+            "file_name": self.file_name,
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows / self.seconds) if self.seconds else 0,
+        }
+
+
+def parse_chunks(
+    spec: AllowImportSpec,
+    lines: Iterable[str],
+    result: AllowImportResult,
+    chunk_size: int,
+) -> Iterator[list[tuple]]:
+    """Parse csv lines into chunks of (line number, record), recording errors.
+
+    Raises:
+        InvalidAllowFile: if the header is missing a required column
+    """
+    reader = DictReader(lines)
+    if reader.fieldnames is None:
+        # an empty file
+        return
+    missing = [c for c in spec.required if c not in reader.fieldnames]
+    if missing:
+        raise InvalidAllowFile(
+            f"{result.file_name}: missing column(s) {', '.join(missing)}"
+        )
+    chunk = []
+    for row in reader:
+        result.rows += 1
+        try:
+            values = spec.parse(row)
+        except ValueError as e:
+            result.add_error(reader.line_num, str(e))
+            continue
+        chunk.append((reader.line_num,) + spec.record(values))
+        if result.entries is not None:
+            result.add_entry(spec.model(**values))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def merge_staged(
+    db: AsyncSession, spec: AllowImportSpec, staging: str, update: bool
+) -> tuple[int, int]:
+    """Merge the staging table into the allow list.
+
+    Returns:
+        (inserted, updated)
+    """
+    columns = ", ".join(spec.columns)
+    conflict = "DO NOTHING"
+    if update:
+        changed = [c for c in spec.columns if c != spec.key]
+        conflict = (
+            "DO UPDATE SET "
+            + ", ".join(f"{c} = EXCLUDED.{c}" for c in changed)
+            + ", updated_at = now() WHERE ("
+            + ", ".join(f"{spec.table}.{c}" for c in changed)
+            + ") IS DISTINCT FROM ("
+            + ", ".join(f"EXCLUDED.{c}" for c in changed)
+            + ")"
+        )
+    # the last of any repeated rows wins, a row can only be merged once
+    result = await db.execute(
+        text(
+            f"INSERT INTO {spec.table} ({columns})"
+            f" SELECT DISTINCT ON ({spec.key}) {columns} FROM {staging}"
+            f" ORDER BY {spec.key}, import_line DESC"
+            f" ON CONFLICT ({spec.key}) {conflict}"
+            " RETURNING (xmax = 0) AS inserted"
+        )
+    )
+    merged = [row.inserted for row in result]
+    inserted = sum(1 for row_inserted in merged if row_inserted)
+    return (inserted, len(merged) - inserted)
+
+
+async def import_allow_list(
+    db: AsyncSession,
+    model: type[BaseModel],
+    lines: Iterable[str],
+    file_name: str | None = None,
+    replace: bool = False,
+    update: bool = False,
+) -> AllowImportResult:
+    """Load a csv file into an allow list, in the session's transaction.
+
+    Args:
+        db: database session (not committed here)
+        model: the allow list table
+        lines: the lines of the csv file
+        file_name: the uploaded file's name, for the result
+        replace: delete the current entries first
+        update: update entries that already exist, instead of leaving them
+
+    Raises:
+        InvalidAllowFile: if the header is missing a required column, or if the
+            file would replace the allow list and has invalid rows
+    """
+    spec = IMPORT_SPECS[model]
+    result = AllowImportResult(file_name)
+    started = time.perf_counter()
+
+    staging = f"allow_import_{spec.table}"
+    await db.execute(
+        text(
+            f"CREATE TEMPORARY TABLE {staging}"
+            f" (LIKE {spec.table} INCLUDING DEFAULTS, import_line integer)"
+        )
+    )
+    # COPY needs the asyncpg connection
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    chunks = parse_chunks(
+        spec, lines, result, settings.ENDORSER_ALLOW_IMPORT_CHUNK_SIZE
+    )
+    # reading and validating the rows would block the event loop
+    while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+        await driver_connection.copy_records_to_table(
+            staging, records=chunk, columns=["import_line"] + spec.columns
+        )
+
+    if replace:
+        if result.error_count:
+            raise InvalidAllowFile(
+                f"{result.file_name}: {result.error_count} invalid row(s), the"
+                f" allow list was not replaced: {result.errors}"
+            )
+        await db.execute(delete(model))
+    (result.inserted, result.updated) = await merge_staged(db, spec, staging, update)
+    valid = result.rows - result.error_count
+    result.unchanged = valid - result.inserted - result.updated
+    await db.execute(text(f"DROP TABLE {staging}"))
+
+    result.seconds = time.perf_counter() - started
+    logger.info(
+        f">>> imported {result.rows} rows into {spec.table}:"
+        f" {result.inserted} inserted, {result.updated} updated,"
+        f" {result.error_count} invalid, in {result.seconds:.3f}s"
+    )
+    return result
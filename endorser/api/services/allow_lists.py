@@ -1,45 +1,243 @@
+import asyncio
 import logging
-from typing import TypeVar
+import time
+from datetime import datetime
+from typing import Iterable, TypeVar
 from api.db.models.base import BaseModel
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import select, delete
+from sqlalchemy import ColumnElement, and_, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from psycopg2.errors import UniqueViolation
+from api.core.config import settings
+from api.core.metrics import REEVALUATION_DURATION, REEVALUATION_TRANSACTIONS
 from api.endpoints.models.endorse import (
     EndorseTransactionState,
+    EndorseTransactionType,
     db_to_txn_object,
 )
+from api.db.models.allow import (
+    AllowedCredentialDefinition,
+    AllowedPublicDid,
+    AllowedSchema,
+)
 from api.db.models.endorse_request import EndorseRequest
+from api.db.notify import notify_changed
+from api.db.session import async_session
+from api.services.allow_matcher import (
+    ALLOW_LIST_NOTIFY_TOPIC,
+    WILDCARD,
+    reload_allow_matcher,
+)
 from api.services.auto_state_handlers import is_endorsable_transaction
 from api.services.endorse import endorse_transaction
 from api.db.errors import AlreadyExists
 
-
 logger = logging.getLogger(__name__)
 
+# beyond this many queued conditions (e.g. a large csv upload), re-check all
+# pending requests rather than building a huge OR
+MAX_QUEUED_CONDITIONS = 100
 
-async def updated_allowed(db: AsyncSession) -> None:
-    try:
-        q = select(EndorseRequest).where(
-            EndorseRequest.state == EndorseTransactionState.request_received
-        )
-        result = await db.execute(q)
-        db_txns: list[EndorseRequest] = result.scalars().all()
-        for txn in db_txns:
-            transaction = db_to_txn_object(txn, acapy_txn=None)
-            logger.debug(
-                f">>> from updated_allowed: the current transaction is {transaction}"
+
+def pending_filter(entry: BaseModel) -> ColumnElement | None:
+    """The pending transactions a new allow list entry could make endorsable.
+
+    Returns None for an unknown entry type (i.e. re-check everything).  The
+    conditions line up with the ix_endorserequest_pending_type_author index.
+    """
+    match entry:
+        case AllowedPublicDid():
+            # the did is inside the transaction, so check every did transaction
+            return or_(
+                EndorseRequest.transaction_type == EndorseTransactionType.did.value,
+                EndorseRequest.author_goal_code
+                == "aries.transaction.register_public_did",
+            )
+        case AllowedSchema():
+            condition = EndorseRequest.transaction_type == (
+                EndorseTransactionType.schema.value
+            )
+            if entry.author_did and entry.author_did != WILDCARD:
+                condition = and_(
+                    condition, EndorseRequest.author_did == entry.author_did
+                )
+            return condition
+        case AllowedCredentialDefinition():
+            condition = EndorseRequest.transaction_type == (
+                EndorseTransactionType.cred_def.value
+            )
+            if entry.creddef_author_did and entry.creddef_author_did != WILDCARD:
+                condition = and_(
+                    condition, EndorseRequest.author_did == entry.creddef_author_did
+                )
+            # revocation transactions carry the creddef author in the cred def id
+            rev_types = []
+            if entry.rev_reg_def:
+                rev_types.append(EndorseTransactionType.revoc_registry.value)
+            if entry.rev_reg_entry:
+                rev_types.append(EndorseTransactionType.revoc_entry.value)
+            if rev_types:
+                condition = or_(
+                    condition, EndorseRequest.transaction_type.in_(rev_types)
+                )
+            return condition
+    return None
+
+
+class PendingReevaluation:
+    """Background re-check of pending transactions against the allow lists.
+
+    Changes that arrive while a pass is running are merged and picked up by the
+    next pass, so a burst of allow list updates costs at most one extra pass.
+    Transactions are checked in batches, ENDORSER_REEVALUATE_CONCURRENCY at a
+    time, each in its own session.
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        # conditions waiting for the next pass, None means all pending requests
+        self._queued: list[ColumnElement] | None = []
+        self._progress: dict = {
+            "status": "idle",
+            "checked": 0,
+            "endorsed": 0,
+            "failed": 0,
+            "started_at": None,
+            "finished_at": None,
+        }
+
+    def schedule(self, conditions: Iterable[ColumnElement | None] | None = None):
+        """Queue a re-check of the pending requests matching any condition.
+
+        Args:
+            conditions: filters on EndorseRequest, None (or a None entry) to
+                re-check all pending requests
+        """
+        if conditions is not None:
+            conditions = list(conditions)
+        if (
+            conditions is None
+            or any(condition is None for condition in conditions)
+            or len(conditions) + len(self._queued or []) > MAX_QUEUED_CONDITIONS
+        ):
+            self._queued = None
+        elif self._queued is not None:
+            self._queued.extend(conditions)
+        if not self._has_queued():
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _has_queued(self) -> bool:
+        return self._queued is None or len(self._queued) > 0
+
+    def progress(self) -> dict:
+        return {**self._progress, "queued": self._has_queued()}
+
+    async def _run(self):
+        while self._has_queued():
+            conditions, self._queued = self._queued, []
+            self._progress.update(
+                status="running",
+                checked=0,
+                endorsed=0,
+                failed=0,
+                started_at=datetime.utcnow(),
+                finished_at=None,
             )
-            was_allowed = await is_endorsable_transaction(db, transaction)
-            logger.debug(f">>> from updated_allowed: this was allowed? {was_allowed}")
-            if was_allowed:
-                logger.debug(
-                    f">>> from updated_allowed: endorsing transaction: {transaction}"
+            started = time.perf_counter()
+            try:
+                await self._run_pass(conditions)
+            except Exception as e:
+                logger.error(f">>> Failed to update pending transactions {e}")
+            REEVALUATION_DURATION.observe(time.perf_counter() - started)
+            self._progress.update(status="idle", finished_at=datetime.utcnow())
+            logger.info(f">>> re-checked pending transactions: {self.progress()}")
+
+    async def _run_pass(self, conditions: list[ColumnElement] | None):
+        semaphore = asyncio.Semaphore(settings.ENDORSER_REEVALUATE_CONCURRENCY)
+        filters = [EndorseRequest.state == EndorseTransactionState.request_received]
+        if conditions is not None:
+            filters.append(or_(*conditions))
+
+        last_id = None
+        while True:
+            q = select(EndorseRequest).where(*filters)
+            if last_id is not None:
+                q = q.where(EndorseRequest.endorse_request_id > last_id)
+            q = q.order_by(EndorseRequest.endorse_request_id).limit(
+                settings.ENDORSER_REEVALUATE_BATCH_SIZE
+            )
+            async with async_session() as db:
+                db_txns: list[EndorseRequest] = (await db.execute(q)).scalars().all()
+            if not db_txns:
+                return
+            last_id = db_txns[-1].endorse_request_id
+            await asyncio.gather(
+                *[self._check(semaphore, db_txn) for db_txn in db_txns]
+            )
+
+    async def _check(self, semaphore: asyncio.Semaphore, db_txn: EndorseRequest):
+        async with semaphore:
+            try:
+                transaction = db_to_txn_object(db_txn, acapy_txn=None)
+                async with async_session() as db:
+                    was_allowed = await is_endorsable_transaction(db, transaction)
+                    logger.debug(
+                        f">>> re-checked {transaction.transaction_id}:"
+                        f" was allowed? {was_allowed}"
+                    )
+                    if was_allowed:
+                        await endorse_transaction(db, transaction)
+                        await db.commit()
+                        self._progress["endorsed"] += 1
+                REEVALUATION_TRANSACTIONS.inc(
+                    "endorsed" if was_allowed else "not_allowed"
+                )
+            except Exception as e:
+                self._progress["failed"] += 1
+                REEVALUATION_TRANSACTIONS.inc("failed")
+                logger.error(
+                    f">>> Failed to update pending transaction"
+                    f" {db_txn.transaction_id}: {e}"
                 )
-                await endorse_transaction(db, transaction)
-    except Exception as e:
-        # try to retrieve and print text on error
-        logger.error(f"Failed to update pending transactions {e}")
+            self._progress["checked"] += 1
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+pending_reevaluation = PendingReevaluation()
+
+
+def updated_allowed(entries: Iterable[BaseModel] | None = None) -> None:
+    """Re-check, in the background, the pending requests the entries could allow.
+
+    Args:
+        entries: the added allow list entries, None to re-check all pending requests
+    """
+    if entries is None:
+        pending_reevaluation.schedule(None)
+    else:
+        pending_reevaluation.schedule([pending_filter(entry) for entry in entries])
+
+
+async def allow_list_changed(
+    db: AsyncSession, added: Iterable[BaseModel] | None = ()
+) -> None:
+    """Re-compile the allow list matcher and re-check any affected pending requests.
+
+    Args:
+        db: database session
+        added: the new allow list entries (default none, removing entries can't
+            make a pending request endorsable), None to re-check all pending requests
+    """
+    await reload_allow_matcher(db)
+    await notify_changed(db, ALLOW_LIST_NOTIFY_TOPIC)
+    updated_allowed(added)
 
 
 B = TypeVar("B", bound=BaseModel)
@@ -49,7 +247,7 @@ async def add_to_allow_list(db: AsyncSession, a: B) -> B:
     try:
         db.add(a)
         await db.commit()
-        await updated_allowed(db)
+        await allow_list_changed(db, [a])
         return a
     except IntegrityError as e:
         if isinstance(e.orig, UniqueViolation):
@@ -0,0 +1,151 @@
+"""In-memory matcher for the auto-endorse allow lists.
+
+The allowedpublicdid, allowedschema and allowedcredentialdefinition tables are
+compiled into one trie per table, with one level per matched field.  Each level
+is a hash lookup on the exact value plus a lookup on the "*" wildcard branch,
+so a match costs a handful of dict lookups and no database round trip.
+
+The compiled matcher is immutable, and is swapped in as a whole whenever the
+allow lists change.
+"""
+
+import logging
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db.models.allow import (
+    AllowedCredentialDefinition,
+    AllowedPublicDid,
+    AllowedSchema,
+)
+from api.db.notify import register_reload_handler
+
+logger = logging.getLogger(__name__)
+
+WILDCARD = "*"
+
+ALLOW_LIST_NOTIFY_TOPIC = "allow_list"
+
+# leaf flags, every entry is a MATCH, credential definitions may also allow
+# their revocation registry definitions and entries
+MATCH = "match"
+REV_REG_DEF = "rev_reg_def"
+REV_REG_ENTRY = "rev_reg_entry"
+
+
+def _insert(trie: dict, keys: Iterable[str], flags: set[str]):
+    node = trie
+    for key in keys:
+        node = node.setdefault(key, {})
+    node.setdefault(None, set()).update(flags)
+
+
+def _match(node: dict, keys: list[str], flag: str, depth: int = 0) -> bool:
+    if depth == len(keys):
+        return flag in node.get(None, ())
+    for branch in (keys[depth], WILDCARD):
+        child = node.get(branch)
+        if child is not None and _match(child, keys, flag, depth + 1):
+            return True
+        if keys[depth] == WILDCARD:
+            # don't walk the wildcard branch twice
+            break
+    return False
+
+
+class AllowListMatcher:
+    """Compiled, read-only view of the allow lists."""
+
+    def __init__(
+        self,
+        public_dids: Iterable[AllowedPublicDid] = (),
+        schemas: Iterable[AllowedSchema] = (),
+        cred_defs: Iterable[AllowedCredentialDefinition] = (),
+    ):
+        self._public_dids: dict = {}
+        self._schemas: dict = {}
+        self._cred_defs: dict = {}
+        for adid in public_dids:
+            _insert(self._public_dids, [adid.registered_did], {MATCH})
+        for aschema in schemas:
+            _insert(
+                self._schemas,
+                [aschema.author_did, aschema.schema_name, aschema.version],
+                {MATCH},
+            )
+        for acreddef in cred_defs:
+            flags = {MATCH}
+            if acreddef.rev_reg_def:
+                flags.add(REV_REG_DEF)
+            if acreddef.rev_reg_entry:
+                flags.add(REV_REG_ENTRY)
+            _insert(
+                self._cred_defs,
+                [
+                    acreddef.creddef_author_did,
+                    acreddef.schema_issuer_did,
+                    acreddef.schema_name,
+                    acreddef.version,
+                    acreddef.tag,
+                ],
+                flags,
+            )
+
+    def allowed_publish_did(self, did: str) -> bool:
+        return _match(self._public_dids, [did], MATCH)
+
+    def allowed_schema(self, author_did: str, schema_name: str, version: str) -> bool:
+        return _match(self._schemas, [author_did, schema_name, version], MATCH)
+
+    def allowed_creddef(
+        self,
+        creddef_author_did: str,
+        schema_issuer_did: str,
+        schema_name: str,
+        version: str,
+        tag: str,
+        flag: str = MATCH,
+    ) -> bool:
+        """Check a credential definition (or one of its revocation transactions).
+
+        Args:
+            flag: MATCH for the credential definition itself, REV_REG_DEF or
+                REV_REG_ENTRY to also require the matching revocation flag
+        """
+        return _match(
+            self._cred_defs,
+            [creddef_author_did, schema_issuer_did, schema_name, version, tag],
+            flag,
+        )
+
+
+_matcher: AllowListMatcher | None = None
+
+
+async def reload_allow_matcher(db: AsyncSession) -> AllowListMatcher:
+    """Re-compile the matcher from the allow list tables and swap it in."""
+    global _matcher
+    public_dids = (await db.execute(select(AllowedPublicDid))).scalars().all()
+    schemas = (await db.execute(select(AllowedSchema))).scalars().all()
+    cred_defs = (
+        (await db.execute(select(AllowedCredentialDefinition))).scalars().all()
+    )
+    matcher = AllowListMatcher(public_dids, schemas, cred_defs)
+    _matcher = matcher
+    logger.info(
+        f">>> compiled allow lists: {len(public_dids)} dids, {len(schemas)} schemas,"
+        f" {len(cred_defs)} credential definitions"
+    )
+    return matcher
+
+
+register_reload_handler(ALLOW_LIST_NOTIFY_TOPIC, reload_allow_matcher)
+
+
+async def get_allow_matcher(db: AsyncSession) -> AllowListMatcher:
+    """Return the current matcher, compiling it on first use."""
+    if _matcher is None:
+        return await reload_allow_matcher(db)
+    return _matcher
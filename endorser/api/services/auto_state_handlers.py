@@ -1,48 +1,107 @@
 import logging
 import traceback
-from typing import Any, cast
+from collections import OrderedDict
+from typing import cast
 
 from attr import dataclass
-from sqlalchemy import or_, select
-from sqlalchemy.engine.row import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import api.acapy_utils as au
-from api.db.models.allow import (
-    AllowedCredentialDefinition,
-    AllowedSchema,
-)
-from api.endpoints.models.allow import (
-    AllowedPublicDid,
-)
+from api.core.config import settings
+from api.core.metrics import DECISIONS, registry
+from api.core.tracing import current_span, span, traced
 from api.endpoints.models.connections import (
     AuthorStatusType,
     Connection,
     EndorseStatusType,
-    webhook_to_connection_object,
+    db_to_connection_object,
 )
 from api.endpoints.models.endorse import (
     EndorseTransaction,
     EndorseTransactionType,
-    webhook_to_txn_object,
+)
+from api.services.allow_matcher import (
+    MATCH,
+    REV_REG_DEF,
+    REV_REG_ENTRY,
+    get_allow_matcher,
 )
 from api.services.configurations import (
     get_bool_config,
     get_config,
 )
-from api.services.connections import (
-    accept_connection_request,
-    get_connection_object,
-)
+from api.services.connections import accept_connection_request
 from api.services.endorse import (
     endorse_transaction,
-    get_endorser_did,
     reject_transaction,
 )
+from api.services.webhook_context import WebhookContext
 
 logger = logging.getLogger(__name__)
 
 
+class SchemaIdCache:
+    """Bounded LRU cache of ledger schema sequence number -> schema id.
+
+    Schemas are immutable once written to the ledger, so entries never expire
+    and are only evicted when the cache is full.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, str] = OrderedDict()
+
+    def get(self, seq_no: int) -> str | None:
+        schema_id = self._entries.get(seq_no)
+        if schema_id is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(seq_no)
+        self.hits += 1
+        return schema_id
+
+    def put(self, seq_no: int, schema_id: str):
+        self._entries[seq_no] = schema_id
+        self._entries.move_to_end(seq_no)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+schema_id_cache = SchemaIdCache(settings.ENDORSER_SCHEMA_CACHE_SIZE)
+
+registry.gauge(
+    "endorser_schema_id_cache",
+    "Ledger schema id cache size, max_size, hits and misses (since startup).",
+    ("stat",),
+    callback=lambda: {(k,): v for k, v in schema_id_cache.stats().items()},
+)
+
+
+async def get_schema_id(sequence_num: int) -> list[str]:
+    """Return the (split) schema id for a ledger sequence number."""
+    schema_id = schema_id_cache.get(sequence_num)
+    if schema_id is None:
+        with span("ledger schema lookup", seq_no=sequence_num):
+            response = cast(dict, await au.acapy_GET("schemas/" + str(sequence_num)))
+        logger.debug(f">>> from get_schema_id: {sequence_num} -> {response}")
+        schema_id = cast(str, response["schema"]["id"])
+        schema_id_cache.put(sequence_num, schema_id)
+    return schema_id.split(":")
+
+
 def is_auto_endorse_connection(connection: Connection) -> bool:
     # check if connection or author_did is setup for auto-endorse
     return (
@@ -77,37 +136,37 @@ async def is_auto_endorse_txn(
 
 
 async def auto_step_ping_received(
-    db: AsyncSession, payload: dict, handler_result: dict
+    db: AsyncSession, ctx: WebhookContext, handler_result: dict
 ) -> dict:
     return {}
 
 
 async def auto_step_connections_request(
-    db: AsyncSession, payload: dict, handler_result: dict
+    db: AsyncSession, ctx: WebhookContext, handler_result: dict
 ) -> dict | Connection:
     # auto-accept connection?
-    connection: Connection = webhook_to_connection_object(payload)
+    connection: Connection = ctx.connection()
     if await get_bool_config(db, "ENDORSER_AUTO_ACCEPT_CONNECTIONS"):
         result = await accept_connection_request(db, connection)
     return {}
 
 
 async def auto_step_connections_response(
-    db: AsyncSession, payload: dict, handler_result: dict
+    db: AsyncSession, ctx: WebhookContext, handler_result: dict
 ) -> dict:
     # no-op
     return {}
 
 
 async def auto_step_connections_active(
-    db: AsyncSession, payload: dict, handler_result: dict
+    db: AsyncSession, ctx: WebhookContext, handler_result: dict
 ) -> dict:
     # no-op
     return {}
 
 
 async def auto_step_connections_completed(
-    db: AsyncSession, payload: dict, handler_result: dict
+    db: AsyncSession, ctx: WebhookContext, handler_result: dict
 ) -> dict:
     # no-op
     return {}
@@ -129,64 +188,33 @@ class SchemaCriteria:
     Version: str
 
 
-def eq_or_wild(indb, clause: str | Any):
-    if isinstance(clause, str):
-        return or_(indb == clause, indb == "*")
-    else:
-        return indb == clause
-
-
-async def check_auto_endorse(
-    db: AsyncSession,
-    table: type,
-    filters: list[tuple[Any, Any]],
-) -> bool:
-    wild_filters = [eq_or_wild(x, y) for x, y in filters]
-    q = select(table).filter(*wild_filters)
-    result = await db.execute(q)
-    result_rec: Row | None = result.one_or_none()
-    logger.debug(f"got the following record {result_rec} with query {q}")
-    if result_rec:
-        return True
-    else:
-        return False
-
-
 async def allowed_publish_did(db: AsyncSession, did: str) -> bool:
-    return await check_auto_endorse(
-        db, AllowedPublicDid, [(AllowedPublicDid.registered_did, did)]
-    )
+    matcher = await get_allow_matcher(db)
+    return matcher.allowed_publish_did(did)
 
 
 async def allowed_schema(db: AsyncSession, schema_trans: SchemaCriteria) -> bool:
-    return await check_auto_endorse(
-        db,
-        AllowedSchema,
-        [
-            (AllowedSchema.author_did, schema_trans.DID),
-            (AllowedSchema.schema_name, schema_trans.Name),
-            (AllowedSchema.version, schema_trans.Version),
-        ],
+    matcher = await get_allow_matcher(db)
+    return matcher.allowed_schema(
+        schema_trans.DID, schema_trans.Name, schema_trans.Version
     )
 
 
-async def allowed_creddef(db: AsyncSession, creddef_trans: CreddefCriteria) -> bool:
-    return await check_auto_endorse(
-        db,
-        AllowedCredentialDefinition,
-        [
-            (AllowedCredentialDefinition.creddef_author_did, creddef_trans.DID),
-            (
-                AllowedCredentialDefinition.schema_issuer_did,
-                creddef_trans.Schema_Issuer_DID,
-            ),
-            (AllowedCredentialDefinition.schema_name, creddef_trans.Schema_Name),
-            (AllowedCredentialDefinition.version, creddef_trans.Schema_Version),
-            (AllowedCredentialDefinition.tag, creddef_trans.Tag),
-        ],
+async def allowed_creddef(
+    db: AsyncSession, creddef_trans: CreddefCriteria, flag: str = MATCH
+) -> bool:
+    matcher = await get_allow_matcher(db)
+    return matcher.allowed_creddef(
+        creddef_trans.DID,
+        creddef_trans.Schema_Issuer_DID,
+        creddef_trans.Schema_Name,
+        creddef_trans.Schema_Version,
+        creddef_trans.Tag,
+        flag,
     )
 
 
+@traced()
 async def is_endorsable_transaction(
     db: AsyncSession, trans: EndorseTransaction
 ) -> bool:
@@ -228,22 +256,18 @@ async def is_endorsable_transaction(
                 logger.debug(
                     f">>> from is_endorsable_transaction: {trans} awaiting schema"
                 )
-                response = cast(
-                    dict, await au.acapy_GET("schemas/" + str(sequence_num))
-                )
-                schema_id: list[str] = response["schema"]["id"].split(":")
+                schema_id: list[str] = await get_schema_id(sequence_num)
 
-                return await check_auto_endorse(
+                return await allowed_creddef(
                     db,
-                    AllowedCredentialDefinition,
-                    [
-                        (AllowedCredentialDefinition.creddef_author_did, cred_auth_did),
-                        (AllowedCredentialDefinition.schema_issuer_did, schema_id[0]),
-                        (AllowedCredentialDefinition.schema_name, schema_id[2]),
-                        (AllowedCredentialDefinition.version, schema_id[3]),
-                        (AllowedCredentialDefinition.tag, tag),
-                        (AllowedCredentialDefinition.rev_reg_def, True),
-                    ],
+                    CreddefCriteria(
+                        DID=cred_auth_did,
+                        Schema_Issuer_DID=schema_id[0],
+                        Schema_Name=schema_id[2],
+                        Schema_Version=schema_id[3],
+                        Tag=tag,
+                    ),
+                    REV_REG_DEF,
                 )
             case EndorseTransactionType.revoc_entry:
                 logger.debug(
@@ -259,25 +283,21 @@ async def is_endorsable_transaction(
                 logger.debug(
                     f">>> from is_endorsable_transaction: {trans} awaiting schema"
                 )
-                response = cast(
-                    dict, await au.acapy_GET("schemas/" + str(sequence_num))
-                )
-                schema_id: list[str] = response["schema"]["id"].split(":")
+                schema_id: list[str] = await get_schema_id(sequence_num)
                 logger.debug(
                     f">>> from is_endorsable_transaction: {trans} was a revocation entry"
                 )
                 # raise Exception("revoc_entry not implemented", trans)
-                return await check_auto_endorse(
+                return await allowed_creddef(
                     db,
-                    AllowedCredentialDefinition,
-                    [
-                        (AllowedCredentialDefinition.creddef_author_did, cred_auth_did),
-                        (AllowedCredentialDefinition.schema_issuer_did, schema_id[0]),
-                        (AllowedCredentialDefinition.schema_name, schema_id[2]),
-                        (AllowedCredentialDefinition.version, schema_id[3]),
-                        (AllowedCredentialDefinition.tag, tag),
-                        (AllowedCredentialDefinition.rev_reg_entry, True),
-                    ],
+                    CreddefCriteria(
+                        DID=cred_auth_did,
+                        Schema_Issuer_DID=schema_id[0],
+                        Schema_Name=schema_id[2],
+                        Schema_Version=schema_id[3],
+                        Tag=tag,
+                    ),
+                    REV_REG_ENTRY,
                 )
             case EndorseTransactionType.schema:
                 logger.debug(
@@ -300,15 +320,12 @@ async def is_endorsable_transaction(
                 logger.debug(
                     f">>> from is_endorsable_transaction: {trans} awaiting schema"
                 )
-                response = cast(
-                    dict, await au.acapy_GET("schemas/" + str(sequence_num))
-                )
+                schema_id: list[str] = await get_schema_id(sequence_num)
 
                 logger.debug(
                     f">>> from is_endorsable_transaction:\
-                    {trans} was a cred_def request with response {response}"
+                    {trans} was a cred_def request with schema {schema_id}"
                 )
-                schema_id: list[str] = response["schema"]["id"].split(":")
                 return await allowed_creddef(
                     db,
                     CreddefCriteria(
@@ -325,62 +342,74 @@ async def is_endorsable_transaction(
 
 # TODO look into returning the hander result
 async def auto_step_endorse_transaction_request_received(
-    db: AsyncSession, payload: dict, handler_result: EndorseTransaction | dict
+    db: AsyncSession, ctx: WebhookContext, handler_result: EndorseTransaction | dict
 ) -> EndorseTransaction | dict:
     logger.info(">>> in auto_step_endorse_transaction_request_received() ...")
-    endorser_did = await get_endorser_did()
-    transaction: EndorseTransaction = webhook_to_txn_object(payload, endorser_did)
+    transaction: EndorseTransaction = await ctx.transaction()
     logger.debug(f">>> transaction = {transaction}")
-    connection = await get_connection_object(db, transaction.connection_id)
+    connection = db_to_connection_object(await ctx.contact(db), acapy_connection=None)
+    # the rule that decided the outcome, for the decision metrics
+    outcome, rule = "pending", "none"
     try:
         if is_auto_reject_connection(connection):
             logger.debug(
                 ">>> from auto_step_endorse_transaction_request_received:\
                 this was not"
             )
+            outcome, rule = "rejected", "auto_reject_connection"
             handler_result = await reject_transaction(db, transaction)
         elif await is_auto_endorse_txn(db, transaction, connection):
             logger.debug(
                 ">>> from auto_step_endorse_transaction_request_received:\
                 this was allowed"
             )
+            outcome, rule = "endorsed", "auto_endorse"
             handler_result = await endorse_transaction(db, transaction)
         elif await is_endorsable_transaction(db, transaction):
             logger.debug(
                 f">>> from auto_step_endorse_transaction_request_received:\
                 {transaction} was allowed"
             )
+            outcome, rule = "endorsed", "allow_list"
             handler_result = await endorse_transaction(db, transaction)
         # If we could not auto endorse check if we should reject it or leave it pending
         elif await get_bool_config(db, "ENDORSER_REJECT_BY_DEFAULT"):
+            outcome, rule = "rejected", "reject_by_default"
             handler_result = await reject_transaction(db, transaction)
         else:
             handler_result = {}
     except Exception as e:
+        outcome = "error"
         logger.error(traceback.format_exc())
         logger.error(
             f">>> in handle_endorse_transaction_request_received:\
             Failed to determine if the transaction should be endorsed with error: {e}"
         )
+        # the webhook is retried when it is redelivered
+        raise
+    finally:
+        DECISIONS.inc(outcome, rule, transaction.transaction_type or "")
+        if (decision_span := current_span()) is not None:
+            decision_span.attributes.update(outcome=outcome, rule=rule)
     return handler_result
 
 
 async def auto_step_endorse_transaction_transaction_endorsed(
-    db: AsyncSession, payload: dict, handler_result: dict
+    db: AsyncSession, ctx: WebhookContext, handler_result: dict
 ) -> dict:
     logger.info(">>> in auto_step_endorse_transaction_transaction_endorsed() ...")
     return {}
 
 
 async def auto_step_endorse_transaction_transaction_refused(
-    db: AsyncSession, payload: dict, handler_result: dict
+    db: AsyncSession, ctx: WebhookContext, handler_result: dict
 ) -> dict:
     logger.info(">>> in auto_step_endorse_transaction_transaction_refused() ...")
     return {}
 
 
 async def auto_step_endorse_transaction_transaction_acked(
-    db: AsyncSession, payload: dict, handler_result: dict
+    db: AsyncSession, ctx: WebhookContext, handler_result: dict
 ) -> dict:
     logger.info(">>> in auto_step_endorse_transaction_transaction_acked() ...")
     return {}
@@ -1,11 +1,14 @@
 import logging
 import os
+from types import MappingProxyType
+from typing import Mapping
 
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.db.errors import DoesNotExist
 from api.db.models.configuration import ConfigurationDB
+from api.db.notify import notify_changed, register_reload_handler
 from api.endpoints.models.configurations import (
     CONFIG_DEFAULTS,
     Configuration,
@@ -19,6 +22,11 @@ logger = logging.getLogger(__name__)
 
 TRUE_VALUES = ["true", "1", "t", "y", "yes", "yeah", "yup", "certainly", "uh-huh"]
 
+CONFIG_NOTIFY_TOPIC = "configuration"
+
+# read-only snapshot of the configuration table, keyed by config_name
+_config_snapshot: Mapping[str, Configuration] | None = None
+
 
 async def db_add_db_config_record(db: AsyncSession, db_config: ConfigurationDB):
     logger.debug(f">>> adding config: {db_config} ...")
@@ -70,24 +78,47 @@ async def db_get_config_records(db: AsyncSession) -> list[ConfigurationDB]:
     return db_configs
 
 
+async def load_config_snapshot(db: AsyncSession) -> Mapping[str, Configuration]:
+    """Load all configuration records and swap in a new snapshot."""
+    global _config_snapshot
+    db_configs = await db_get_config_records(db)
+    configs = {
+        db_config.config_name: db_to_config_object(db_config)
+        for db_config in db_configs
+        if db_config.config_name in ConfigurationType.__members__
+    }
+    _config_snapshot = MappingProxyType(configs)
+    logger.debug(f">>> loaded configuration snapshot: {list(configs)}")
+    return _config_snapshot
+
+
+async def get_config_snapshot(db: AsyncSession) -> Mapping[str, Configuration]:
+    if _config_snapshot is None:
+        return await load_config_snapshot(db)
+    return _config_snapshot
+
+
+register_reload_handler(CONFIG_NOTIFY_TOPIC, load_config_snapshot)
+
+
 async def get_config_record(db: AsyncSession, config_name: str) -> Configuration:
-    try:
-        db_config = await db_fetch_db_config_record(db, config_name)
-        config = db_to_config_object(db_config)
-        return config
-    except DoesNotExist:
-        default = (
-            CONFIG_DEFAULTS[config_name]
-            if config_name in CONFIG_DEFAULTS[config_name]
-            else ""
-        )
-        config: Configuration = Configuration(
-            config_id=None,
-            config_name=ConfigurationType[config_name],
-            config_value=os.getenv(config_name, default),
-            config_source=ConfigurationSource.Environment,
-        )
-        return config
+    snapshot = await get_config_snapshot(db)
+    if config_name in snapshot:
+        # callers may modify the returned object, so don't hand out the cached one
+        return snapshot[config_name].model_copy()
+
+    default = (
+        CONFIG_DEFAULTS[config_name]
+        if config_name in CONFIG_DEFAULTS[config_name]
+        else ""
+    )
+    config: Configuration = Configuration(
+        config_id=None,
+        config_name=ConfigurationType[config_name],
+        config_value=os.getenv(config_name, default),
+        config_source=ConfigurationSource.Environment,
+    )
+    return config
 
 
 async def get_config_records(db: AsyncSession) -> list[Configuration]:
@@ -108,6 +139,8 @@ async def update_config_record(
     old_db_config = config_to_db_object(old_config)
     new_db_config = await db_update_db_config_record(db, old_db_config)
     new_config = db_to_config_object(new_db_config)
+    await load_config_snapshot(db)
+    await notify_changed(db, CONFIG_NOTIFY_TOPIC)
     return new_config
 
 
@@ -2,13 +2,14 @@ import logging
 from typing import cast
 from uuid import UUID
 
-from sqlalchemy import desc, select, update
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql.functions import func
 
 import api.acapy_utils as au
 from api.db.errors import DoesNotExist
 from api.db.models.contact import Contact
+from api.db.paging import TotalCountType, paginate
+from api.services.acapy_outbox import acapy_post
 from api.endpoints.models.connections import (
     AuthorStatusType,
     Connection,
@@ -27,7 +28,7 @@ logger = logging.getLogger(__name__)
 async def db_add_db_contact_record(db: AsyncSession, db_contact: Contact):
     logger.debug(f">>> adding contact: {db_contact} ...")
     db.add(db_contact)
-    await db.commit()
+    await db.flush()
 
 
 async def db_fetch_db_contact_record(db: AsyncSession, connection_id: UUID) -> Contact:
@@ -42,17 +43,23 @@ async def db_fetch_db_contact_record(db: AsyncSession, connection_id: UUID) -> C
     return result_rec
 
 
-async def db_update_db_contact_record(db: AsyncSession, db_contact: Contact) -> Contact:
-    payload_dict = db_contact.dict()
+async def db_update_db_contact_fields(
+    db: AsyncSession, connection_id: UUID, values: dict
+) -> Contact:
+    """Update only the given columns, returning the updated record (not committed)."""
     q = (
         update(Contact)
-        .where(Contact.contact_id == db_contact.contact_id)
-        .where(Contact.connection_id == db_contact.connection_id)
-        .values(payload_dict)
+        .where(Contact.connection_id == connection_id)
+        .values(values)
+        .returning(Contact)
     )
-    await db.execute(q)
-    await db.commit()
-    return await db_fetch_db_contact_record(db, db_contact.connection_id)
+    result = await db.execute(q)
+    result_rec = result.scalar_one_or_none()
+    if not result_rec:
+        raise DoesNotExist(
+            f"{Contact.__name__}<connection_id:{connection_id}> does not exist"
+        )
+    return result_rec
 
 
 async def db_get_contact_records(
@@ -60,9 +67,9 @@ async def db_get_contact_records(
     state: str | None = None,
     page_size: int = 10,
     page_num: int = 1,
-) -> tuple[int, list[Contact]]:
-    limit = page_size
-    skip = (page_num - 1) * limit
+    cursor: str | None = None,
+    total_count: TotalCountType = TotalCountType.exact,
+) -> tuple[int | None, list[Contact], str | None]:
     filters = []
     if state:
         filters.append(Contact.state == state)
@@ -70,18 +77,16 @@ async def db_get_contact_records(
     # build out a base query with all filters
     base_q = select(Contact).filter(*filters)
 
-    # get a count of ALL records matching our base query
-    count_q = base_q.with_only_columns(func.count()).order_by(None)
-    count_q_rec = await db.execute(count_q)
-    total_count = cast(int, count_q_rec.scalar())
-
-    # add in our paging and ordering to get the result set
-    results_q = base_q.limit(limit).offset(skip).order_by(desc(Contact.created_at))
-
-    results_q_recs = await db.execute(results_q)
-    db_connections: list[Contact] = results_q_recs.scalars().all()
-
-    return (total_count, db_connections)
+    return await paginate(
+        db,
+        base_q,
+        Contact.created_at,
+        Contact.contact_id,
+        page_size=page_size,
+        page_num=page_num,
+        cursor=cursor,
+        total_count=total_count,
+    )
 
 
 async def get_connections_list(
@@ -89,18 +94,22 @@ async def get_connections_list(
     connection_state: str | None = None,
     page_size: int = 10,
     page_num: int = 1,
-) -> tuple[int, list[Connection]]:
-    (count, db_contacts) = await db_get_contact_records(
+    cursor: str | None = None,
+    total_count: TotalCountType = TotalCountType.exact,
+) -> tuple[int | None, list[Connection], str | None]:
+    (count, db_contacts, next_cursor) = await db_get_contact_records(
         db,
         state=connection_state,
         page_size=page_size,
         page_num=page_num,
+        cursor=cursor,
+        total_count=total_count,
     )
     items = []
     for db_contact in db_contacts:
         item = db_to_connection_object(db_contact, acapy_connection=None)
         items.append(item)
-    return (count, items)
+    return (count, items, next_cursor)
 
 
 async def get_connection_object(
@@ -132,25 +141,27 @@ async def accept_connection_request(
         f">>> called accept_connection_request with: {connection.connection_id}"
     )
 
-    # fetch existing db object
-    db_contact: Contact = await db_fetch_db_contact_record(db, connection.connection_id)
-
     # accept connection
     if connection.connection_protocol == ConnectionProtocolType.DIDExchange.value:
-        await au.acapy_POST(
+        await acapy_post(
+            db,
             f"didexchange/{connection.connection_id}/accept-request",
+            ordering_key=connection.connection_id,
         )
 
     # update local db state
-    db_contact.state = connection.state
-    db_contact = await db_update_db_contact_record(db, db_contact)
+    db_contact = await db_update_db_contact_fields(
+        db, connection.connection_id, {"state": connection.state}
+    )
     logger.info(
         f">>> accepted connection for {connection.connection_id} {db_contact.state}"
     )
 
     # set author meta-data on this connection
-    await au.acapy_POST(
+    await acapy_post(
+        db,
         f"transactions/{connection.connection_id}/set-endorser-role",
+        ordering_key=connection.connection_id,
         params={"transaction_my_job": "TRANSACTION_ENDORSER"},
     )
 
@@ -164,12 +175,10 @@ async def update_connection_status(
         f">>> called update_connection_status with: {connection.connection_id}"
     )
 
-    # fetch existing db object
-    db_contact: Contact = await db_fetch_db_contact_record(db, connection.connection_id)
-
     # update local db state
-    db_contact.state = connection.state
-    db_contact = await db_update_db_contact_record(db, db_contact)
+    db_contact = await db_update_db_contact_fields(
+        db, connection.connection_id, {"state": connection.state}
+    )
     logger.debug(
         f">>> updated connection for {connection.connection_id} {db_contact.state}"
     )
@@ -195,8 +204,11 @@ async def set_connection_author_metadata(
     logger.info(
         f">>> Setting meta-data for connection: {Connection}, with params: {params}"
     )
-    await au.acapy_POST(
-        f"transactions/{connection_id}/set-endorser-role", params=params
+    await acapy_post(
+        db,
+        f"transactions/{connection_id}/set-endorser-role",
+        ordering_key=connection_id,
+        params=params,
     )
     return {}
 
@@ -204,12 +216,10 @@ async def set_connection_author_metadata(
 async def update_connection_info(
     db: AsyncSession, connection_id: UUID, alias: str, public_did: str | None = None
 ):
-    # fetch existing db object
-    db_contact: Contact = await db_fetch_db_contact_record(db, connection_id)
-    db_contact.connection_alias = alias
+    values = {"connection_alias": alias}
     if public_did:
-        db_contact.public_did = public_did
-    db_contact = await db_update_db_contact_record(db, db_contact)
+        values["public_did"] = public_did
+    db_contact = await db_update_db_contact_fields(db, connection_id, values)
     connection = db_to_connection_object(db_contact, acapy_connection=None)
     return connection
 
@@ -220,10 +230,13 @@ async def update_connection_config(
     author_status: AuthorStatusType,
     endorse_status: EndorseStatusType,
 ):
-    # fetch existing db object
-    db_contact: Contact = await db_fetch_db_contact_record(db, connection_id)
-    db_contact.author_status = author_status.value
-    db_contact.endorse_status = endorse_status.value
-    db_contact = await db_update_db_contact_record(db, db_contact)
+    db_contact = await db_update_db_contact_fields(
+        db,
+        connection_id,
+        {
+            "author_status": author_status.value,
+            "endorse_status": endorse_status.value,
+        },
+    )
     connection = db_to_connection_object(db_contact, acapy_connection=None)
     return connection
@@ -1,16 +1,24 @@
+import asyncio
 import logging
+import time
 from typing import cast
 from uuid import UUID
 
-from sqlalchemy import desc, select, update
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql.functions import func
+from sqlalchemy.orm import defer
 
 import api.acapy_utils as au
+from api.core.config import settings
 from api.db.errors import DoesNotExist
 from api.db.models.endorse_request import EndorseRequest
+from api.db.paging import TotalCountType, paginate
+from api.services.acapy_outbox import acapy_post
 from api.endpoints.models.endorse import (
+    BulkTransactionRequest,
+    BulkTransactionResult,
     EndorseTransaction,
+    TransactionViewType,
     db_to_txn_object,
     txn_to_db_object,
 )
@@ -18,15 +26,42 @@ from api.endpoints.models.endorse import (
 logger = logging.getLogger(__name__)
 
 
-async def get_endorser_did() -> str:
+class InvalidBulkRequest(ValueError):
+    pass
+
+
+# cached endorser public did, and the (monotonic) time it expires
+_endorser_did: str | None = None
+_endorser_did_expires: float = 0.0
+
+
+def invalidate_endorser_did():
+    """Drop the cached endorser public did, the next lookup will call aca-py."""
+    global _endorser_did, _endorser_did_expires
+    _endorser_did = None
+    _endorser_did_expires = 0.0
+
+
+async def refresh_endorser_did() -> str:
+    """Fetch the endorser public did from aca-py and (re-)populate the cache."""
+    global _endorser_did, _endorser_did_expires
     diddoc = cast(dict, await au.acapy_GET("wallet/did/public"))
     did = cast(str, diddoc["result"]["did"])
+    _endorser_did = did
+    _endorser_did_expires = time.monotonic() + settings.ENDORSER_DID_CACHE_TTL
+    logger.info(f">>> cached endorser public did: {did}")
     return did
 
 
+async def get_endorser_did() -> str:
+    if _endorser_did and time.monotonic() < _endorser_did_expires:
+        return _endorser_did
+    return await refresh_endorser_did()
+
+
 async def db_add_db_txn_record(db: AsyncSession, db_txn: EndorseRequest):
     db.add(db_txn)
-    await db.commit()
+    await db.flush()
 
 
 async def db_fetch_db_txn_record(
@@ -43,19 +78,27 @@ async def db_fetch_db_txn_record(
     return result_rec
 
 
-async def db_update_db_txn_record(
-    db: AsyncSession, db_txn: EndorseRequest
+async def db_update_db_txn_fields(
+    db: AsyncSession, transaction_id: UUID, values: dict
 ) -> EndorseRequest:
-    payload_dict = db_txn.dict()
+    """Update only the given columns, returning the updated record.
+
+    One UPDATE ... RETURNING round trip, and the (large) ledger_payload column
+    is not re-written when only the state changes.  The caller commits.
+    """
     q = (
         update(EndorseRequest)
-        .where(EndorseRequest.endorse_request_id == db_txn.endorse_request_id)
-        .where(EndorseRequest.transaction_id == db_txn.transaction_id)
-        .values(payload_dict)
+        .where(EndorseRequest.transaction_id == transaction_id)
+        .values(values)
+        .returning(EndorseRequest)
     )
-    await db.execute(q)
-    await db.commit()
-    return await db_fetch_db_txn_record(db, db_txn.transaction_id)
+    result = await db.execute(q)
+    result_rec = result.scalar_one_or_none()
+    if not result_rec:
+        raise DoesNotExist(
+            f"{EndorseRequest.__name__}<transaction_id:{transaction_id}> does not exist"
+        )
+    return result_rec
 
 
 async def db_get_txn_records(
@@ -64,9 +107,10 @@ async def db_get_txn_records(
     connection_id: str | None = None,
     page_size: int = 10,
     page_num: int = 1,
-) -> tuple[int, list[EndorseRequest]]:
-    limit = page_size
-    skip = (page_num - 1) * limit
+    cursor: str | None = None,
+    total_count: TotalCountType = TotalCountType.exact,
+    with_payload: bool = True,
+) -> tuple[int | None, list[EndorseRequest], str | None]:
     filters = []
     if state:
         filters.append(EndorseRequest.state == state)
@@ -75,22 +119,21 @@ async def db_get_txn_records(
 
     # build out a base query with all filters
     base_q = select(EndorseRequest).filter(*filters)
+    if not with_payload:
+        # the ledger payload is most of the row
+        base_q = base_q.options(defer(EndorseRequest.ledger_payload, raiseload=True))
 
-    # get a count of ALL records matching our base query
-    count_q = base_q.with_only_columns(func.count()).order_by(None)
-    count_q_rec = await db.execute(count_q)
-    total_count: int = count_q_rec.scalar() or 0
-
-    # add in our paging and ordering to get the result set
-    results_q = (
-        base_q.limit(limit).offset(skip).order_by(desc(EndorseRequest.created_at))
+    return await paginate(
+        db,
+        base_q,
+        EndorseRequest.created_at,
+        EndorseRequest.endorse_request_id,
+        page_size=page_size,
+        page_num=page_num,
+        cursor=cursor,
+        total_count=total_count,
     )
 
-    results_q_recs = await db.execute(results_q)
-    db_txns: list[EndorseRequest] = results_q_recs.scalars().all()
-
-    return (total_count, db_txns)
-
 
 async def get_transactions_list(
     db: AsyncSession,
@@ -98,19 +141,26 @@ async def get_transactions_list(
     connection_id: str | None = None,
     page_size: int = 10,
     page_num: int = 1,
-) -> tuple[int, list[EndorseTransaction]]:
-    (count, db_txns) = await db_get_txn_records(
+    cursor: str | None = None,
+    total_count: TotalCountType = TotalCountType.exact,
+    view: TransactionViewType = TransactionViewType.full,
+) -> tuple[int | None, list[EndorseTransaction], str | None]:
+    (count, db_txns, next_cursor) = await db_get_txn_records(
         db,
         state=transaction_state,
         connection_id=connection_id,
         page_size=page_size,
         page_num=page_num,
+        cursor=cursor,
+        total_count=total_count,
+        # a summary doesn't fetch (or decode) the payload at all
+        with_payload=view == TransactionViewType.full,
     )
     items = []
     for db_txn in db_txns:
         item = db_to_txn_object(db_txn, acapy_txn=None)
         items.append(item)
-    return (count, items)
+    return (count, items, next_cursor)
 
 
 async def get_transaction_object(
@@ -136,17 +186,19 @@ async def store_endorser_request(db: AsyncSession, txn: EndorseTransaction):
 async def endorse_transaction(db: AsyncSession, txn: EndorseTransaction):
     logger.info(f">>> called endorse_transaction with: {txn.transaction_id}")
 
-    # fetch existing db object
-    db_txn: EndorseRequest = await db_fetch_db_txn_record(db, txn.transaction_id)
-
     # endorse transaction and tell aca-py
-    response = cast(
-        dict, await au.acapy_POST(f"transactions/{txn.transaction_id}/endorse")
+    response = await acapy_post(
+        db,
+        f"transactions/{txn.transaction_id}/endorse",
+        ordering_key=txn.transaction_id,
+        transaction_id=txn.transaction_id,
     )
 
-    # update local db state
-    db_txn.state = response["state"]
-    db_txn = await db_update_db_txn_record(db, db_txn)
+    # update local db state (for an outbox call, once aca-py has responded)
+    if response is not None:
+        await db_update_db_txn_fields(
+            db, txn.transaction_id, {"state": response["state"]}
+        )
     logger.info(f">>> endorsed endorser_request for {txn.transaction_id}")
 
     return txn
@@ -155,31 +207,135 @@ async def endorse_transaction(db: AsyncSession, txn: EndorseTransaction):
 async def reject_transaction(db: AsyncSession, txn: EndorseTransaction):
     logger.info(f">>> called reject_transaction with: {txn.transaction_id}")
 
-    # fetch existing db object
-    db_txn: EndorseRequest = await db_fetch_db_txn_record(db, txn.transaction_id)
-
-    # endorse transaction and tell aca-py
-    response = cast(
-        dict, await au.acapy_POST(f"transactions/{txn.transaction_id}/refuse")
+    # reject transaction and tell aca-py
+    response = await acapy_post(
+        db,
+        f"transactions/{txn.transaction_id}/refuse",
+        ordering_key=txn.transaction_id,
+        transaction_id=txn.transaction_id,
     )
 
-    # update local db state
-    db_txn.state = response["state"]
-    db_txn = await db_update_db_txn_record(db, db_txn)
+    # update local db state (for an outbox call, once aca-py has responded)
+    if response is not None:
+        await db_update_db_txn_fields(
+            db, txn.transaction_id, {"state": response["state"]}
+        )
     logger.info(f">>> rejected endorser_request for {txn.transaction_id}")
 
     return txn
 
 
+async def db_update_db_txn_states(db: AsyncSession, states: dict[UUID, str]):
+    """Set the state of many transactions, one UPDATE per distinct state."""
+    by_state: dict[str, list[UUID]] = {}
+    for transaction_id, state in states.items():
+        by_state.setdefault(state, []).append(transaction_id)
+    for state, transaction_ids in by_state.items():
+        q = (
+            update(EndorseRequest)
+            .where(EndorseRequest.transaction_id.in_(transaction_ids))
+            .values(state=state)
+        )
+        await db.execute(q)
+
+
+def bulk_transaction_filters(request: BulkTransactionRequest) -> list:
+    """The filters selecting the transactions of a bulk request.
+
+    Raises:
+        InvalidBulkRequest: if the request selects neither ids nor a filter
+            (which would select every transaction in the state)
+    """
+    if request.transaction_ids is None and not (
+        request.connection_id or request.transaction_type or request.created_before
+    ):
+        raise InvalidBulkRequest(
+            "transaction_ids, or one of connection_id, transaction_type or"
+            " created_before, is required"
+        )
+    filters = [EndorseRequest.state == request.state.value]
+    if request.transaction_ids is not None:
+        filters.append(EndorseRequest.transaction_id.in_(request.transaction_ids))
+    if request.connection_id:
+        filters.append(EndorseRequest.connection_id == request.connection_id)
+    if request.transaction_type:
+        filters.append(
+            EndorseRequest.transaction_type == request.transaction_type.value
+        )
+    if request.created_before:
+        filters.append(EndorseRequest.created_at < request.created_before)
+    return filters
+
+
+async def bulk_update_transactions(
+    db: AsyncSession, action: str, request: BulkTransactionRequest
+) -> list[BulkTransactionResult]:
+    """Endorse or refuse (action) all the transactions the request selects.
+
+    The aca-py calls are made ENDORSER_BULK_CONCURRENCY at a time, and the new
+    states are committed every ENDORSER_BULK_BATCH_SIZE transactions, so an
+    error part way through doesn't lose the states of the completed batches.
+
+    Raises:
+        InvalidBulkRequest: if the request selects neither ids nor a filter
+    """
+    filters = bulk_transaction_filters(request)
+    q = (
+        select(EndorseRequest.transaction_id)
+        .where(*filters)
+        .order_by(EndorseRequest.created_at)
+    )
+    transaction_ids: list[UUID] = (await db.execute(q)).scalars().all()
+    logger.info(f">>> bulk {action} of {len(transaction_ids)} transactions")
+
+    semaphore = asyncio.Semaphore(settings.ENDORSER_BULK_CONCURRENCY)
+
+    async def call_acapy(transaction_id: UUID) -> BulkTransactionResult:
+        async with semaphore:
+            try:
+                response = cast(
+                    dict, await au.acapy_POST(f"transactions/{transaction_id}/{action}")
+                )
+                return BulkTransactionResult(
+                    transaction_id=transaction_id, state=response["state"]
+                )
+            except Exception as e:
+                logger.error(f">>> bulk {action} failed for {transaction_id}: {e}")
+                return BulkTransactionResult(
+                    transaction_id=transaction_id, error=str(e)
+                )
+
+    results: list[BulkTransactionResult] = []
+    batch_size = settings.ENDORSER_BULK_BATCH_SIZE
+    for i in range(0, len(transaction_ids), batch_size):
+        batch = await asyncio.gather(
+            *[call_acapy(txn_id) for txn_id in transaction_ids[i : i + batch_size]]
+        )
+        await db_update_db_txn_states(
+            db, {r.transaction_id: r.state for r in batch if r.state}
+        )
+        await db.commit()
+        results.extend(batch)
+
+    # report the requested ids that weren't selected
+    if request.transaction_ids is not None:
+        selected = set(transaction_ids)
+        results.extend(
+            BulkTransactionResult(
+                transaction_id=transaction_id,
+                error=f"not found, or not in state {request.state.value}",
+            )
+            for transaction_id in dict.fromkeys(request.transaction_ids)
+            if transaction_id not in selected
+        )
+    return results
+
+
 async def update_endorsement_status(db: AsyncSession, txn: EndorseTransaction):
     logger.info(f">>> called update_endorsement_status with: {txn.transaction_id}")
 
-    # fetch existing db object
-    db_txn: EndorseRequest = await db_fetch_db_txn_record(db, txn.transaction_id)
-
     # update local db state
-    db_txn.state = txn.state
-    db_txn = await db_update_db_txn_record(db, db_txn)
+    await db_update_db_txn_fields(db, txn.transaction_id, {"state": txn.state})
     logger.info(f">>> updated endorser_request for {txn.transaction_id} {txn.state}")
 
     return txn
@@ -0,0 +1,351 @@
+"""Reconciliation of the local tables with aca-py.
+
+A webhook that is lost, or sent while the endorser is down, leaves the contact
+and endorserequest tables out of step with aca-py for good.  The reconciler
+periodically pages through aca-py's connections and transactions, looks up the
+matching local rows (by their unique ids) and replays what is missing through
+the webhook handlers:
+
+- a record we don't have is created by the handlers for its first state
+  ("request" or "request_received"), and then processed as a webhook for its
+  current state
+- a record whose state differs is processed as a webhook for aca-py's state
+
+So a missed "request_received" is still auto-endorsed.  Each record is fetched
+again from aca-py and compared with its local row just before it is replayed,
+as a webhook may have moved it on since its page was fetched.  Only one replica
+runs a pass at a time, guarded by a Postgres advisory lock.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import cast
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+import api.acapy_utils as au
+from api.core.config import settings
+from api.core.metrics import RECONCILE_DRIFT, RECONCILE_DURATION, RECONCILE_RUNS
+from api.db.models.contact import Contact
+from api.db.models.endorse_request import EndorseRequest
+from api.db.session import async_session, engine
+from api.endpoints.models.connections import ConnectionStateType
+from api.endpoints.models.endorse import EndorseTransactionState
+from api.endpoints.models.webhooks import WebhookTopicType
+from api.services.acapy_outbox import outbox_session
+from api.services.webhook_context import WebhookContext
+from api.services.webhooks import (
+    commit_webhook,
+    process_webhook_payload,
+    webhook_dispatcher,
+)
+
+logger = logging.getLogger(__name__)
+
+# arbitrary, only has to be unique among the service's advisory locks
+RECONCILER_LOCK_ID = 7245104001
+
+
+@dataclass
+class ReconcileSource:
+    topic: WebhookTopicType
+    # aca-py list endpoint, and the id field of its records
+    path: str
+    id_field: str
+    # the matching local columns
+    id_column: InstrumentedAttribute
+    state_column: InstrumentedAttribute
+    # the state the local row is created in
+    create_state: str
+
+
+# connections first, the transactions need their contact
+SOURCES = [
+    ReconcileSource(
+        WebhookTopicType.connections,
+        "connections",
+        "connection_id",
+        Contact.connection_id,
+        Contact.state,
+        ConnectionStateType.request.value,
+    ),
+    ReconcileSource(
+        WebhookTopicType.endorse_transaction,
+        "transactions",
+        "transaction_id",
+        EndorseRequest.transaction_id,
+        EndorseRequest.state,
+        EndorseTransactionState.request_received.value,
+    ),
+]
+
+
+async def local_states(
+    db: AsyncSession, source: ReconcileSource, ids: set[str]
+) -> dict[str, str]:
+    """The local state of each of the record ids that has a local row."""
+    q = select(source.id_column, source.state_column).where(
+        source.id_column.in_([uuid.UUID(i) for i in ids])
+    )
+    return {str(key): state for (key, state) in (await db.execute(q)).all()}
+
+
+async def fetch_record(source: ReconcileSource, record_id: str) -> dict | None:
+    """The current aca-py record, None if aca-py no longer has it."""
+    try:
+        return cast(dict, await au.acapy_GET(f"{source.path}/{record_id}"))
+    except au.AcapyError as e:
+        if e.status == 404:
+            return None
+        raise
+
+
+async def create_record(db: AsyncSession, source: ReconcileSource, record: dict):
+    """Create the local row for a record, with the handlers for its first state."""
+    ctx = WebhookContext(source.topic, record)
+    async with outbox_session(db):
+        for handler in webhook_dispatcher.get_handlers(
+            source.topic, source.create_state
+        ):
+            await handler(db, ctx)
+
+
+class Reconciler:
+    """Background task that reconciles with aca-py every ENDORSER_RECONCILE_INTERVAL."""
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+        self._progress: dict = {
+            "status": "idle",
+            "result": None,
+            "checked": 0,
+            "missing": 0,
+            "state_changed": 0,
+            "unhandled": 0,
+            "fixed": 0,
+            "skipped": 0,
+            "failed": 0,
+            "started_at": None,
+            "finished_at": None,
+        }
+
+    def progress(self) -> dict:
+        return dict(self._progress)
+
+    def start(self):
+        if settings.ENDORSER_RECONCILE_INTERVAL > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    def trigger(self):
+        """Run a pass now (in the background)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_once())
+        else:
+            self._wakeup.set()
+
+    async def _loop(self):
+        logger.info(">>> reconciler started")
+        while True:
+            self._wakeup.clear()
+            await self.run_once()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), settings.ENDORSER_RECONCILE_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_once(self) -> bool:
+        """Run a pass, unless another replica is running one.
+
+        Returns:
+            False if the pass was skipped
+        """
+        try:
+            async with engine.connect() as lock_conn:
+                # a session lock, released when the connection is closed
+                locked = (
+                    await lock_conn.execute(
+                        text("SELECT pg_try_advisory_lock(:id)"),
+                        {"id": RECONCILER_LOCK_ID},
+                    )
+                ).scalar()
+                await lock_conn.commit()
+                if not locked:
+                    logger.debug(">>> reconciliation is running on another replica")
+                    RECONCILE_RUNS.inc("skipped")
+                    return False
+                try:
+                    await self._run_pass()
+                finally:
+                    await lock_conn.execute(
+                        text("SELECT pg_advisory_unlock(:id)"),
+                        {"id": RECONCILER_LOCK_ID},
+                    )
+                    await lock_conn.commit()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f">>> reconciliation failed: {e}")
+            self._progress.update(status="idle", result="failed")
+            RECONCILE_RUNS.inc("failed")
+        return True
+
+    async def _run_pass(self):
+        self._progress.update(
+            status="running",
+            result=None,
+            checked=0,
+            missing=0,
+            state_changed=0,
+            unhandled=0,
+            fixed=0,
+            skipped=0,
+            failed=0,
+            started_at=datetime.utcnow(),
+            finished_at=None,
+        )
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(settings.ENDORSER_RECONCILE_CONCURRENCY)
+        page_size = settings.ENDORSER_RECONCILE_PAGE_SIZE
+        for source in SOURCES:
+            offset = 0
+            seen: set[str] = set()
+            while True:
+                response = cast(
+                    dict,
+                    await au.acapy_GET(
+                        source.path, params={"limit": page_size, "offset": offset}
+                    ),
+                )
+                records = (response or {}).get("results", [])
+                repeated = False
+                new_records = []
+                for record in records:
+                    record_id = record.get(source.id_field)
+                    if not record_id:
+                        continue
+                    if str(record_id) in seen:
+                        repeated = True
+                    else:
+                        seen.add(str(record_id))
+                        new_records.append(record)
+                drifted = await self._find_drift(source, new_records)
+                await asyncio.gather(
+                    *[
+                        self._fix(semaphore, source, record, missing)
+                        for (record, missing) in drifted
+                    ]
+                )
+                # a version of aca-py without paging returns everything at once,
+                # and one that ignores the offset returns the same page again
+                if len(records) != page_size:
+                    break
+                if repeated:
+                    logger.warning(
+                        f">>> aca-py returned {source.path} already seen at offset"
+                        f" {offset}, it doesn't seem to support paging"
+                    )
+                    break
+                offset += page_size
+
+        RECONCILE_DURATION.observe(time.perf_counter() - started)
+        RECONCILE_RUNS.inc("completed")
+        self._progress.update(
+            status="idle", result="completed", finished_at=datetime.utcnow()
+        )
+        logger.info(f">>> reconciled with aca-py: {self.progress()}")
+
+    async def _find_drift(
+        self, source: ReconcileSource, records: list[dict]
+    ) -> list[tuple[dict, bool]]:
+        """The records that are missing locally or in a different state."""
+        ids = {str(r[source.id_field]) for r in records if r.get(source.id_field)}
+        if not ids:
+            return []
+        async with async_session() as db:
+            local = await local_states(db, source, ids)
+
+        drifted = []
+        for record in records:
+            record_id = record.get(source.id_field)
+            if not record_id:
+                continue
+            self._progress["checked"] += 1
+            state = record.get("state")
+            missing = str(record_id) not in local
+            if not missing and local[str(record_id)] == state:
+                continue
+            if not (
+                webhook_dispatcher.get_handlers(source.topic, state)
+                or webhook_dispatcher.get_steppers(source.topic, state)
+            ):
+                # nothing would process this state as a webhook either
+                self._progress["unhandled"] += 1
+                RECONCILE_DRIFT.inc(source.topic.value, "unhandled")
+                continue
+            if missing:
+                self._progress["missing"] += 1
+                RECONCILE_DRIFT.inc(source.topic.value, "missing")
+            else:
+                self._progress["state_changed"] += 1
+                RECONCILE_DRIFT.inc(source.topic.value, "state")
+            drifted.append((record, missing))
+        return drifted
+
+    async def _fix(
+        self,
+        semaphore: asyncio.Semaphore,
+        source: ReconcileSource,
+        record: dict,
+        missing: bool,
+    ):
+        async with semaphore:
+            record_id = record[source.id_field]
+            logger.info(
+                f">>> reconciling {source.topic.value} {record_id}:"
+                f" {'missing' if missing else 'state'} {record.get('state')}"
+            )
+            try:
+                async with async_session() as db:
+                    # a webhook may have moved the record on since its page was
+                    # fetched, replaying the page's state would move it back
+                    record = await fetch_record(source, record_id)
+                    local = await local_states(db, source, {str(record_id)})
+                    if record is None or local.get(str(record_id)) == record.get(
+                        "state"
+                    ):
+                        logger.info(
+                            f">>> {source.topic.value} {record_id} is in step now"
+                        )
+                        self._progress["skipped"] += 1
+                        return
+                    missing = str(record_id) not in local
+                    if missing and record.get("state") != source.create_state:
+                        await create_record(db, source, record)
+                    await process_webhook_payload(
+                        db, source.topic, record, raise_errors=True
+                    )
+                    await commit_webhook(db)
+                self._progress["fixed"] += 1
+            except Exception as e:
+                self._progress["failed"] += 1
+                logger.error(
+                    f">>> unable to reconcile {source.topic.value} {record_id}: {e}"
+                )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+reconciler = Reconciler()
@@ -0,0 +1,231 @@
+"""Transaction summaries, read from the transactionreportcounter table.
+
+A trigger on endorserequest inserts a transactionreportdelta row for each new
+request and state change, and the rollup periodically adds the deltas up into
+the counters.  A summary reads (at most) one counter row per connection,
+transaction type, state and hour in the time range, however many transactions
+there are, plus the deltas that haven't been rolled up yet.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from uuid import UUID
+
+from sqlalchemy import BigInteger, Select, Subquery, literal, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.functions import func
+
+from api.core.config import settings
+from api.db.models.transaction_report import (
+    TransactionReportCounter,
+    TransactionReportDelta,
+)
+from api.db.session import async_session
+from api.endpoints.models.reports import (
+    ReportGroupByType,
+    TransactionSummary,
+    TransactionSummaryItem,
+)
+
+logger = logging.getLogger(__name__)
+
+# deltas added to the counters at a time
+ROLLUP_BATCH_SIZE = 50000
+
+# delete a batch of deltas, and add them to the counters, in one statement; the
+# counter rows are updated in a fixed order so concurrent rollups can't deadlock
+ROLLUP_SQL = text("""
+    WITH rolled_up AS (
+        DELETE FROM transactionreportdelta
+        WHERE id IN (
+            SELECT id FROM transactionreportdelta
+            ORDER BY id
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING connection_id, transaction_type, state, bucket
+    ), counted AS (
+        INSERT INTO transactionreportcounter
+            (connection_id, transaction_type, state, bucket, count)
+        SELECT connection_id, transaction_type, state, bucket, count(*)
+        FROM rolled_up
+        GROUP BY connection_id, transaction_type, state, bucket
+        ORDER BY connection_id, transaction_type, state, bucket
+        ON CONFLICT (connection_id, transaction_type, state, bucket)
+        DO UPDATE SET count = transactionreportcounter.count + EXCLUDED.count
+    )
+    SELECT count(*) FROM rolled_up
+    """)
+
+
+def report_counts() -> Subquery:
+    """The counters and the deltas not rolled up yet, as one set of counts."""
+    return union_all(
+        select(
+            TransactionReportCounter.connection_id,
+            TransactionReportCounter.transaction_type,
+            TransactionReportCounter.state,
+            TransactionReportCounter.bucket,
+            TransactionReportCounter.count,
+        ),
+        select(
+            TransactionReportDelta.connection_id,
+            TransactionReportDelta.transaction_type,
+            TransactionReportDelta.state,
+            TransactionReportDelta.bucket,
+            literal(1, BigInteger).label("count"),
+        ),
+    ).subquery("counts")
+
+
+def group_by_column(counts: Subquery, group_by: ReportGroupByType):
+    """The column of the counts to group by, time periods are labelled period."""
+    match group_by:
+        case ReportGroupByType.hour:
+            return counts.c.bucket.label("period")
+        case ReportGroupByType.day:
+            return func.date_trunc("day", counts.c.bucket).label("period")
+        case _:
+            return counts.c[group_by.value]
+
+
+def hour_start(value: datetime) -> datetime:
+    """The start of the hour, as a naive UTC time like the bucket column."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def summary_query(
+    group_by: list[ReportGroupByType],
+    start: datetime | None = None,
+    end: datetime | None = None,
+    connection_id: UUID | None = None,
+    transaction_type: str | None = None,
+    state: str | None = None,
+) -> Select:
+    """The summary query, see get_transaction_summary().
+
+    Raises:
+        ValueError: if grouped by both hour and day
+    """
+    if ReportGroupByType.hour in group_by and ReportGroupByType.day in group_by:
+        raise ValueError("Group by hour or day, not both")
+    counts = report_counts()
+    group_columns = [group_by_column(counts, g) for g in group_by]
+
+    filters = []
+    if start:
+        filters.append(counts.c.bucket >= hour_start(start))
+    if end:
+        # the counts are per hour, so is the range: [start hour, end hour)
+        filters.append(counts.c.bucket < hour_start(end))
+    if connection_id:
+        filters.append(counts.c.connection_id == connection_id)
+    if transaction_type:
+        filters.append(counts.c.transaction_type == transaction_type)
+    if state:
+        filters.append(counts.c.state == state)
+
+    total = func.sum(counts.c.count).label("count")
+    q = select(*group_columns, total).where(*filters)
+    if group_columns:
+        q = q.group_by(*group_columns).order_by(*group_columns)
+    return q
+
+
+async def get_transaction_summary(
+    db: AsyncSession,
+    group_by: list[ReportGroupByType],
+    start: datetime | None = None,
+    end: datetime | None = None,
+    connection_id: UUID | None = None,
+    transaction_type: str | None = None,
+    state: str | None = None,
+) -> TransactionSummary:
+    """Count the transactions that entered each state in a time range.
+
+    Args:
+        db: database session
+        group_by: the columns to group by, hour and day group by time period
+        start: start of the time range (inclusive, rounded down to the hour)
+        end: end of the time range (exclusive, rounded down to the hour, so
+            an end of 10:30 counts up to 10:00)
+        connection_id: only count this connection's transactions
+        transaction_type: only count this transaction type
+        state: only count this state
+
+    Returns:
+        the count for each group, ordered by the group columns
+    """
+    # de-duplicated, in the order given
+    group_by = list(dict.fromkeys(group_by))
+    q = summary_query(group_by, start, end, connection_id, transaction_type, state)
+    rows = (await db.execute(q)).all()
+
+    # without grouping there is always one row, with a null sum if nothing matched
+    results = [
+        TransactionSummaryItem(**row._mapping)
+        for row in rows
+        if row._mapping["count"] is not None
+    ]
+    return TransactionSummary(
+        start=start,
+        end=end,
+        group_by=group_by,
+        total=sum(r.count for r in results),
+        results=results,
+    )
+
+
+async def rollup_report_counts(db: AsyncSession) -> int:
+    """Add the deltas up into the counters, committing each batch.
+
+    Returns:
+        the number of deltas rolled up
+    """
+    rolled_up = 0
+    while True:
+        batch = (
+            await db.execute(ROLLUP_SQL, {"batch_size": ROLLUP_BATCH_SIZE})
+        ).scalar()
+        await db.commit()
+        rolled_up += batch
+        if batch < ROLLUP_BATCH_SIZE:
+            return rolled_up
+
+
+class ReportRollup:
+    """Background task that adds the report deltas up into the counters."""
+
+    def __init__(self):
+        """Create the rollup, it runs once started."""
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        """Start rolling up, unless ENDORSER_REPORT_ROLLUP_INTERVAL is 0."""
+        if settings.ENDORSER_REPORT_ROLLUP_INTERVAL > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self):
+        while True:
+            try:
+                async with async_session() as db:
+                    rolled_up = await rollup_report_counts(db)
+                logger.debug(f">>> rolled up {rolled_up} transaction report counts")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f">>> unable to roll up the transaction reports: {e}")
+            await asyncio.sleep(settings.ENDORSER_REPORT_ROLLUP_INTERVAL)
+
+    async def stop(self):
+        """Stop rolling up, the deltas left are rolled up on the next start."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+report_rollup = ReportRollup()
@@ -0,0 +1,144 @@
+"""Streaming export of the endorserequest table, as NDJSON or CSV.
+
+The rows are read through a server-side cursor, ENDORSER_EXPORT_BATCH_SIZE at a
+time, and each batch is encoded (and optionally gzipped) and sent before the
+next one is fetched, so an export holds one batch in memory whatever the size
+of the table.  Rows are exported oldest first, in the api's transaction format.
+"""
+
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterable
+
+from sqlalchemy import Select, select
+
+from api.core.config import settings
+from api.db.models.endorse_request import EndorseRequest
+from api.db.session import async_session
+from api.endpoints.models.endorse import (
+    EndorseTransaction,
+    ExportFormatType,
+    db_to_txn_object,
+)
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = list(EndorseTransaction.model_fields)
+
+MEDIA_TYPES = {
+    ExportFormatType.ndjson: "application/x-ndjson",
+    ExportFormatType.csv: "text/csv",
+}
+
+
+def utc_naive(value: datetime) -> datetime:
+    """A naive UTC time, like the created_at column."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def export_query(
+    state: str | None = None,
+    connection_id: str | None = None,
+    transaction_type: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> Select:
+    if start and end and start > end:
+        raise ValueError("start must be before end")
+    filters = []
+    if state:
+        filters.append(EndorseRequest.state == state)
+    if connection_id:
+        filters.append(EndorseRequest.connection_id == connection_id)
+    if transaction_type:
+        filters.append(EndorseRequest.transaction_type == transaction_type)
+    if start:
+        filters.append(EndorseRequest.created_at >= utc_naive(start))
+    if end:
+        filters.append(EndorseRequest.created_at < utc_naive(end))
+    return (
+        select(EndorseRequest)
+        .filter(*filters)
+        .order_by(EndorseRequest.created_at, EndorseRequest.endorse_request_id)
+    )
+
+
+def encode_ndjson(rows: Iterable[dict]) -> bytes:
+    return "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+
+def encode_csv(rows: Iterable[dict], header: bool = False) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        # nested values (the ledger payload, tags) as json
+        writer.writerow(
+            [
+                json.dumps(row[c]) if isinstance(row[c], (dict, list)) else row[c]
+                for c in EXPORT_COLUMNS
+            ]
+        )
+    return out.getvalue().encode()
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Gzip a stream of chunks, as one gzip file."""
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def export_chunks(
+    query: Select, export_format: ExportFormatType
+) -> AsyncIterator[bytes]:
+    """Encode the rows of the query, one chunk per batch."""
+    if export_format == ExportFormatType.csv:
+        yield encode_csv([], header=True)
+    exported = 0
+    try:
+        async with async_session() as db:
+            result = await db.stream_scalars(
+                query.execution_options(yield_per=settings.ENDORSER_EXPORT_BATCH_SIZE)
+            )
+            async for partition in result.partitions():
+                rows = [
+                    db_to_txn_object(db_txn).model_dump(mode="json")
+                    for db_txn in partition
+                ]
+                if export_format == ExportFormatType.csv:
+                    yield encode_csv(rows)
+                else:
+                    yield encode_ndjson(rows)
+                exported += len(rows)
+                # nothing is changed, don't keep the exported rows around
+                db.expunge_all()
+    except Exception as e:
+        # the response has started, all we can do is cut it short
+        logger.error(f">>> transaction export failed after {exported} rows: {e}")
+        raise
+    logger.info(f">>> exported {exported} transactions")
+
+
+def export_transactions(
+    export_format: ExportFormatType = ExportFormatType.ndjson,
+    compress: bool = False,
+    **filters,
+) -> AsyncIterator[bytes]:
+    """The export, as a stream of chunks for a StreamingResponse.
+
+    Raises:
+        ValueError: if the filters are invalid (before anything is streamed)
+    """
+    chunks = export_chunks(export_query(**filters), export_format)
+    return gzip_chunks(chunks) if compress else chunks
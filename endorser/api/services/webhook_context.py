@@ -0,0 +1,62 @@
+"""Per-webhook state shared by the handlers and auto-steppers.
+
+The payload is parsed (into an EndorseTransaction or Connection), the endorser
+did is looked up and the author's Contact is loaded at most once per webhook, the
+first time a handler or auto-stepper asks for them.
+"""
+
+import logging
+from dataclasses import dataclass, field
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db.models.contact import Contact
+from api.endpoints.models.connections import Connection, webhook_to_connection_object
+from api.endpoints.models.endorse import EndorseTransaction, webhook_to_txn_object
+from api.endpoints.models.webhooks import WebhookTopicType
+from api.services.connections import db_fetch_db_contact_record
+from api.services.endorse import get_endorser_did
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WebhookContext:
+    topic: WebhookTopicType
+    payload: dict
+    _endorser_did: str | None = field(default=None, repr=False)
+    _transaction: EndorseTransaction | None = field(default=None, repr=False)
+    _connection: Connection | None = field(default=None, repr=False)
+    _contact: Contact | None = field(default=None, repr=False)
+
+    @property
+    def state(self) -> str | None:
+        return self.payload.get("state")
+
+    async def endorser_did(self) -> str:
+        if self._endorser_did is None:
+            self._endorser_did = await get_endorser_did()
+        return self._endorser_did
+
+    async def transaction(self) -> EndorseTransaction:
+        """The endorse_transaction payload, as an EndorseTransaction."""
+        if self._transaction is None:
+            self._transaction = webhook_to_txn_object(
+                self.payload, await self.endorser_did()
+            )
+        return self._transaction
+
+    def connection(self) -> Connection:
+        """The connections payload, as a Connection."""
+        if self._connection is None:
+            self._connection = webhook_to_connection_object(self.payload)
+        return self._connection
+
+    async def contact(self, db: AsyncSession) -> Contact:
+        """The Contact for the connection the transaction was received on."""
+        if self._contact is None:
+            transaction = await self.transaction()
+            self._contact = await db_fetch_db_contact_record(
+                db, transaction.connection_id
+            )
+        return self._contact
@@ -5,92 +5,88 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from api.endpoints.models.connections import (
     Connection,
     ConnectionProtocolType,
-    webhook_to_connection_object,
-)
-from api.endpoints.models.endorse import (
-    EndorseTransaction,
-    webhook_to_txn_object,
 )
+from api.endpoints.models.endorse import EndorseTransaction
 from api.services.connections import (
     set_connection_author_metadata,
     store_connection_request,
     update_connection_status,
 )
 from api.services.endorse import (
-    get_endorser_did,
     store_endorser_request,
     update_endorsement_status,
 )
+from api.services.webhook_context import WebhookContext
 
 logger = logging.getLogger(__name__)
 
 
-async def handle_ping_received(db: AsyncSession, payload: dict) -> dict:
+async def handle_ping_received(db: AsyncSession, ctx: WebhookContext) -> dict:
     logger.info(">>> in handle_ping_received() ...")
     return {}
 
 
-async def handle_connections_request(db: AsyncSession, payload: dict):
+async def handle_connections_request(db: AsyncSession, ctx: WebhookContext):
     """Handle connection requests."""
     logger.info(">>> in handle_connections_request() ...")
-    connection: Connection = webhook_to_connection_object(payload)
+    connection: Connection = ctx.connection()
     result = await store_connection_request(db, connection)
     return result
 
 
-async def handle_connections_response(db: AsyncSession, payload: dict):
-    connection: Connection = webhook_to_connection_object(payload)
+async def handle_connections_response(db: AsyncSession, ctx: WebhookContext):
+    connection: Connection = ctx.connection()
     result = await update_connection_status(db, connection)
     return result
 
 
-async def handle_connections_active(db: AsyncSession, payload: dict):
-    connection: Connection = webhook_to_connection_object(payload)
+async def handle_connections_active(db: AsyncSession, ctx: WebhookContext):
+    connection: Connection = ctx.connection()
     result = await update_connection_status(db, connection)
     return result
 
 
-async def handle_connections_completed(db: AsyncSession, payload: dict):
+async def handle_connections_completed(db: AsyncSession, ctx: WebhookContext):
     """Set endorser role on any connections we receive."""
     # TODO check final state for other connections protocols
-    if payload["connection_protocol"] == ConnectionProtocolType.DIDExchange.value:
-        connection: Connection = webhook_to_connection_object(payload)
+    if ctx.payload["connection_protocol"] == ConnectionProtocolType.DIDExchange.value:
+        connection: Connection = ctx.connection()
         await set_connection_author_metadata(db, connection)
     return {}
 
 
-async def handle_endorse_transaction_request_received(db: AsyncSession, payload: dict):
+async def handle_endorse_transaction_request_received(
+    db: AsyncSession, ctx: WebhookContext
+):
     """Handle transaction endorse requests."""
     logger.info(">>> in handle_endorse_transaction_request_received() ...")
-    endorser_did = await get_endorser_did()
-    transaction: EndorseTransaction = webhook_to_txn_object(payload, endorser_did)
+    transaction: EndorseTransaction = await ctx.transaction()
     result = await store_endorser_request(db, transaction)
     return result
 
 
 async def handle_endorse_transaction_transaction_endorsed(
-    db: AsyncSession, payload: dict
+    db: AsyncSession, ctx: WebhookContext
 ):
     logger.info(">>> in handle_endorse_transaction_transaction_endorsed() ...")
-    endorser_did = await get_endorser_did()
-    transaction: EndorseTransaction = webhook_to_txn_object(payload, endorser_did)
+    transaction: EndorseTransaction = await ctx.transaction()
     result = await update_endorsement_status(db, transaction)
     return result
 
 
 async def handle_endorse_transaction_transaction_refused(
-    db: AsyncSession, payload: dict
+    db: AsyncSession, ctx: WebhookContext
 ):
     logger.info(">>> in handle_endorse_transaction_transaction_refused() ...")
-    endorser_did = await get_endorser_did()
-    transaction: EndorseTransaction = webhook_to_txn_object(payload, endorser_did)
+    transaction: EndorseTransaction = await ctx.transaction()
     result = await update_endorsement_status(db, transaction)
     return result
 
 
-async def handle_endorse_transaction_transaction_acked(db: AsyncSession, payload: dict):
+async def handle_endorse_transaction_transaction_acked(
+    db: AsyncSession, ctx: WebhookContext
+):
     logger.info(">>> in handle_endorse_transaction_transaction_acked() ...")
-    endorser_did = await get_endorser_did()
-    transaction: EndorseTransaction = webhook_to_txn_object(payload, endorser_did)
+    transaction: EndorseTransaction = await ctx.transaction()
     result = await update_endorsement_status(db, transaction)
     return result
@@ -0,0 +1,304 @@
+"""Durable webhook ingestion.
+
+When ENDORSER_WEBHOOK_QUEUE is enabled, webhooks are stored in the webhookinbox
+table and acknowledged straight away.  A pool of workers then drains the inbox:
+
+- webhooks for the same ordering_key (transaction_id or connection_id) are
+  processed one at a time, in arrival order
+- a failed handler is retried with exponential backoff, after
+  ENDORSER_WEBHOOK_MAX_ATTEMPTS attempts the webhook is marked "dead"
+- rows left "processing" by a crashed worker are released after
+  ENDORSER_WEBHOOK_LEASE_TIMEOUT seconds, a worker renews the lease of the
+  webhook it is processing so a slow webhook isn't released
+- a claim is identified by the webhook's attempts count, so a worker whose lease
+  was released (and the webhook claimed again) can't complete or fail it
+"""
+
+import asyncio
+import logging
+from datetime import timedelta
+from uuid import UUID
+
+from sqlalchemy import Integer, String, delete, desc, select, text, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.functions import func
+
+from api.core.config import settings
+from api.db.errors import DoesNotExist
+from api.db.models.webhook_inbox import WebhookInbox
+from api.db.session import async_session
+from api.endpoints.models.webhooks import WebhookInboxStatusType, WebhookTopicType
+from api.services.webhooks import commit_webhook, process_webhook_payload
+
+logger = logging.getLogger(__name__)
+
+# claim the oldest ready webhook whose ordering_key has no earlier webhook still
+# waiting or being processed (dead webhooks don't block their key)
+CLAIM_NEXT_WEBHOOK = text("""
+    UPDATE webhookinbox SET status = 'processing', attempts = attempts + 1,
+        updated_at = now()
+    WHERE webhook_inbox_id = (
+        SELECT w.webhook_inbox_id FROM webhookinbox w
+        WHERE w.status = 'pending' AND w.next_attempt_at <= now()
+        AND NOT EXISTS (
+            SELECT 1 FROM webhookinbox e
+            WHERE e.ordering_key = w.ordering_key AND e.seq < w.seq
+            AND e.status IN ('pending', 'processing')
+        )
+        ORDER BY w.seq
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING webhook_inbox_id, topic, payload, attempts
+    """).columns(
+    webhook_inbox_id=PG_UUID(as_uuid=True),
+    topic=String,
+    payload=JSONB,
+    attempts=Integer,
+)
+
+RELEASE_EXPIRED_LEASES = text("""
+    UPDATE webhookinbox SET status = 'pending', updated_at = now()
+    WHERE status = 'processing'
+    AND updated_at < now() - make_interval(secs => :lease_timeout)
+    """)
+
+# the lease is renewed this many times per lease timeout
+LEASE_RENEWALS = 3
+
+
+def webhook_ordering_key(topic: WebhookTopicType, payload: dict) -> str:
+    return str(
+        payload.get("transaction_id") or payload.get("connection_id") or topic.value
+    )
+
+
+async def enqueue_webhook(
+    db: AsyncSession, topic: WebhookTopicType, payload: dict
+) -> WebhookInbox:
+    db_webhook = WebhookInbox(
+        topic=topic.value,
+        state=payload.get("state"),
+        ordering_key=webhook_ordering_key(topic, payload),
+        payload=payload,
+        status=WebhookInboxStatusType.pending.value,
+        attempts=0,
+    )
+    db.add(db_webhook)
+    await db.commit()
+    webhook_workers.wake()
+    return db_webhook
+
+
+async def db_get_webhook_inbox_records(
+    db: AsyncSession,
+    status: str | None = None,
+    page_size: int = 10,
+    page_num: int = 1,
+) -> tuple[int, list[WebhookInbox]]:
+    limit = page_size
+    skip = (page_num - 1) * limit
+    filters = []
+    if status:
+        filters.append(WebhookInbox.status == status)
+
+    base_q = select(WebhookInbox).filter(*filters)
+
+    count_q = base_q.with_only_columns(func.count()).order_by(None)
+    count_q_rec = await db.execute(count_q)
+    total_count: int = count_q_rec.scalar() or 0
+
+    results_q = base_q.limit(limit).offset(skip).order_by(desc(WebhookInbox.seq))
+    results_q_recs = await db.execute(results_q)
+    db_webhooks: list[WebhookInbox] = results_q_recs.scalars().all()
+
+    return (total_count, db_webhooks)
+
+
+async def retry_dead_webhook(db: AsyncSession, webhook_inbox_id: UUID) -> WebhookInbox:
+    q = (
+        update(WebhookInbox)
+        .where(WebhookInbox.webhook_inbox_id == webhook_inbox_id)
+        .where(WebhookInbox.status == WebhookInboxStatusType.dead.value)
+        .values(
+            status=WebhookInboxStatusType.pending.value,
+            attempts=0,
+            next_attempt_at=func.now(),
+        )
+        .returning(WebhookInbox)
+    )
+    result = await db.execute(q)
+    result_rec = result.scalar_one_or_none()
+    if not result_rec:
+        raise DoesNotExist(
+            f"{WebhookInbox.__name__}<webhook_inbox_id:{webhook_inbox_id}> "
+            "does not exist or is not dead"
+        )
+    await db.commit()
+    webhook_workers.wake()
+    return result_rec
+
+
+async def claim_next_webhook(db: AsyncSession):
+    result = await db.execute(CLAIM_NEXT_WEBHOOK)
+    row = result.one_or_none()
+    await db.commit()
+    return row
+
+
+def claimed_webhook(webhook_inbox_id: UUID, attempts: int):
+    """Filter for a webhook still claimed by the worker that claimed it."""
+    return (
+        WebhookInbox.webhook_inbox_id == webhook_inbox_id,
+        WebhookInbox.status == WebhookInboxStatusType.processing.value,
+        WebhookInbox.attempts == attempts,
+    )
+
+
+async def renew_webhook_lease(
+    db: AsyncSession, webhook_inbox_id: UUID, attempts: int
+) -> bool:
+    """Extend the lease of a claimed webhook, False if it is no longer claimed."""
+    q = (
+        update(WebhookInbox)
+        .where(*claimed_webhook(webhook_inbox_id, attempts))
+        .values(updated_at=func.now())
+    )
+    result = await db.execute(q)
+    await db.commit()
+    return result.rowcount > 0
+
+
+async def keep_webhook_leased(webhook_inbox_id: UUID, attempts: int):
+    """Renew the lease of a claimed webhook until cancelled."""
+    interval = settings.ENDORSER_WEBHOOK_LEASE_TIMEOUT / LEASE_RENEWALS
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with async_session() as db:
+                if not await renew_webhook_lease(db, webhook_inbox_id, attempts):
+                    logger.warning(f">>> lost the lease of webhook {webhook_inbox_id}")
+                    return
+        except Exception as e:
+            logger.error(f">>> unable to renew webhook lease {webhook_inbox_id}: {e}")
+
+
+async def complete_webhook(db: AsyncSession, webhook_inbox_id: UUID, attempts: int):
+    q = delete(WebhookInbox).where(*claimed_webhook(webhook_inbox_id, attempts))
+    result = await db.execute(q)
+    await db.commit()
+    if not result.rowcount:
+        logger.warning(f">>> webhook {webhook_inbox_id} was claimed again")
+
+
+async def fail_webhook(
+    db: AsyncSession, webhook_inbox_id: UUID, attempts: int, error: str
+):
+    if attempts >= settings.ENDORSER_WEBHOOK_MAX_ATTEMPTS:
+        status = WebhookInboxStatusType.dead
+        logger.error(f">>> webhook {webhook_inbox_id} failed {attempts} times: {error}")
+    else:
+        status = WebhookInboxStatusType.pending
+    delay = settings.ENDORSER_WEBHOOK_RETRY_DELAY * (2 ** (attempts - 1))
+    q = (
+        update(WebhookInbox)
+        .where(*claimed_webhook(webhook_inbox_id, attempts))
+        .values(
+            status=status.value,
+            last_error=error,
+            next_attempt_at=func.now() + timedelta(seconds=delay),
+        )
+    )
+    await db.execute(q)
+    await db.commit()
+
+
+async def process_next_webhook() -> bool:
+    """Claim and process one webhook, returns False if there was nothing to do."""
+    async with async_session() as db:
+        row = await claim_next_webhook(db)
+    if not row:
+        return False
+
+    logger.debug(f">>> processing webhook {row.webhook_inbox_id} ({row.topic})")
+    lease = asyncio.create_task(keep_webhook_leased(row.webhook_inbox_id, row.attempts))
+    try:
+        async with async_session() as db:
+            try:
+                await process_webhook_payload(
+                    db, WebhookTopicType(row.topic), row.payload, raise_errors=True
+                )
+                await commit_webhook(db)
+            except Exception:
+                await db.rollback()
+                raise
+    except Exception as e:
+        async with async_session() as db:
+            await fail_webhook(db, row.webhook_inbox_id, row.attempts, str(e))
+        return True
+    finally:
+        lease.cancel()
+
+    async with async_session() as db:
+        await complete_webhook(db, row.webhook_inbox_id, row.attempts)
+    return True
+
+
+class WebhookWorkers:
+    """Pool of asyncio tasks that drain the webhook inbox."""
+
+    def __init__(self):
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def _run(self, worker_num: int):
+        logger.info(f">>> webhook worker {worker_num} started")
+        while True:
+            try:
+                if await process_next_webhook():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f">>> webhook worker {worker_num} error: {e}")
+            # nothing to do, wait until woken up or the next poll
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), settings.ENDORSER_WEBHOOK_POLL_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _release_expired_leases(self):
+        while True:
+            try:
+                async with async_session() as db:
+                    await db.execute(
+                        RELEASE_EXPIRED_LEASES,
+                        {"lease_timeout": settings.ENDORSER_WEBHOOK_LEASE_TIMEOUT},
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.error(f">>> unable to release expired webhook leases: {e}")
+            await asyncio.sleep(settings.ENDORSER_WEBHOOK_LEASE_TIMEOUT)
+
+    def start(self, num_workers: int):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(num_workers)]
+        self._tasks.append(asyncio.create_task(self._release_expired_leases()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+webhook_workers = WebhookWorkers()
@@ -0,0 +1,158 @@
+"""De-duplication of redelivered webhooks.
+
+aca-py re-sends a webhook it didn't get a response for.  Each processed webhook
+is recorded in the webhookreceipt table, keyed on (topic, transaction_id or
+connection_id, state), in the same transaction as the handler's changes.  A
+redelivered webhook either hits the in-memory cache of recently processed keys,
+or conflicts with the receipt, and is acknowledged without being processed again.
+
+The auto-steps of a webhook get a receipt of their own (the topic suffixed with
+STEPS_SUFFIX), recorded once they have all succeeded.  So a redelivered webhook
+whose auto-steps failed (e.g. a ledger lookup for the auto-endorse decision)
+runs its auto-steps again, but not its handlers.
+
+Receipts are deleted after ENDORSER_WEBHOOK_RECEIPT_RETENTION_DAYS, aca-py only
+re-sends a webhook for a few minutes.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.core.config import settings
+from api.db.models.webhook_receipt import WebhookReceipt
+from api.db.session import async_session
+from api.endpoints.models.webhooks import WebhookTopicType
+
+logger = logging.getLogger(__name__)
+
+ReceiptKey = tuple[str, str, str]
+
+STEPS_SUFFIX = "/steps"
+
+# seconds between deletes of expired receipts, and receipts deleted per statement
+PRUNE_INTERVAL = 3600
+PRUNE_BATCH_SIZE = 10000
+
+
+class RecentKeys:
+    """Bounded set of the most recently seen webhook keys."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._keys: OrderedDict[ReceiptKey, None] = OrderedDict()
+
+    def __contains__(self, key: ReceiptKey) -> bool:
+        return key in self._keys
+
+    def add(self, key: ReceiptKey):
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+
+    def clear(self):
+        self._keys.clear()
+
+
+recent_webhooks = RecentKeys(settings.ENDORSER_WEBHOOK_DEDUP_CACHE_SIZE)
+
+
+def webhook_receipt_key(topic: WebhookTopicType, payload: dict) -> ReceiptKey | None:
+    """The idempotency key of a webhook, None if it can't be de-duplicated."""
+    object_id = payload.get("transaction_id") or payload.get("connection_id")
+    state = payload.get("state")
+    if not (object_id and state):
+        return None
+    return (topic.value, str(object_id), state)
+
+
+def steps_receipt_key(key: ReceiptKey) -> ReceiptKey:
+    """The key of the receipt for a webhook's auto-steps."""
+    topic, object_id, state = key
+    return (topic + STEPS_SUFFIX, object_id, state)
+
+
+async def webhook_receipt_exists(db: AsyncSession, key: ReceiptKey) -> bool:
+    topic, object_id, state = key
+    q = select(WebhookReceipt.topic).where(
+        WebhookReceipt.topic == topic,
+        WebhookReceipt.object_id == object_id,
+        WebhookReceipt.state == state,
+    )
+    return (await db.execute(q)).first() is not None
+
+
+async def record_webhook_receipt(db: AsyncSession, key: ReceiptKey) -> bool:
+    """Record a webhook as processed, returns False if it already was."""
+    topic, object_id, state = key
+    q = (
+        insert(WebhookReceipt)
+        .values(topic=topic, object_id=object_id, state=state)
+        .on_conflict_do_nothing()
+        .returning(WebhookReceipt.topic)
+    )
+    result = await db.execute(q)
+    return result.first() is not None
+
+
+async def prune_webhook_receipts(db: AsyncSession, older_than: datetime) -> int:
+    """Delete the receipts recorded before older_than, in batches.
+
+    Returns:
+        the number of receipts deleted
+    """
+    key = tuple_(WebhookReceipt.topic, WebhookReceipt.object_id, WebhookReceipt.state)
+    deleted = 0
+    while True:
+        expired = (
+            select(WebhookReceipt.topic, WebhookReceipt.object_id, WebhookReceipt.state)
+            .where(WebhookReceipt.created_at < older_than)
+            .limit(PRUNE_BATCH_SIZE)
+        )
+        result = await db.execute(delete(WebhookReceipt).where(key.in_(expired)))
+        await db.commit()
+        deleted += result.rowcount
+        if result.rowcount < PRUNE_BATCH_SIZE:
+            return deleted
+
+
+class WebhookReceiptPruner:
+    """Background task that deletes the expired webhook receipts."""
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if settings.ENDORSER_WEBHOOK_RECEIPT_RETENTION_DAYS > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self):
+        while True:
+            older_than = datetime.utcnow() - timedelta(
+                days=settings.ENDORSER_WEBHOOK_RECEIPT_RETENTION_DAYS
+            )
+            try:
+                async with async_session() as db:
+                    deleted = await prune_webhook_receipts(db, older_than)
+                if deleted:
+                    logger.info(f">>> deleted {deleted} expired webhook receipts")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f">>> unable to delete expired webhook receipts: {e}")
+            await asyncio.sleep(PRUNE_INTERVAL)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+webhook_receipt_pruner = WebhookReceiptPruner()
@@ -0,0 +1,267 @@
+import logging
+import time
+import traceback
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import api.services as api_services
+from api.core.metrics import WEBHOOK_DURATION, WEBHOOKS
+from api.core.tracing import span
+from api.endpoints.models.connections import ConnectionStateType
+from api.endpoints.models.endorse import EndorseTransactionState
+from api.endpoints.models.webhooks import WebhookTopicType
+from api.services.acapy_outbox import outbox_dispatcher, outbox_session
+from api.services.webhook_context import WebhookContext
+from api.services.webhook_receipts import (
+    record_webhook_receipt,
+    recent_webhooks,
+    steps_receipt_key,
+    webhook_receipt_exists,
+    webhook_receipt_key,
+)
+
+logger = logging.getLogger(__name__)
+
+# processed webhooks waiting for the session to commit
+RECEIPT_KEYS_SESSION_KEY = "webhook_receipt_keys"
+
+WebhookHandler = Callable[[AsyncSession, WebhookContext], Awaitable[Any]]
+WebhookStepper = Callable[[AsyncSession, WebhookContext, Any], Awaitable[Any]]
+WebhookKey = tuple[WebhookTopicType, str | None]
+
+
+class WebhookDispatcher:
+    """
+    Registry of the handlers and auto-steppers for each webhook (topic, state).
+
+    For each webhook the handlers are called in the order they were registered,
+    the result of the first handler is returned to aca-py and is passed to each
+    of the auto-steppers, which move the transaction/connection to the next state.
+    Handlers and auto-steppers share one WebhookContext, so the payload is only
+    parsed once.
+    """
+
+    def __init__(self):
+        self._handlers: dict[WebhookKey, list[WebhookHandler]] = {}
+        self._steppers: dict[WebhookKey, list[WebhookStepper]] = {}
+
+    def register_handler(
+        self, topic: WebhookTopicType, state: str | None, handler: WebhookHandler
+    ):
+        self._handlers.setdefault((topic, state), []).append(handler)
+
+    def register_stepper(
+        self, topic: WebhookTopicType, state: str | None, stepper: WebhookStepper
+    ):
+        self._steppers.setdefault((topic, state), []).append(stepper)
+
+    def get_handlers(
+        self, topic: WebhookTopicType, state: str | None
+    ) -> list[WebhookHandler]:
+        return self._handlers.get((topic, state), [])
+
+    def get_steppers(
+        self, topic: WebhookTopicType, state: str | None
+    ) -> list[WebhookStepper]:
+        return self._steppers.get((topic, state), [])
+
+    def describe(self) -> list[dict]:
+        keys = sorted(
+            self._handlers.keys() | self._steppers.keys(),
+            key=lambda k: (k[0].value, k[1] or ""),
+        )
+        return [
+            {
+                "topic": topic.value,
+                "state": state,
+                "handlers": [h.__name__ for h in self.get_handlers(topic, state)],
+                "steppers": [s.__name__ for s in self.get_steppers(topic, state)],
+            }
+            for (topic, state) in keys
+        ]
+
+
+webhook_dispatcher = WebhookDispatcher()
+
+# (topic, state, handler, auto-stepper) for the webhooks the endorser processes
+DEFAULT_WEBHOOKS = [
+    (
+        WebhookTopicType.ping,
+        "received",
+        api_services.handle_ping_received,
+        api_services.auto_step_ping_received,
+    ),
+    (
+        WebhookTopicType.connections,
+        ConnectionStateType.request.value,
+        api_services.handle_connections_request,
+        api_services.auto_step_connections_request,
+    ),
+    (
+        WebhookTopicType.connections,
+        ConnectionStateType.response.value,
+        api_services.handle_connections_response,
+        api_services.auto_step_connections_response,
+    ),
+    (
+        WebhookTopicType.connections,
+        ConnectionStateType.active.value,
+        api_services.handle_connections_active,
+        api_services.auto_step_connections_active,
+    ),
+    (
+        WebhookTopicType.connections,
+        ConnectionStateType.completed.value,
+        api_services.handle_connections_completed,
+        api_services.auto_step_connections_completed,
+    ),
+    (
+        WebhookTopicType.endorse_transaction,
+        EndorseTransactionState.request_received.value,
+        api_services.handle_endorse_transaction_request_received,
+        api_services.auto_step_endorse_transaction_request_received,
+    ),
+    (
+        WebhookTopicType.endorse_transaction,
+        EndorseTransactionState.transaction_endorsed.value,
+        api_services.handle_endorse_transaction_transaction_endorsed,
+        api_services.auto_step_endorse_transaction_transaction_endorsed,
+    ),
+    (
+        WebhookTopicType.endorse_transaction,
+        EndorseTransactionState.transaction_refused.value,
+        api_services.handle_endorse_transaction_transaction_refused,
+        api_services.auto_step_endorse_transaction_transaction_refused,
+    ),
+    (
+        WebhookTopicType.endorse_transaction,
+        EndorseTransactionState.transaction_acked.value,
+        api_services.handle_endorse_transaction_transaction_acked,
+        api_services.auto_step_endorse_transaction_transaction_acked,
+    ),
+]
+for topic, state, handler, stepper in DEFAULT_WEBHOOKS:
+    webhook_dispatcher.register_handler(topic, state, handler)
+    webhook_dispatcher.register_stepper(topic, state, stepper)
+
+
+async def process_webhook_payload(
+    db: AsyncSession,
+    topic: WebhookTopicType,
+    payload: dict,
+    raise_errors: bool = False,
+):
+    """
+    Run the handlers and then the auto-steppers for a webhook.
+
+    The webhook is one unit of work: the handlers run in one savepoint and each
+    auto-stepper in its own, so a failed step rolls back only its own changes.
+    Nothing is committed here, the caller commits with commit_webhook().  aca-py
+    calls are recorded in the outbox and are sent once committed.
+
+    A webhook that has already been processed (same topic, transaction or
+    connection id and state) is ignored, unless its auto-steps failed, in which
+    case only the auto-steppers are run again.
+
+    Args:
+        db: database session
+        topic: the webhook topic
+        payload: the webhook payload
+        raise_errors: re-raise handler and auto-stepper errors, so the webhook
+            can be retried (default False, which logs the error and returns
+            the handler result, or an empty result if a handler failed)
+
+    Returns:
+        the result of the first handler
+    """
+    state = payload.get("state")
+    handlers = webhook_dispatcher.get_handlers(topic, state)
+    steppers = webhook_dispatcher.get_steppers(topic, state)
+    if not (handlers or steppers):
+        logger.debug(f">>> no webhook handlers registered for: {topic.value} {state}")
+        return {}
+
+    started = time.perf_counter()
+    receipt_key = webhook_receipt_key(topic, payload)
+    if receipt_key and receipt_key in recent_webhooks:
+        logger.info(f">>> ignoring redelivered webhook: {receipt_key}")
+        _record_webhook(topic, state, "duplicate", started)
+        return {}
+
+    ctx = WebhookContext(topic, payload)
+    steps_key = steps_receipt_key(receipt_key) if receipt_key else None
+    async with outbox_session(db):
+        # call the handlers to process the hook
+        result = {}
+        try:
+            async with db.begin_nested():
+                # the receipt is rolled back with the handlers if they fail
+                if receipt_key and not await record_webhook_receipt(db, receipt_key):
+                    # handled already, retry the auto-steps if they failed
+                    if not steppers or await webhook_receipt_exists(db, steps_key):
+                        logger.info(f">>> ignoring redelivered webhook: {receipt_key}")
+                        recent_webhooks.add(receipt_key)
+                        _record_webhook(topic, state, "duplicate", started)
+                        return {}
+                    logger.info(f">>> retrying the auto-steps of: {receipt_key}")
+                    handlers = []
+                for i, handler in enumerate(handlers):
+                    with span(handler.__name__):
+                        handler_result = await handler(db, ctx)
+                    logger.debug(f">>> {handler.__name__} returns = {handler_result}")
+                    if i == 0:
+                        result = handler_result
+        except Exception as e:
+            logger.error(">>> handler returned error:" + str(e))
+            traceback.print_exc()
+            _record_webhook(topic, state, "failed", started)
+            if raise_errors:
+                raise
+            return result
+
+        # call the "auto-steppers" to move to the next state
+        steps_failed = False
+        async with db.begin_nested() as steps:
+            for stepper in steppers:
+                try:
+                    async with db.begin_nested():
+                        with span(stepper.__name__):
+                            _stepper_result = await stepper(db, ctx, result)
+                    logger.debug(f">>> {stepper.__name__} returns = {_stepper_result}")
+                except Exception as e:
+                    logger.error(">>> auto-stepper returned error:" + str(e))
+                    traceback.print_exc()
+                    if raise_errors:
+                        _record_webhook(topic, state, "failed", started)
+                        raise
+                    steps_failed = True
+            # without a receipt a redelivered webhook retries the failed steps
+            if steps_key and steppers and not steps_failed:
+                if not await record_webhook_receipt(db, steps_key):
+                    # a concurrent redelivery has just completed them
+                    await steps.rollback()
+                    logger.info(f">>> ignoring redelivered webhook: {receipt_key}")
+                    _record_webhook(topic, state, "duplicate", started)
+                    return {}
+
+    if receipt_key and not steps_failed:
+        db.info.setdefault(RECEIPT_KEYS_SESSION_KEY, []).append(receipt_key)
+    _record_webhook(topic, state, "failed" if steps_failed else "processed", started)
+    return result
+
+
+def _record_webhook(
+    topic: WebhookTopicType, state: str | None, result: str, started: float
+):
+    state = state or ""
+    WEBHOOKS.inc(topic.value, state, result)
+    WEBHOOK_DURATION.observe(time.perf_counter() - started, topic.value, state)
+
+
+async def commit_webhook(db: AsyncSession):
+    """Commit a processed webhook, then send its aca-py calls."""
+    await db.commit()
+    for receipt_key in db.info.pop(RECEIPT_KEYS_SESSION_KEY, []):
+        recent_webhooks.add(receipt_key)
+    outbox_dispatcher.wake()
@@ -0,0 +1,138 @@
+"""Show the query plans of the hot endorserequest lookups before and after indexing.
+
+Creates a scratch schema with an endorserequest table holding one million rows,
+prints EXPLAIN ANALYZE for each lookup, adds the indexes from migration
+8d2f4b6a1e07, prints the plans again and then drops the scratch schema.
+
+Usage (from the endorser directory, with the CONTROLLER_POSTGRESQL_* environment
+variables pointing at a scratch database):
+
+    python -m benchmarks.index_plans [--rows 1000000]
+"""
+
+import argparse
+import time
+
+import psycopg2
+
+from api.core.config import settings
+
+SCHEMA = "index_bench"
+
+CREATE_TABLE = f"""
+CREATE TABLE {SCHEMA}.endorserequest (
+    endorse_request_id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    tags VARCHAR[],
+    created_at TIMESTAMP DEFAULT now() NOT NULL,
+    updated_at TIMESTAMP DEFAULT now() NOT NULL,
+    transaction_id UUID NOT NULL,
+    connection_id UUID NOT NULL,
+    endorser_did VARCHAR NOT NULL,
+    author_did VARCHAR,
+    transaction_type VARCHAR,
+    state VARCHAR,
+    author_goal_code VARCHAR,
+    ledger_payload JSONB
+)
+"""
+
+# 1000 connections, ~1% of requests still pending, the rest mostly acked
+POPULATE = f"""
+INSERT INTO {SCHEMA}.endorserequest (
+    created_at, transaction_id, connection_id, endorser_did, author_did,
+    transaction_type, state, ledger_payload
+)
+SELECT
+    now() - (n || ' seconds')::interval,
+    gen_random_uuid(),
+    ('00000000-0000-0000-0000-' || lpad((n %% 1000)::text, 12, '0'))::uuid,
+    'EndorserDid1111111111',
+    'AuthorDid' || (n %% 1000),
+    (ARRAY['1', '100', '101', '102', '113', '114'])[1 + n %% 6],
+    CASE
+        WHEN n %% 100 = 0 THEN 'request_received'
+        WHEN n %% 100 = 1 THEN 'transaction_refused'
+        ELSE 'transaction_acked'
+    END,
+    '{{"operation": {{"type": "114"}}}}'
+FROM generate_series(1, %(rows)s) AS n
+"""
+
+CREATE_INDEXES = [
+    f"CREATE UNIQUE INDEX ON {SCHEMA}.endorserequest (transaction_id)",
+    f"CREATE INDEX ON {SCHEMA}.endorserequest (state, created_at DESC)",
+    f"CREATE INDEX ON {SCHEMA}.endorserequest (connection_id, created_at DESC)",
+    f"CREATE INDEX ON {SCHEMA}.endorserequest (created_at DESC)"
+    " WHERE state = 'request_received'",
+]
+
+QUERIES = {
+    "db_fetch_db_txn_record": f"""
+        SELECT * FROM {SCHEMA}.endorserequest
+        WHERE transaction_id = (
+            SELECT transaction_id FROM {SCHEMA}.endorserequest
+            ORDER BY endorse_request_id LIMIT 1
+        )
+    """,
+    "db_get_txn_records (state)": f"""
+        SELECT * FROM {SCHEMA}.endorserequest
+        WHERE state = 'transaction_refused'
+        ORDER BY created_at DESC LIMIT 10
+    """,
+    "db_get_txn_records (connection_id)": f"""
+        SELECT * FROM {SCHEMA}.endorserequest
+        WHERE connection_id = '00000000-0000-0000-0000-000000000042'
+        ORDER BY created_at DESC LIMIT 10
+    """,
+    "updated_allowed (pending requests)": f"""
+        SELECT * FROM {SCHEMA}.endorserequest
+        WHERE state = 'request_received'
+    """,
+}
+
+
+def explain(cur, title: str):
+    """Print the EXPLAIN ANALYZE output of each of the QUERIES."""
+    print(f"\n===== {title} =====")
+    for name, query in QUERIES.items():
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, COSTS OFF) {query}")
+        print(f"\n--- {name}")
+        for (line,) in cur.fetchall():
+            print(line)
+
+
+def main():
+    """Load the scratch table and print the plans before and after indexing."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(settings.SQLALCHEMY_DATABASE_ADMIN_URI)
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(CREATE_TABLE)
+
+        start = time.perf_counter()
+        cur.execute(POPULATE, {"rows": args.rows})
+        cur.execute(f"ANALYZE {SCHEMA}.endorserequest")
+        print(f"loaded {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+        explain(cur, "before indexes")
+
+        start = time.perf_counter()
+        for create_index in CREATE_INDEXES:
+            cur.execute(create_index)
+        cur.execute(f"ANALYZE {SCHEMA}.endorserequest")
+        print(f"\ncreated indexes in {time.perf_counter() - start:.1f}s")
+
+        explain(cur, "after indexes")
+    finally:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+from contextlib import asynccontextmanager
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Returns the given rows from every statement, and records what was done.
+
+    Records the statements, the commits, and the records copied (with
+    asyncpg's copy) to a table.
+    """
+
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.info = {}
+        self.statements = []
+        self.commits = 0
+        self.copied = []
+        self.driver_connection = self
+
+    async def execute(self, statement):
+        self.statements.append(str(statement))
+        return FakeResult(self.rows)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        yield self
+
+    async def connection(self):
+        return self
+
+    async def get_raw_connection(self):
+        return self
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.copied.extend(records)
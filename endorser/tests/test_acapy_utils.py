@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import api.acapy_utils as au
+from api.core.config import settings
+
+
+class StubAcapy:
+    """Local stand-in for the aca-py admin api that injects latency and errors."""
+
+    def __init__(self):
+        self.delay = 0.0
+        self.failures = 0  # number of calls to answer with a 503
+        self.calls = 0
+        self.peers = set()  # the client (host, port) of each call's connection
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.calls += 1
+        self.peers.add(request.transport.get_extra_info("peername"))
+        await asyncio.sleep(self.delay)
+        if self.failures > 0:
+            self.failures -= 1
+            return web.Response(status=503, text="unavailable")
+        if request.path.endswith("/missing"):
+            return web.Response(status=404, text="not found")
+        return web.json_response({"path": request.path})
+
+
+@pytest.fixture
+async def stub(monkeypatch):
+    stub = StubAcapy()
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", stub.handle)
+    server = TestServer(app)
+    await server.start_server()
+    monkeypatch.setattr(settings, "ACAPY_ADMIN_URL", str(server.make_url("")))
+    monkeypatch.setattr(settings, "ACAPY_CLIENT_READ_TIMEOUT", 0.2)
+    monkeypatch.setattr(settings, "ACAPY_CLIENT_GET_RETRIES", 2)
+    monkeypatch.setattr(settings, "ACAPY_CLIENT_RETRY_DELAY", 0.01)
+    monkeypatch.setattr(au, "_endpoint_timeouts", {})
+    monkeypatch.setattr(au, "acapy_circuit", au.CircuitBreaker(3, 0.2))
+    monkeypatch.setattr(au, "acapy_get_flights", au.SingleFlight())
+    yield stub
+    await au.close_acapy_session()
+    await server.close()
+
+
+async def test_session_is_reused_and_closed_on_shutdown(stub):
+    session = await au.start_acapy_session()
+    for _ in range(3):
+        assert await au.acapy_GET("ok") == {"path": "/ok"}
+    assert au.get_acapy_session() is session
+    # the calls went over one kept-alive connection
+    assert len(stub.peers) == 1
+
+    await au.close_acapy_session()
+    assert session.closed
+    assert au.get_acapy_session() is not session
+
+
+async def test_get_retries_server_errors(stub):
+    stub.failures = 2
+    assert await au.acapy_GET("ok") == {"path": "/ok"}
+    assert stub.calls == 3
+
+
+async def test_post_is_not_retried(stub):
+    stub.failures = 1
+    with pytest.raises(au.AcapyError):
+        await au.acapy_POST("ok")
+    assert stub.calls == 1
+
+
+async def test_client_errors_are_not_retried(stub):
+    with pytest.raises(au.AcapyError) as e:
+        await au.acapy_GET("missing")
+    assert e.value.status == 404
+    assert stub.calls == 1
+    assert au.circuit_state()["state"] == "closed"
+
+
+async def test_read_timeout(stub):
+    stub.delay = 0.5
+    with pytest.raises(asyncio.TimeoutError):
+        await au.acapy_POST("slow")
+
+
+async def test_circuit_opens_and_recovers(stub):
+    stub.failures = 3
+    with pytest.raises(au.AcapyError):
+        await au.acapy_GET("ok")
+    assert au.circuit_state()["state"] == "open"
+
+    # fails fast without calling aca-py
+    with pytest.raises(au.AcapyUnavailable):
+        await au.acapy_GET("ok")
+    assert stub.calls == 3
+
+    await asyncio.sleep(0.25)
+    assert await au.acapy_GET("ok") == {"path": "/ok"}
+    assert au.circuit_state()["state"] == "closed"
+
+
+async def test_concurrent_gets_are_coalesced(stub):
+    stub.delay = 0.05
+    results = await asyncio.gather(
+        *[au.acapy_GET("schemas/1") for _ in range(5)], au.acapy_GET("schemas/2")
+    )
+    assert results[0] == results[4] == {"path": "/schemas/1"}
+    assert results[0] is not results[1]
+    assert stub.calls == 2
+    assert au.client_stats()["coalescing"] == {
+        "calls": 2,
+        "coalesced": 4,
+        "in_flight": 0,
+    }
+
+
+async def test_coalesced_gets_share_errors(stub):
+    stub.failures = 3
+    results = await asyncio.gather(
+        au.acapy_GET("ok"), au.acapy_GET("ok"), return_exceptions=True
+    )
+    assert all(isinstance(r, au.AcapyError) for r in results)
+    assert stub.calls == 3
+
+
+def test_request_timeout_uses_longest_prefix(monkeypatch):
+    monkeypatch.setattr(
+        au,
+        "_endpoint_timeouts",
+        au.parse_endpoint_timeouts("schemas=1:10, schemas/created=2:20,bad"),
+    )
+    timeout = au.request_timeout("schemas/created")
+    assert (timeout.connect, timeout.sock_read) == (2, 20)
+    timeout = au.request_timeout("/schemas/123")
+    assert (timeout.connect, timeout.sock_read) == (1, 10)
+    timeout = au.request_timeout("connections")
+    assert timeout.sock_read == settings.ACAPY_CLIENT_READ_TIMEOUT
@@ -0,0 +1,118 @@
+import threading
+import uuid
+
+import pytest
+
+from api.db.models.allow import (
+    AllowedCredentialDefinition,
+    AllowedPublicDid,
+    AllowedSchema,
+    allowed_cred_def_uuid,
+    allowed_schema_uuid,
+)
+from api.services.allow_import import (
+    IMPORT_SPECS,
+    AllowImportResult,
+    InvalidAllowFile,
+    import_allow_list,
+    parse_chunks,
+)
+from tests.conftest import FakeSession
+
+
+class Context:
+    def __init__(self, parameters):
+        self.parameters = parameters
+
+    def get_current_parameters(self):
+        return self.parameters
+
+
+CRED_DEF_CSV = [
+    "schema_issuer_did,creddef_author_did,schema_name,version,tag,rev_reg_def,"
+    "rev_reg_entry,details\n",
+    "did:a,did:b,myschema,1.0,default,True,False,\n",
+    "did:a,,myschema,1.0,default,True,False,no author\n",
+    "did:a,did:b,myschema,2.0,default,maybe,False,\n",
+    "did:a,did:b,myschema,3.0,default,true,1,details\n",
+]
+
+
+def test_parse_chunks_reports_invalid_rows():
+    spec = IMPORT_SPECS[AllowedCredentialDefinition]
+    result = AllowImportResult("creddefs.csv")
+    chunks = list(parse_chunks(spec, CRED_DEF_CSV, result, chunk_size=1))
+
+    assert [len(chunk) for chunk in chunks] == [1, 1]
+    assert result.rows == 4
+    assert result.error_count == 2
+    assert result.errors == [
+        {"line": 3, "error": "creddef_author_did is required"},
+        {"line": 4, "error": "rev_reg_def: expected True or False, got 'maybe'"},
+    ]
+    line, *values = chunks[1][0]
+    record = dict(zip(spec.columns, values))
+    assert line == 5
+    assert record["rev_reg_def"] is True and record["rev_reg_entry"] is True
+    assert record["details"] == "details"
+    assert [e.version for e in result.entries] == ["1.0", "3.0"]
+
+
+def test_parse_chunks_checks_the_header():
+    spec = IMPORT_SPECS[AllowedSchema]
+    with pytest.raises(InvalidAllowFile):
+        list(parse_chunks(spec, ["author_did,version\n"], AllowImportResult(""), 10))
+    # an empty file is an empty allow list
+    assert list(parse_chunks(spec, [], AllowImportResult(""), 10)) == []
+
+
+def test_keys_match_the_column_defaults():
+    schema = IMPORT_SPECS[AllowedSchema].parse(
+        {"author_did": "did:a", "schema_name": "s", "version": "1.0"}
+    )
+    assert schema["allowed_schema_id"] == allowed_schema_uuid(Context(schema))
+
+    cred_def = IMPORT_SPECS[AllowedCredentialDefinition].parse(
+        {
+            "schema_issuer_did": "did:a",
+            "creddef_author_did": "did:b",
+            "schema_name": "s",
+            "version": "1.0",
+            "tag": "default",
+        }
+    )
+    assert isinstance(cred_def["allowed_cred_def_id"], uuid.UUID)
+    assert cred_def["allowed_cred_def_id"] == allowed_cred_def_uuid(
+        Context(cred_def)
+    )
+    assert IMPORT_SPECS[AllowedPublicDid].columns == ["registered_did", "details"]
+
+
+async def test_replace_with_invalid_rows_is_rejected():
+    db = FakeSession()
+    with pytest.raises(InvalidAllowFile, match="1 invalid row"):
+        await import_allow_list(
+            db,
+            AllowedPublicDid,
+            ["registered_did,details\n", "did:a,\n", ",no did\n"],
+            file_name="dids.csv",
+            replace=True,
+        )
+    # the current entries are not deleted
+    assert not any(s.startswith("DELETE") for s in db.statements)
+
+
+async def test_rows_are_parsed_off_the_event_loop():
+    db = FakeSession()
+    threads = set()
+
+    def lines():
+        for line in ["registered_did,details\n", "did:a,\n", "did:b,\n"]:
+            threads.add(threading.get_ident())
+            yield line
+
+    result = await import_allow_list(db, AllowedPublicDid, lines())
+
+    assert threading.get_ident() not in threads
+    assert [record[1] for record in db.copied] == ["did:a", "did:b"]
+    assert result.rows == 2
@@ -0,0 +1,56 @@
+from api.db.models.allow import (
+    AllowedCredentialDefinition,
+    AllowedPublicDid,
+    AllowedSchema,
+)
+from api.services.allow_matcher import REV_REG_DEF, REV_REG_ENTRY, AllowListMatcher
+
+
+def test_allowed_publish_did():
+    matcher = AllowListMatcher(public_dids=[AllowedPublicDid(registered_did="did1")])
+    assert matcher.allowed_publish_did("did1")
+    assert not matcher.allowed_publish_did("did2")
+
+
+def test_allowed_schema_wildcard():
+    matcher = AllowListMatcher(
+        schemas=[AllowedSchema(author_did="*", schema_name="myschema", version="1.0")]
+    )
+    assert matcher.allowed_schema("did1", "myschema", "1.0")
+    assert not matcher.allowed_schema("did1", "myschema", "2.0")
+
+
+def test_allowed_creddef_multiple_wildcard_rows():
+    matcher = AllowListMatcher(
+        cred_defs=[
+            AllowedCredentialDefinition(
+                schema_issuer_did="*",
+                creddef_author_did="did1",
+                schema_name="*",
+                version="*",
+                tag="default",
+                rev_reg_def=True,
+                rev_reg_entry=False,
+            ),
+            AllowedCredentialDefinition(
+                schema_issuer_did="*",
+                creddef_author_did="*",
+                schema_name="*",
+                version="*",
+                tag="default",
+                rev_reg_def=False,
+                rev_reg_entry=True,
+            ),
+        ]
+    )
+    assert matcher.allowed_creddef("did1", "did2", "myschema", "1.0", "default")
+    assert matcher.allowed_creddef(
+        "did1", "did2", "myschema", "1.0", "default", REV_REG_DEF
+    )
+    assert matcher.allowed_creddef(
+        "did1", "did2", "myschema", "1.0", "default", REV_REG_ENTRY
+    )
+    assert not matcher.allowed_creddef(
+        "did3", "did2", "myschema", "1.0", "default", REV_REG_DEF
+    )
+    assert not matcher.allowed_creddef("did1", "did2", "myschema", "1.0", "other")
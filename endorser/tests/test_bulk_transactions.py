@@ -0,0 +1,101 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from api.endpoints.models.endorse import (
+    BulkTransactionRequest,
+    EndorseTransactionType,
+)
+from api.services import endorse
+from tests.conftest import FakeSession
+
+
+def compile_filters(request: BulkTransactionRequest) -> list[str]:
+    return [
+        str(f.compile(dialect=postgresql.dialect()))
+        for f in endorse.bulk_transaction_filters(request)
+    ]
+
+
+def test_bulk_transaction_filters():
+    filters = compile_filters(
+        BulkTransactionRequest(
+            connection_id=uuid4(),
+            transaction_type=EndorseTransactionType.schema,
+            created_before=datetime(2026, 10, 1),
+        )
+    )
+    assert filters == [
+        "endorserequest.state = %(state_1)s",
+        "endorserequest.connection_id = %(connection_id_1)s::UUID",
+        "endorserequest.transaction_type = %(transaction_type_1)s",
+        "endorserequest.created_at < %(created_at_1)s",
+    ]
+
+
+def test_bulk_transaction_filters_by_id():
+    filters = compile_filters(BulkTransactionRequest(transaction_ids=[uuid4()]))
+    assert filters == [
+        "endorserequest.state = %(state_1)s",
+        "endorserequest.transaction_id IN (__[POSTCOMPILE_transaction_id_1])",
+    ]
+
+
+def test_bulk_transaction_filters_require_a_selection():
+    with pytest.raises(endorse.InvalidBulkRequest):
+        endorse.bulk_transaction_filters(BulkTransactionRequest())
+
+
+@pytest.fixture
+def acapy(monkeypatch):
+    """Endorse every transaction but the failing ones, recording the new states."""
+    failing = set()
+    states = []
+
+    async def acapy_POST(path):
+        transaction_id = path.split("/")[1]
+        if transaction_id in failing:
+            raise ValueError("ledger unavailable")
+        return {"state": "transaction_endorsed"}
+
+    async def db_update_db_txn_states(db, txn_states):
+        states.append(txn_states)
+
+    monkeypatch.setattr(endorse.au, "acapy_POST", acapy_POST)
+    monkeypatch.setattr(endorse, "db_update_db_txn_states", db_update_db_txn_states)
+    monkeypatch.setattr(endorse.settings, "ENDORSER_BULK_BATCH_SIZE", 2)
+    return failing, states
+
+
+async def test_bulk_update_commits_each_batch(acapy):
+    failing, states = acapy
+    transaction_ids = [uuid4() for _ in range(5)]
+    failing.add(str(transaction_ids[3]))
+    db = FakeSession(transaction_ids)
+
+    results = await endorse.bulk_update_transactions(
+        db, "endorse", BulkTransactionRequest(transaction_ids=transaction_ids)
+    )
+
+    assert db.commits == 3
+    assert [len(batch) for batch in states] == [2, 1, 1]
+    assert [r.transaction_id for r in results] == transaction_ids
+    assert [r.error for r in results if r.error] == ["ledger unavailable"]
+
+
+async def test_bulk_update_reports_unselected_ids(acapy):
+    selected, missing = uuid4(), uuid4()
+    db = FakeSession([selected])
+
+    results = await endorse.bulk_update_transactions(
+        db,
+        "endorse",
+        BulkTransactionRequest(transaction_ids=[selected, missing, missing]),
+    )
+
+    assert [(r.transaction_id, r.state, r.error) for r in results] == [
+        (selected, "transaction_endorsed", None),
+        (missing, None, "not found, or not in state request_received"),
+    ]
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import pytest
+
+from api.services import endorse
+
+
+@pytest.fixture
+def acapy(monkeypatch):
+    """The public did aca-py returns, the lookups made, and the clock."""
+    state = SimpleNamespace(did="did:sov:first", lookups=0, now=1000.0)
+
+    async def acapy_GET(path):
+        assert path == "wallet/did/public"
+        state.lookups += 1
+        return {"result": {"did": state.did}}
+
+    monkeypatch.setattr(endorse.au, "acapy_GET", acapy_GET)
+    monkeypatch.setattr(endorse, "time", SimpleNamespace(monotonic=lambda: state.now))
+    monkeypatch.setattr(endorse.settings, "ENDORSER_DID_CACHE_TTL", 300)
+    endorse.invalidate_endorser_did()
+    yield state
+    endorse.invalidate_endorser_did()
+
+
+async def test_did_is_cached_until_the_ttl_expires(acapy):
+    assert await endorse.get_endorser_did() == "did:sov:first"
+    acapy.did = "did:sov:second"
+    acapy.now += 299
+    assert await endorse.get_endorser_did() == "did:sov:first"
+    assert acapy.lookups == 1
+
+    # refilled from aca-py once expired, and cached again from then
+    acapy.now += 1
+    assert await endorse.get_endorser_did() == "did:sov:second"
+    acapy.now += 299
+    assert await endorse.get_endorser_did() == "did:sov:second"
+    assert acapy.lookups == 2
+
+
+async def test_invalidated_did_is_looked_up_again(acapy):
+    await endorse.get_endorser_did()
+    acapy.did = "did:sov:second"
+    endorse.invalidate_endorser_did()
+
+    assert await endorse.get_endorser_did() == "did:sov:second"
+    assert acapy.lookups == 2
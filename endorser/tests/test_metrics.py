@@ -0,0 +1,53 @@
+from api.acapy_utils import path_template
+from api.core.metrics import MetricsRegistry
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "A counter.", ("topic",))
+    histogram = registry.histogram("test_seconds", "A histogram.", buckets=(0.1, 1))
+    registry.gauge("test_gauge", "A gauge.", callback=lambda: 3)
+    counter.inc("ping")
+    counter.inc("ping", amount=2)
+    counter.inc('a"b')
+    histogram.observe(0.05)
+    histogram.observe(0.1)
+    histogram.observe(5)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE test_total counter" in lines
+    assert 'test_total{topic="ping"} 3' in lines
+    assert 'test_total{topic="a\\"b"} 1' in lines
+    assert 'test_seconds_bucket{le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{le="1"} 2' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 3' in lines
+    assert "test_seconds_sum 5.15" in lines
+    assert "test_seconds_count 3" in lines
+    assert "test_gauge 3" in lines
+
+
+def test_path_template():
+    assert path_template("schemas/123") == "schemas/{id}"
+    assert (
+        path_template("/transactions/3fa85f64-5717-4562-b3fc-2c963f66afa6/endorse")
+        == "transactions/{id}/endorse"
+    )
+    assert path_template("wallet/did/public") == "wallet/did/public"
+
+
+def test_metrics_require_a_token(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from api.endpoints.dependencies.jwt_security import create_access_token
+    from api.main import app, settings
+
+    client = TestClient(app)
+    token = create_access_token(data={"sub": "admin"}).access_token
+
+    def get(token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        return client.get("/metrics", headers=headers).status_code
+
+    assert (get(), get("not-a-token"), get(token)) == (401, 401, 200)
+    monkeypatch.setattr(settings, "ENDORSER_METRICS_PUBLIC", True)
+    assert get() == 200
@@ -0,0 +1,19 @@
+import uuid
+from datetime import datetime
+
+import pytest
+
+from api.db.paging import InvalidCursor, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    key = uuid.uuid4()
+    cursor = encode_cursor(created_at, key)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, uuid.UUID) == (created_at, key)
+
+
+def test_invalid_cursor():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor", uuid.UUID)
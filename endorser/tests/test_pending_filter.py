@@ -0,0 +1,37 @@
+from sqlalchemy.dialects import postgresql
+
+from api.db.models.allow import AllowedCredentialDefinition, AllowedSchema
+from api.services.allow_lists import pending_filter
+
+
+def compile_filter(entry) -> str:
+    return str(
+        pending_filter(entry).compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def test_schema_filter():
+    sql = compile_filter(AllowedSchema(author_did="did1", schema_name="*", version="*"))
+    assert "endorserequest.transaction_type = '101'" in sql
+    assert "endorserequest.author_did = 'did1'" in sql
+
+    sql = compile_filter(AllowedSchema(author_did="*", schema_name="*", version="*"))
+    assert "author_did" not in sql
+
+
+def test_creddef_filter_revocation():
+    sql = compile_filter(
+        AllowedCredentialDefinition(
+            schema_issuer_did="*",
+            creddef_author_did="did1",
+            schema_name="*",
+            version="*",
+            tag="*",
+            rev_reg_def=True,
+            rev_reg_entry=False,
+        )
+    )
+    assert "endorserequest.author_did = 'did1'" in sql
+    assert "IN ('113')" in sql
@@ -0,0 +1,160 @@
+from contextlib import asynccontextmanager
+from uuid import uuid4
+
+import pytest
+
+from api.endpoints.models.webhooks import WebhookTopicType
+from api.services import reconciler
+from api.services.acapy_outbox import OUTBOX_SESSION_KEY
+from api.services.webhooks import WebhookDispatcher
+from tests.conftest import FakeSession
+
+TOPIC = WebhookTopicType.endorse_transaction
+SOURCE = reconciler.SOURCES[1]
+
+
+async def noop(*args):
+    pass
+
+
+def transaction(state: str, transaction_id: str | None = None) -> dict:
+    return {"transaction_id": transaction_id or str(uuid4()), "state": state}
+
+
+@pytest.fixture
+def local(monkeypatch):
+    """The local states, by record id."""
+    states = {}
+
+    @asynccontextmanager
+    async def async_session():
+        yield FakeSession()
+
+    async def local_states(db, source, ids):
+        return {i: states[i] for i in ids if i in states}
+
+    dispatcher = WebhookDispatcher()
+    for state in ("request_received", "transaction_endorsed"):
+        dispatcher.register_handler(TOPIC, state, noop)
+    monkeypatch.setattr(reconciler, "async_session", async_session)
+    monkeypatch.setattr(reconciler, "local_states", local_states)
+    monkeypatch.setattr(reconciler, "webhook_dispatcher", dispatcher)
+    return states
+
+
+async def test_find_drift(local):
+    in_step = transaction("request_received")
+    changed = transaction("transaction_endorsed")
+    missing = transaction("request_received")
+    unhandled = transaction("transaction_refused")
+    local[in_step["transaction_id"]] = "request_received"
+    local[changed["transaction_id"]] = "request_received"
+    r = reconciler.Reconciler()
+
+    drifted = await r._find_drift(
+        SOURCE, [in_step, changed, missing, unhandled, {"state": "request_received"}]
+    )
+
+    assert drifted == [(changed, False), (missing, True)]
+    progress = r.progress()
+    assert (progress["checked"], progress["state_changed"]) == (4, 1)
+    assert (progress["missing"], progress["unhandled"]) == (1, 1)
+
+
+async def test_create_record_runs_the_first_state_handlers(monkeypatch):
+    calls = []
+
+    async def handler(db, ctx):
+        calls.append((ctx.payload["state"], db.info.get(OUTBOX_SESSION_KEY)))
+
+    dispatcher = WebhookDispatcher()
+    dispatcher.register_handler(TOPIC, "request_received", handler)
+    dispatcher.register_handler(TOPIC, "transaction_endorsed", noop)
+    monkeypatch.setattr(reconciler, "webhook_dispatcher", dispatcher)
+
+    await reconciler.create_record(
+        FakeSession(), SOURCE, transaction("transaction_endorsed")
+    )
+
+    # the handler gets aca-py's record, through the outbox
+    assert calls == [("transaction_endorsed", True)]
+
+
+@pytest.fixture
+def replayed(monkeypatch, local):
+    """The records replayed as webhooks, from aca-py's current records."""
+    acapy = {}
+    payloads = []
+
+    async def fetch_record(source, record_id):
+        return acapy.get(record_id)
+
+    async def process_webhook_payload(db, topic, payload, raise_errors=False):
+        payloads.append(payload)
+
+    monkeypatch.setattr(reconciler, "fetch_record", fetch_record)
+    monkeypatch.setattr(reconciler, "create_record", noop)
+    monkeypatch.setattr(reconciler, "process_webhook_payload", process_webhook_payload)
+    monkeypatch.setattr(reconciler, "commit_webhook", noop)
+    return acapy, payloads
+
+
+async def test_fix_replays_the_current_record(local, replayed):
+    acapy, payloads = replayed
+    record = transaction("request_received")
+    acapy[record["transaction_id"]] = transaction(
+        "transaction_endorsed", record["transaction_id"]
+    )
+    r = reconciler.Reconciler()
+
+    await r._fix(reconciler.asyncio.Semaphore(1), SOURCE, record, True)
+
+    assert payloads == [acapy[record["transaction_id"]]]
+    assert r.progress()["fixed"] == 1
+
+
+async def test_fix_skips_a_record_a_webhook_has_moved_on(local, replayed):
+    acapy, payloads = replayed
+    # the page said request_received, a webhook has since endorsed it
+    record = transaction("request_received")
+    acapy[record["transaction_id"]] = transaction(
+        "transaction_endorsed", record["transaction_id"]
+    )
+    local[record["transaction_id"]] = "transaction_endorsed"
+    gone = transaction("request_received")
+    r = reconciler.Reconciler()
+
+    await r._fix(reconciler.asyncio.Semaphore(1), SOURCE, record, False)
+    await r._fix(reconciler.asyncio.Semaphore(1), SOURCE, gone, True)
+
+    assert payloads == []
+    assert r.progress()["skipped"] == 2
+
+
+async def test_run_pass_stops_when_aca_py_ignores_the_offset(monkeypatch, local):
+    pages = {
+        source.path: [{source.id_field: str(uuid4())} for _ in range(2)]
+        for source in reconciler.SOURCES
+    }
+    offsets = []
+
+    async def acapy_GET(path, params=None):
+        offsets.append(params["offset"])
+        return {"results": pages[path]}
+
+    checked = []
+
+    async def find_drift(source, records):
+        checked.extend(records)
+        return []
+
+    monkeypatch.setattr(reconciler.au, "acapy_GET", acapy_GET)
+    monkeypatch.setattr(reconciler.settings, "ENDORSER_RECONCILE_PAGE_SIZE", 2)
+    r = reconciler.Reconciler()
+    monkeypatch.setattr(r, "_find_drift", find_drift)
+
+    await r._run_pass()
+
+    # one repeated page per source, and each record checked once
+    assert offsets == [0, 2, 0, 2]
+    assert checked == pages["connections"] + pages["transactions"]
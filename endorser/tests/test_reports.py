@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from api.endpoints.models.reports import ReportGroupByType
+from api.services.reports import hour_start, summary_query
+
+
+def compile_query(q) -> str:
+    return str(
+        q.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def test_summary_query_groups_by_day():
+    sql = compile_query(
+        summary_query(
+            [ReportGroupByType.day, ReportGroupByType.state],
+            start=datetime(2024, 5, 1, 10, 30),
+            state="transaction_endorsed",
+        )
+    )
+    assert "date_trunc('day', counts.bucket) AS period" in sql
+    assert "sum(counts.count) AS count" in sql
+    assert "counts.bucket >= '2024-05-01 10:00:00'" in sql
+    assert "GROUP BY date_trunc('day', counts.bucket)" in sql
+
+
+def test_summary_query_counts_the_deltas_not_rolled_up():
+    sql = compile_query(summary_query([ReportGroupByType.state]))
+    assert "FROM transactionreportcounter UNION ALL" in sql
+    assert "1 AS count \nFROM transactionreportdelta" in sql
+
+
+def test_summary_query_rejects_hour_and_day():
+    with pytest.raises(ValueError):
+        summary_query([ReportGroupByType.hour, ReportGroupByType.day])
+
+
+def test_hour_start_converts_to_utc():
+    start = datetime(2024, 5, 1, 10, 30, tzinfo=timezone(timedelta(hours=2)))
+    assert hour_start(start) == datetime(2024, 5, 1, 8)
+
+
+def test_summary_query_rounds_end_down_to_the_hour():
+    sql = compile_query(
+        summary_query(
+            [ReportGroupByType.state],
+            end=datetime(2024, 5, 1, 10, 30, tzinfo=timezone(timedelta(hours=2))),
+        )
+    )
+    assert "counts.bucket < '2024-05-01 08:00:00'" in sql
@@ -0,0 +1,31 @@
+from api.core.metrics import registry
+from api.services import auto_state_handlers
+from api.services.auto_state_handlers import SchemaIdCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SchemaIdCache(2)
+    cache.put(1, "schema:1")
+    cache.put(2, "schema:2")
+    assert cache.get(1) == "schema:1"
+
+    cache.put(3, "schema:3")
+
+    # 2 was used last before 1 was read again
+    assert [cache.get(n) for n in (1, 2, 3)] == ["schema:1", None, "schema:3"]
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 3, "misses": 1}
+
+
+def test_gauge_reports_the_cache_stats(monkeypatch):
+    cache = SchemaIdCache(2)
+    monkeypatch.setattr(auto_state_handlers, "schema_id_cache", cache)
+    for n in (1, 2, 3):
+        cache.put(n, f"schema:{n}")
+    cache.get(1)
+    cache.get(3)
+
+    lines = registry.render().splitlines()
+    assert 'endorser_schema_id_cache{stat="size"} 2' in lines
+    assert 'endorser_schema_id_cache{stat="max_size"} 2' in lines
+    assert 'endorser_schema_id_cache{stat="hits"} 1' in lines
+    assert 'endorser_schema_id_cache{stat="misses"} 1' in lines
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from api.core.tracing import JsonLinesExporter, SpanExporter, Tracer, load_exporter
+
+
+class ListExporter(SpanExporter):
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+def test_spans_nest():
+    exporter = ListExporter()
+    tracer = Tracer(exporter)
+    with tracer.span("webhook", topic="ping") as outer:
+        with tracer.span("handler"):
+            pass
+        with pytest.raises(ValueError):
+            with tracer.span("acapy"):
+                raise ValueError("boom")
+
+    handler, acapy, webhook = exporter.spans
+    assert webhook is outer and webhook.parent_id is None
+    assert webhook.attributes == {"topic": "ping"}
+    assert handler.parent_id == acapy.parent_id == webhook.span_id
+    assert handler.trace_id == acapy.trace_id == webhook.trace_id
+    assert acapy.error == "ValueError('boom')"
+    assert webhook.duration_ms >= 0
+
+
+def test_disabled_tracer_yields_no_span():
+    with Tracer().span("webhook") as span:
+        assert span is None
+
+
+def test_json_lines_exporter(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(JsonLinesExporter(str(path), buffer_size=2))
+    for name in ("a", "b", "c"):
+        with tracer.span(name):
+            pass
+    assert len(path.read_text().splitlines()) == 2
+    tracer.shutdown()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["a", "b", "c"]
+
+
+def test_load_exporter():
+    assert load_exporter("") is None
+    assert isinstance(load_exporter("jsonl"), JsonLinesExporter)
+    assert isinstance(
+        load_exporter("api.core.tracing:JsonLinesExporter"), JsonLinesExporter
+    )
+    assert load_exporter("no.such.module:Exporter") is None
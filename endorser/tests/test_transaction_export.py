@@ -0,0 +1,64 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from api.services.transaction_export import (
+    EXPORT_COLUMNS,
+    encode_csv,
+    encode_ndjson,
+    export_query,
+    gzip_chunks,
+)
+
+ROW = {
+    "author_goal_code": None,
+    "connection_id": "3fa85f64-5717-4562-b3fc-2c963f66afa6",
+    "transaction_id": "4fa85f64-5717-4562-b3fc-2c963f66afa6",
+    "tags": ["a"],
+    "created_at": "2026-10-18 10:00:00",
+    "state": "request_received",
+    "transaction_request": {"operation": {"type": "101", "data": 'a,"b"'}},
+    "endorser_did": "did:sov:endorser",
+    "author_did": "did:sov:author",
+    "transaction": {"type": "101", "data": 'a,"b"'},
+    "transaction_type": "101",
+    "transaction_response": {},
+}
+
+
+def test_encode_ndjson():
+    lines = encode_ndjson([ROW, ROW]).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [ROW, ROW]
+
+
+def test_encode_csv():
+    data = encode_csv([], header=True) + encode_csv([ROW])
+    header, row = list(csv.reader(io.StringIO(data.decode())))
+    assert header == EXPORT_COLUMNS
+    values = dict(zip(header, row))
+    assert json.loads(values["transaction_request"]) == ROW["transaction_request"]
+    assert json.loads(values["tags"]) == ["a"]
+    assert values["author_goal_code"] == ""
+
+
+async def test_gzip_chunks():
+    async def chunks():
+        for i in range(3):
+            yield encode_ndjson([{"i": i}])
+
+    data = b"".join([chunk async for chunk in gzip_chunks(chunks())])
+    assert gzip.decompress(data).decode().splitlines() == [
+        '{"i": 0}',
+        '{"i": 1}',
+        '{"i": 2}',
+    ]
+
+
+def test_export_query_checks_the_date_range():
+    with pytest.raises(ValueError):
+        export_query(start=datetime(2026, 2, 1), end=datetime(2026, 1, 1))
+    assert "transaction_type" in str(export_query(transaction_type="101"))
@@ -0,0 +1,21 @@
+from api.endpoints.models.webhooks import WebhookTopicType
+from api.services.webhook_receipts import RecentKeys, webhook_receipt_key
+
+
+def test_webhook_receipt_key():
+    topic = WebhookTopicType.endorse_transaction
+    assert webhook_receipt_key(
+        topic, {"transaction_id": "t1", "connection_id": "c1", "state": "s"}
+    ) == ("endorse_transaction", "t1", "s")
+    assert webhook_receipt_key(WebhookTopicType.ping, {"state": "received"}) is None
+
+
+def test_recent_keys_evicts_oldest():
+    keys = RecentKeys(max_size=2)
+    keys.add(("t", "1", "s"))
+    keys.add(("t", "2", "s"))
+    keys.add(("t", "1", "s"))
+    keys.add(("t", "3", "s"))
+    assert ("t", "1", "s") in keys
+    assert ("t", "2", "s") not in keys
+    assert ("t", "3", "s") in keys
@@ -0,0 +1,116 @@
+import pytest
+
+from api.endpoints.models.webhooks import WebhookTopicType
+from api.services import webhooks
+from tests.conftest import FakeSession
+
+
+async def handler(db, ctx):
+    return {"handled": True}
+
+
+async def failing_stepper(db, ctx, result):
+    raise ValueError("ledger unavailable")
+
+
+@pytest.fixture
+def failing_step(monkeypatch):
+    dispatcher = webhooks.WebhookDispatcher()
+    dispatcher.register_handler(WebhookTopicType.ping, "received", handler)
+    dispatcher.register_stepper(WebhookTopicType.ping, "received", failing_stepper)
+    monkeypatch.setattr(webhooks, "webhook_dispatcher", dispatcher)
+
+
+async def test_auto_stepper_errors_are_logged(failing_step):
+    result = await webhooks.process_webhook_payload(
+        FakeSession(), WebhookTopicType.ping, {"state": "received"}
+    )
+    assert result == {"handled": True}
+
+
+async def test_auto_stepper_errors_are_raised_for_retries(failing_step):
+    with pytest.raises(ValueError):
+        await webhooks.process_webhook_payload(
+            FakeSession(),
+            WebhookTopicType.ping,
+            {"state": "received"},
+            raise_errors=True,
+        )
+
+
+@pytest.fixture
+def handled_webhook(monkeypatch):
+    """A webhook with a receipt, and the receipts recorded since."""
+    key = ("ping", "1", "received")
+    receipts = {key}
+    recorded = []
+    webhooks.recent_webhooks.clear()
+
+    async def record_webhook_receipt(db, key):
+        recorded.append(key)
+        return key not in receipts
+
+    async def webhook_receipt_exists(db, key):
+        return key in receipts
+
+    monkeypatch.setattr(webhooks, "webhook_receipt_key", lambda *args: key)
+    monkeypatch.setattr(webhooks, "record_webhook_receipt", record_webhook_receipt)
+    monkeypatch.setattr(webhooks, "webhook_receipt_exists", webhook_receipt_exists)
+    return receipts, recorded
+
+
+async def test_redelivered_webhook_retries_failed_auto_steps(
+    monkeypatch, handled_webhook
+):
+    calls = []
+
+    async def stepper(db, ctx, result):
+        calls.append(result)
+
+    dispatcher = webhooks.WebhookDispatcher()
+    dispatcher.register_handler(WebhookTopicType.ping, "received", handler)
+    dispatcher.register_stepper(WebhookTopicType.ping, "received", stepper)
+    monkeypatch.setattr(webhooks, "webhook_dispatcher", dispatcher)
+    db = FakeSession()
+
+    await webhooks.process_webhook_payload(
+        db, WebhookTopicType.ping, {"state": "received"}
+    )
+
+    # the handlers are not run again, the steps are and are then recorded
+    assert calls == [{}]
+    assert handled_webhook[1][-1] == ("ping/steps", "1", "received")
+    assert db.info[webhooks.RECEIPT_KEYS_SESSION_KEY] == [("ping", "1", "received")]
+
+
+async def test_redelivered_webhook_is_ignored_once_its_steps_succeeded(
+    monkeypatch, handled_webhook
+):
+    handled_webhook[0].add(("ping/steps", "1", "received"))
+    calls = []
+
+    async def stepper(db, ctx, result):
+        calls.append(result)
+
+    dispatcher = webhooks.WebhookDispatcher()
+    dispatcher.register_stepper(WebhookTopicType.ping, "received", stepper)
+    monkeypatch.setattr(webhooks, "webhook_dispatcher", dispatcher)
+
+    result = await webhooks.process_webhook_payload(
+        FakeSession(), WebhookTopicType.ping, {"state": "received"}
+    )
+
+    assert result == {}
+    assert calls == []
+
+
+async def test_failed_auto_steps_are_not_recorded(failing_step, handled_webhook):
+    handled_webhook[0].clear()
+    db = FakeSession()
+
+    await webhooks.process_webhook_payload(
+        db, WebhookTopicType.ping, {"state": "received"}
+    )
+
+    assert handled_webhook[1] == [("ping", "1", "received")]
+    assert webhooks.RECEIPT_KEYS_SESSION_KEY not in db.info